@@ -0,0 +1,59 @@
+"""Login throughput of the scrypt settings, and event-loop stall during a burst.
+
+    cd backend && python -m benchmarks.passwords [--target 50] [--logins 200]
+
+For each candidate N (the configured one plus neighbours) this runs a burst
+of ``--logins`` concurrent verifications through the hashing pool and
+reports logins/s and the worst event-loop delay seen meanwhile. Pick the
+largest N that still meets ``--target`` logins/s per worker process and set it
+as ``PASSWORD_SCRYPT_N``.
+"""
+
+import argparse
+import asyncio
+import time
+
+import utils.passwords as passwords
+
+async def loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Worst delay of a periodic timer while the burst runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def burst(hashed: str, logins: int):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        loop.run_in_executor(passwords._executor, passwords.verify_password_sync, "correct horse", hashed)
+        for _ in range(logins)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return logins / elapsed, await lag
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", type=float, default=50, help="Required logins per second")
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    configured = passwords.PASSWORD_SCRYPT_N
+    candidates = sorted({configured // 2, configured, configured * 2})
+    print(f"r={passwords.PASSWORD_SCRYPT_R} p={passwords.PASSWORD_SCRYPT_P} "
+          f"workers={passwords.PASSWORD_HASH_WORKERS} target={args.target:g} logins/s")
+    print(f"{'N':>8}{'logins/s':>12}{'max loop lag':>15}")
+    for n in candidates:
+        hashed = passwords.hash_password_sync("correct horse", n=n)
+        rate, lag = asyncio.run(burst(hashed, args.logins))
+        verdict = "ok" if rate >= args.target else "below target"
+        marker = " (configured)" if n == configured else ""
+        print(f"{n:>8}{rate:>12.1f}{lag * 1000:>12.1f} ms  {verdict}{marker}")
+
+if __name__ == "__main__":
+    main()
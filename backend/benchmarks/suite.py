@@ -0,0 +1,204 @@
+"""Offline CPU microbenchmarks with stored baselines and a regression check.
+
+    cd backend && python -m benchmarks.suite [--filter TEXT] [--repeat N]
+        [--min-time SECONDS] [--threshold 0.15] [--save] [--baselines PATH]
+
+Each case is calibrated to run for at least ``--min-time`` per sample, then
+sampled ``--repeat`` times with the garbage collector off, as ``timeit`` does.
+The report shows the median and minimum per call and the spread (IQR as a
+percentage of the median). A case whose median is more than ``--threshold``
+slower than its baseline is flagged, and the exit status is then 1.
+
+``--save`` writes the medians to ``benchmarks/baselines.json``. Cases not
+run keep their stored entries. Baselines only compare on the machine and
+Python they were recorded with, so re-record them on the reference machine
+after an intended change.
+
+The periodized program case runs ``create_periodized_program`` against the
+in-memory storage backend (``STORAGE_BACKEND=memory``, forced here), so no
+MongoDB is needed and nothing is written to one.
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Before anything touches the database
+os.environ["STORAGE_BACKEND"] = "memory"
+
+from exercise_database import generate_daily_routine
+from models import PeriodizedProgramCreate
+from utils.assessment_calculator import analyze_strengths_and_weaknesses, calculate_overall_score
+from utils.database import db, parse_from_mongo, prepare_for_mongo
+from utils.scoring_kernel import score_assessment
+import routes.training_routes as training_routes
+import routes.vo2_routes as vo2_routes
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+ASSESSMENT = {
+    "player_name": "Bench Player", "age": 15, "position": "Forward",
+    "sprint_30m": 4.6, "yo_yo_test": 1600, "vo2_max": 52.5, "vertical_jump": 44, "body_fat": 12.5,
+    "ball_control": 3, "passing_accuracy": 72.0, "dribbling_success": 58.0, "shooting_accuracy": 51.0,
+    "defensive_duels": 63.0, "game_intelligence": 3, "positioning": 4, "decision_making": 3,
+    "coachability": 5, "mental_toughness": 4,
+    "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+}
+
+PROGRAM_REQUEST = PeriodizedProgramCreate(
+    player_id="Bench Player", program_name="Benchmark", total_duration_weeks=14, program_objectives=["speed"]
+)
+
+def run_sync(coro):
+    """Result of a coroutine that never suspends, without an event loop"""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("coroutine suspended; run it on an event loop")
+
+def cases(loop: asyncio.AbstractEventLoop) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) per benchmark; setup happens here, untimed"""
+    # Weaknesses on every axis, so the program uses the largest routines
+    loop.run_until_complete(db.assessments.insert_one(dict(ASSESSMENT)))
+    program = loop.run_until_complete(training_routes.create_periodized_program(PROGRAM_REQUEST))
+    program_dict = program.dict()
+    stored = prepare_for_mongo(program_dict)
+    weaknesses = ["speed", "ball_control", "passing", "tactical"]
+
+    return [
+        ("calculate_overall_score", lambda: calculate_overall_score(ASSESSMENT)),
+        # server.calculate_assessment_scores is this call plus a dict reshape
+        ("score_assessment", lambda: score_assessment(ASSESSMENT, 15)),
+        ("analyze_strengths_and_weaknesses", lambda: analyze_strengths_and_weaknesses(ASSESSMENT)),
+        ("prepare_for_mongo (program)", lambda: prepare_for_mongo(program_dict)),
+        ("parse_from_mongo (program)", lambda: parse_from_mongo(stored)),
+        ("generate_daily_routine", lambda: generate_daily_routine("development_phase", 2, 3, weaknesses)),
+        ("create_periodized_program", lambda: loop.run_until_complete(
+            training_routes.create_periodized_program(PROGRAM_REQUEST)
+        )),
+        ("calculate_vo2_max", lambda: run_sync(vo2_routes.calculate_vo2_max(16, "male", 58.0, 201.0))),
+        ("get_fitness_level", lambda: vo2_routes.get_fitness_level(52.5, 16, "female")),
+    ]
+
+def calibrate(fn: Callable[[], Any], min_time: float) -> int:
+    """Loops per sample so that one sample takes at least ``min_time``"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return loops
+        loops *= 2 if loops < 1024 else 4
+
+def sample(fn: Callable[[], Any], loops: int, repeat: int) -> List[float]:
+    """Seconds per call of each of ``repeat`` samples"""
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            times.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return times
+
+def summarize(times: List[float], loops: int) -> Dict[str, Any]:
+    quartiles = statistics.quantiles(times, n=4) if len(times) > 1 else [times[0]] * 3
+    median = statistics.median(times)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "min_us": round(min(times) * 1e6, 3),
+        "iqr_pct": round((quartiles[2] - quartiles[0]) / median * 100, 1),
+        "loops": loops,
+        "samples": len(times),
+    }
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()}
+
+def load_baselines(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {"environment": {}, "benchmarks": {}}
+    with path.open() as f:
+        return json.load(f)
+
+def save_baselines(path: Path, baselines: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> None:
+    benchmarks = dict(baselines.get("benchmarks", {}))
+    for name, result in results.items():
+        benchmarks[name] = {"median_us": result["median_us"], "min_us": result["min_us"]}
+    data = {
+        "environment": environment(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "benchmarks": dict(sorted(benchmarks.items())),
+    }
+    with path.open("w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Tuple[str, bool]:
+    """(verdict column, regressed) against a stored baseline"""
+    if not baseline:
+        return "no baseline", False
+    ratio = result["median_us"] / baseline["median_us"]
+    change = f"{(ratio - 1) * 100:+.1f}%"
+    if ratio > 1 + threshold:
+        return f"{change}  REGRESSION", True
+    if ratio < 1 - threshold:
+        return f"{change}  faster", False
+    return change, False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=9, help="Samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown of the median, 0.15 = 15%%")
+    parser.add_argument("--save", action="store_true", help="Record the results as the new baselines")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    recorded = baselines.get("environment", {})
+    if recorded and recorded != environment() and not args.save:
+        print(f"warning: baselines were recorded on {recorded}, this is {environment()}")
+
+    loop = asyncio.new_event_loop()
+    try:
+        selected = [(name, fn) for name, fn in cases(loop) if args.filter in name]
+        results: Dict[str, Dict[str, Any]] = {}
+        regressions = []
+        print(f"{'case':<36}{'median':>12}{'min':>12}{'spread':>9}  vs baseline")
+        for name, fn in selected:
+            loops = calibrate(fn, args.min_time)
+            result = results[name] = summarize(sample(fn, loops, args.repeat), loops)
+            verdict, regressed = compare(result, baselines.get("benchmarks", {}).get(name), args.threshold)
+            if regressed:
+                regressions.append(name)
+            print(f"{name:<36}{result['median_us']:>9.2f} us{result['min_us']:>9.2f} us"
+                  f"{result['iqr_pct']:>8.1f}%  {verdict}")
+    finally:
+        loop.close()
+
+    if args.save:
+        save_baselines(args.baselines, baselines, results)
+        print(f"Baselines written to {args.baselines}")
+    elif regressions:
+        raise SystemExit(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-document cost of the validated and trusted read paths.
+
+    cd backend && python -m benchmarks.trusted_read [--rounds N]
+
+"validated" is what a GET did before: ``load_document`` + ``Model(**doc)``,
+then FastAPI's response_model validation and JSON encoding.
+"trusted" is ``serializer_for(Model).serialize`` + ``TrustedJSONResponse``.
+Both are checked to produce the same JSON before timing. The program is
+created by ``create_periodized_program`` on the in-memory storage backend
+(``STORAGE_BACKEND=memory``, forced here), so no MongoDB is needed.
+"""
+
+from typing import Any, Callable, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# Before anything touches the database
+os.environ["STORAGE_BACKEND"] = "memory"
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from models import AssessmentBenchmark, PeriodizedProgram, PeriodizedProgramCreate
+from utils.converters import dump_model, load_document
+from utils.database import db
+from utils.exercise_catalog import expand_program
+from utils.trusted_read import TrustedJSONResponse, serializer_for
+import routes.training_routes as training_routes
+
+def stored_program() -> Dict[str, Any]:
+    """A 14-week program in the form get_player_program reads it"""
+    async def create():
+        await training_routes.create_periodized_program(PeriodizedProgramCreate(
+            player_id="bench", program_name="Benchmark", total_duration_weeks=14, program_objectives=["speed"]
+        ))
+        return await db.periodized_programs.find_one({"player_id": "bench"})
+    return expand_program(asyncio.run(create()))
+
+def stored_benchmarks(count: int) -> List[Dict[str, Any]]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(count):
+        benchmark = AssessmentBenchmark(
+            user_id="bench", player_name=f"Player {i}", assessment_id=str(i), age=15, position="ST",
+            sprint_30m=4.3, yo_yo_test=1800, vo2_max=55.5, vertical_jump=50, body_fat=11.0,
+            ball_control=4, passing_accuracy=80.0, dribbling_success=60.0, shooting_accuracy=55.0,
+            defensive_duels=60.0, game_intelligence=4, positioning=4, decision_making=3,
+            coachability=5, mental_toughness=4, overall_score=71.2, performance_level="Intermediate",
+            benchmark_date=start + timedelta(days=i)
+        )
+        docs.append({"_id": i, **dump_model(benchmark)})
+    return docs
+
+def validated_path(model: type, response_model: Any) -> Callable[[Any], bytes]:
+    field = create_model_field(name="Response", type_=response_model, mode="serialization")
+
+    def render(docs):
+        if isinstance(docs, list):
+            content = [model(**load_document(model, doc)) for doc in docs]
+        else:
+            content = model(**load_document(model, docs))
+        encoded = asyncio.run(serialize_response(field=field, response_content=content))
+        return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    return render
+
+def trusted_path(model: type) -> Callable[[Any], bytes]:
+    serialize = serializer_for(model).serialize
+
+    def render(docs):
+        content = [serialize(doc) for doc in docs] if isinstance(docs, list) else serialize(docs)
+        return TrustedJSONResponse(content).body
+    return render
+
+def measure(render: Callable[[Any], bytes], docs: Any, rounds: int) -> float:
+    render(docs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(docs)
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ("PeriodizedProgram (1 doc)", PeriodizedProgram, PeriodizedProgram, stored_program(), 1),
+        ("AssessmentBenchmark page", AssessmentBenchmark, List[AssessmentBenchmark], stored_benchmarks(1000), 1000),
+    ]
+    print(f"{'case':<28}{'validated':>14}{'trusted':>14}{'speedup':>10}")
+    for name, model, response_model, docs, count in cases:
+        validated = validated_path(model, response_model)
+        trusted = trusted_path(model)
+        if json.loads(validated(docs)) != json.loads(trusted(docs)):
+            raise SystemExit(f"{name}: trusted output differs from the validated path")
+        before = measure(validated, docs, args.rounds) / count
+        after = measure(trusted, docs, args.rounds) / count
+        print(f"{name:<28}{before * 1e6:>11.1f} us{after * 1e6:>11.1f} us{before / after:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
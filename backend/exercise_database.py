@@ -302,23 +302,26 @@ def generate_daily_routine(phase: str, week_number: int, day_number: int, player
     intensity = template["intensity_progression"][week_number - 1] if week_number <= len(template["intensity_progression"]) else 75
     
     # Select exercises based on player weaknesses and phase focus
-    exercises = []
+    exercise_keys = []
     
     # Always include some physical conditioning
-    exercises.append(EXERCISE_DATABASE["sprint_intervals_30m"])
+    exercise_keys.append("sprint_intervals_30m")
     
     # Add technical work based on weaknesses
     if "ball_control" in player_weaknesses:
-        exercises.append(EXERCISE_DATABASE["ball_mastery_cone_weaving"])
+        exercise_keys.append("ball_mastery_cone_weaving")
     if "passing" in player_weaknesses:
-        exercises.append(EXERCISE_DATABASE["passing_accuracy_gates"])
+        exercise_keys.append("passing_accuracy_gates")
         
     # Add tactical work (increases in later phases)
     if phase in ["development_phase", "peak_performance"]:
-        exercises.append(EXERCISE_DATABASE["small_sided_positioning"])
+        exercise_keys.append("small_sided_positioning")
         
     # Add psychological training
-    exercises.append(EXERCISE_DATABASE["visualization_mental_rehearsal"])
+    exercise_keys.append("visualization_mental_rehearsal")
+    
+    # Keep the catalog key so programs can store a reference instead of a copy
+    exercises = [{"exercise_key": key, **EXERCISE_DATABASE[key]} for key in exercise_keys]
     
     return {
         "day_number": day_number,
@@ -1,16 +1,17 @@
+# Time the imports below (and deferred ones at first use) for the startup report
+from utils.startup_report import startup_report
+startup_report.start()
+
 from fastapi import FastAPI, APIRouter, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import uuid
-from datetime import datetime, timezone, timedelta
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import random
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from utils.pagination import NEXT_CURSOR_HEADER
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -20,74 +21,131 @@ load_dotenv(ROOT_DIR / '.env')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-database_name = os.environ.get('DB_NAME', 'soccer_training_db')
-client = AsyncIOMotorClient(mongo_url)
-db = client[database_name]
+# MongoDB connection: the process-wide client shared with the routers
+from utils.database import db
+from utils.db_lifecycle import mongo
+from utils.indexes import bootstrap_indexes
+from utils.metrics import metrics, MetricsMiddleware
+from utils.llm_jobs import llm_jobs
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the client and indexes (verifying query plans) before serving traffic
+    with startup_report.phase("database"):
+        await mongo.connect()
+        await bootstrap_indexes(db)
+    startup_report.log()
+    try:
+        yield
+    finally:
+        # Queued generations write to MongoDB, so they finish or stop first
+        await llm_jobs.shutdown()
+        await mongo.close()
+
+def create_app() -> FastAPI:
+    """Build the API app.
+
+    Routers import their heavy dependencies (LLM clients, numpy scoring, the
+    exercise catalog, analytics) on first use, so a new worker can serve
+    ``/health`` without paying for them. ``uvicorn --factory main:create_app``
+    builds a fresh app; ``main:app`` is the one built at import.
+    """
+    with startup_report.phase("routers"):
+        from routes.assessment_routes import router as assessment_router
+        from routes.training_routes import router as training_router
+        from routes.vo2_routes import router as vo2_router
+        from routes.progress_routes import router as progress_router
+        from routes.auth_routes import router as auth_router
+
+    with startup_report.phase("create_app"):
+        app = FastAPI(
+            lifespan=lifespan,
+            title="Elite Soccer Player AI Coach API",
+            description="Comprehensive soccer player development platform with AI-powered training programs",
+            version="1.0.0"
+        )
+
+        # Create a router with the /api prefix
+        api_router = APIRouter(prefix="/api")
+
+        # CORS middleware
+        app.add_middleware(
+            CORSMiddleware,
+            allow_credentials=True,
+            allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=[NEXT_CURSOR_HEADER],
+        )
+        # Per-route latency, status codes and MongoDB commands (GET /metrics)
+        app.add_middleware(MetricsMiddleware)
+
+        # Include all routers
+        api_router.include_router(assessment_router, prefix="/assessments", tags=["assessments"])
+        api_router.include_router(training_router, prefix="/training", tags=["training"])
+        api_router.include_router(vo2_router, prefix="/vo2", tags=["vo2-benchmarks"])
+        api_router.include_router(progress_router, prefix="/progress", tags=["progress"])
+        api_router.include_router(auth_router, prefix="/auth", tags=["authentication"])
+
+        # Health check endpoint
+        @app.get("/health")
+        async def health_check():
+            return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+        @app.get("/health/db")
+        async def database_health():
+            """MongoDB ping and connection pool metrics (checkout waits, saturation)"""
+            try:
+                return await mongo.health()
+            except Exception as e:
+                raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+        @app.get("/metrics", response_class=PlainTextResponse)
+        async def prometheus_metrics():
+            """Request, MongoDB command, cache, queue and pool metrics in Prometheus text format"""
+            return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+        from utils import auth_context
+        from utils.player_cache import player_cache
+        for name, stats in (
+            ("mongo_pool", mongo.stats),
+            ("player_cache", player_cache.stats),
+            ("llm_jobs", llm_jobs.stats),
+            ("auth_cache", auth_context.stats),
+        ):
+            metrics.register_stats(name, stats)
+
+        @app.get("/health/startup")
+        async def startup_health():
+            """Cold start breakdown: startup phases and the slowest imports"""
+            return startup_report.report()
+
+        # Root endpoint
+        @app.get("/")
+        async def root():
+            return {
+                "message": "Elite Soccer Player AI Coach API",
+                "version": "1.0.0",
+                "docs": "/docs",
+                "health": "/health"
+            }
+
+        # Include the API router
+        app.include_router(api_router)
+
+        # Global exception handler
+        @app.exception_handler(Exception)
+        async def global_exception_handler(request, exc):
+            logger.error(f"Global exception handler caught: {exc}")
+            return HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An internal server error occurred"
+            )
+
+    return app
 
 # Create the main app
-app = FastAPI(
-    title="Elite Soccer Player AI Coach API",
-    description="Comprehensive soccer player development platform with AI-powered training programs",
-    version="1.0.0"
-)
-
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Import all models and routes
-from models import *
-from routes.assessment_routes import router as assessment_router
-from routes.training_routes import router as training_router
-from routes.vo2_routes import router as vo2_router
-from routes.progress_routes import router as progress_router
-from routes.auth_routes import router as auth_router
-from utils.database import prepare_for_mongo, parse_from_mongo
-from utils.llm_integration import generate_training_program
-
-# Include all routers
-api_router.include_router(assessment_router, prefix="/assessments", tags=["assessments"])
-api_router.include_router(training_router, prefix="/training", tags=["training"])
-api_router.include_router(vo2_router, prefix="/vo2", tags=["vo2-benchmarks"])
-api_router.include_router(progress_router, prefix="/progress", tags=["progress"])
-api_router.include_router(auth_router, prefix="/auth", tags=["authentication"])
-
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
-
-# Root endpoint
-@app.get("/")
-async def root():
-    return {
-        "message": "Elite Soccer Player AI Coach API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "health": "/health"
-    }
-
-# Include the API router
-app.include_router(api_router)
-
-# Global exception handler
-@app.exception_handler(Exception)
-async def global_exception_handler(request, exc):
-    logger.error(f"Global exception handler caught: {exc}")
-    return HTTPException(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        detail="An internal server error occurred"
-    )
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
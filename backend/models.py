@@ -65,6 +65,27 @@ class AssessmentCreate(BaseModel):
     coachability: int
     mental_toughness: int
 
+class AssessmentScoreBatch(BaseModel):
+    ages: List[int]
+    metrics: Dict[str, List[Optional[float]]]  # metric name -> one value per row (None = missing)
+
+class AssessmentScoreBatchResult(BaseModel):
+    count: int
+    overall_scores: List[float]
+    category_scores: Dict[str, List[float]]
+    performance_levels: List[str]
+
+class BulkImportRowError(BaseModel):
+    row: int  # 1-based data row (CSV header not counted)
+    errors: List[Dict[str, Any]]  # {"field", "message"} per problem
+
+class BulkImportResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkImportRowError]
+    errors_truncated: bool = False
+
 # ============ VO2 MAX BENCHMARK MODELS ============
 class VO2MaxBenchmark(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -87,6 +108,7 @@ class VO2MaxBenchmarkCreate(BaseModel):
 # ============ ENHANCED TRAINING MODELS ============
 class Exercise(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    exercise_key: Optional[str] = None  # Key in the exercise catalog, None for AI generated exercises
     name: str
     category: str  # "speed", "technical", "tactical", "physical", "psychological"
     description: str  # What the exercise is
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Request
 from typing import List, Optional
 import logging
-from models import PlayerAssessment, AssessmentCreate
-from utils.database import prepare_for_mongo, parse_from_mongo, db
+from models import (
+    PlayerAssessment, AssessmentCreate, AssessmentScoreBatch, AssessmentScoreBatchResult, BulkImportResult
+)
+from utils.database import db
+from utils.converters import converter_for, dump_model, load_document
 from utils.assessment_calculator import (
     calculate_overall_score, 
     get_performance_level,
     analyze_strengths_and_weaknesses,
     generate_training_recommendations
 )
+from utils.scoring_kernel import METRICS
+from utils.bulk_import import bulk_import, upload_format, TooManyRowsError
+from utils.pagination import PageParams, paginate
+from utils.player_cache import player_cache, latest_assessment
+from utils.player_summary import refresh_assessments
 from datetime import datetime, timezone
 
 router = APIRouter()
@@ -31,8 +39,10 @@ async def create_assessment(assessment: AssessmentCreate):
         )
         
         # Prepare and save to database
-        assessment_data = prepare_for_mongo(player_assessment.dict())
+        assessment_data = dump_model(player_assessment)
         result = await db.assessments.insert_one(assessment_data)
+        await player_cache.invalidate(assessment.player_name)
+        await refresh_assessments(db, assessment.player_name)
         
         # Return the created assessment
         player_assessment.id = str(result.inserted_id) if hasattr(result, 'inserted_id') else player_assessment.id
@@ -47,12 +57,108 @@ async def create_assessment(assessment: AssessmentCreate):
             detail=f"Failed to create assessment: {str(e)}"
         )
 
+@router.post("/score-batch", response_model=AssessmentScoreBatchResult)
+async def score_assessment_batch(batch: AssessmentScoreBatch):
+    """Score a column-oriented batch of assessments without storing them"""
+    unknown = set(batch.metrics) - set(METRICS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metrics: {', '.join(sorted(unknown))}"
+        )
+    
+    size = len(batch.ages)
+    for metric, values in batch.metrics.items():
+        if len(values) != size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Metric '{metric}' has {len(values)} values, expected {size}"
+            )
+    
+    try:
+        columns = {
+            metric: [float("nan") if value is None else value for value in values]
+            for metric, values in batch.metrics.items()
+        }
+        # NumPy scoring loads on the first batch, not at worker start
+        from utils.batch_scoring import score_batch
+        result = score_batch(columns, batch.ages)
+        
+        return AssessmentScoreBatchResult(
+            count=size,
+            overall_scores=result["overall_scores"].tolist(),
+            category_scores={
+                category: scores.tolist() for category, scores in result["category_scores"].items()
+            },
+            performance_levels=result["performance_levels"].tolist()
+        )
+    except Exception as e:
+        logger.error(f"Error scoring assessment batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to score assessment batch: {str(e)}"
+        )
+
+def build_scored_assessments(assessments: List[AssessmentCreate]) -> List[dict]:
+    """Score a batch of validated rows in one vectorized pass and build their documents"""
+    from utils.batch_scoring import score_records
+    records = [assessment.dict() for assessment in assessments]
+    return [
+        dump_model(PlayerAssessment(
+            **record,
+            overall_score=scores["overall_score"],
+            performance_level=scores["performance_level"]
+        ))
+        for record, scores in zip(records, score_records(records))
+    ]
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_assessments(request: Request):
+    """Import a squad from a CSV (text/csv) or NDJSON (application/x-ndjson) request body.
+
+    Every row is validated like POST /assessments; invalid rows are reported
+    individually and the rest are still imported.
+    """
+    fmt = upload_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson)"
+        )
+
+    imported_players = set()
+
+    def build_documents(assessments: List[AssessmentCreate]) -> List[dict]:
+        imported_players.update(assessment.player_name for assessment in assessments)
+        return build_scored_assessments(assessments)
+
+    try:
+        try:
+            report = await bulk_import(db.assessments, request.stream(), fmt, AssessmentCreate, build_documents)
+        finally:
+            await player_cache.invalidate_many(imported_players)
+            await refresh_assessments(db, *imported_players)
+        logger.info(f"Bulk import: {report['inserted']} of {report['received']} assessments inserted")
+        return report
+    except TooManyRowsError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing assessments: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import assessments: {str(e)}"
+        )
+
 @router.get("/", response_model=List[PlayerAssessment])
-async def get_all_assessments():
+async def get_all_assessments(response: Response, page: PageParams = Depends()):
     """Get all player assessments"""
     try:
-        assessments = await db.assessments.find().sort("created_at", -1).to_list(1000)
-        return [PlayerAssessment(**parse_from_mongo(assessment)) for assessment in assessments]
+        return await paginate(
+            db.assessments, {}, "created_at", page, response,
+            transform=lambda assessment: PlayerAssessment(**load_document(PlayerAssessment, assessment))
+        )
     except Exception as e:
         logger.error(f"Error fetching assessments: {e}")
         raise HTTPException(
@@ -61,14 +167,13 @@ async def get_all_assessments():
         )
 
 @router.get("/player/{player_name}", response_model=List[PlayerAssessment])
-async def get_player_assessments(player_name: str):
+async def get_player_assessments(player_name: str, response: Response, page: PageParams = Depends()):
     """Get all assessments for a specific player"""
     try:
-        assessments = await db.assessments.find(
-            {"player_name": player_name}
-        ).sort("created_at", -1).to_list(1000)
-        
-        return [PlayerAssessment(**parse_from_mongo(assessment)) for assessment in assessments]
+        return await paginate(
+            db.assessments, {"player_name": player_name}, "created_at", page, response,
+            transform=lambda assessment: PlayerAssessment(**load_document(PlayerAssessment, assessment))
+        )
     except Exception as e:
         logger.error(f"Error fetching player assessments: {e}")
         raise HTTPException(
@@ -80,13 +185,10 @@ async def get_player_assessments(player_name: str):
 async def get_latest_assessment(player_name: str):
     """Get the latest assessment for a specific player"""
     try:
-        assessment = await db.assessments.find_one(
-            {"player_name": player_name},
-            sort=[("created_at", -1)]
-        )
+        assessment = await latest_assessment(db, player_name)
         
         if assessment:
-            return PlayerAssessment(**parse_from_mongo(assessment))
+            return PlayerAssessment(**load_document(PlayerAssessment, assessment))
         return None
     except Exception as e:
         logger.error(f"Error fetching latest assessment: {e}")
@@ -107,7 +209,7 @@ async def get_assessment(assessment_id: str):
                 detail="Assessment not found"
             )
         
-        return PlayerAssessment(**parse_from_mongo(assessment))
+        return PlayerAssessment(**load_document(PlayerAssessment, assessment))
     except HTTPException:
         raise
     except Exception as e:
@@ -134,23 +236,26 @@ async def update_assessment(assessment_id: str, assessment_update: AssessmentCre
             "updated_at": datetime.now(timezone.utc)
         }
         
-        prepared_data = prepare_for_mongo(update_data)
+        prepared_data = converter_for(PlayerAssessment).to_mongo(update_data)
         
         # Update in database
-        result = await db.assessments.update_one(
+        previous = await db.assessments.find_one_and_update(
             {"id": assessment_id},
-            {"$set": prepared_data}
+            {"$set": prepared_data},
+            projection={"player_name": 1}
         )
         
-        if result.matched_count == 0:
+        if previous is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Assessment not found"
             )
+        await player_cache.invalidate(previous.get("player_name"), assessment_update.player_name)
+        await refresh_assessments(db, previous.get("player_name"), assessment_update.player_name)
         
         # Fetch and return updated assessment
         updated_assessment = await db.assessments.find_one({"id": assessment_id})
-        return PlayerAssessment(**parse_from_mongo(updated_assessment))
+        return PlayerAssessment(**load_document(PlayerAssessment, updated_assessment))
         
     except HTTPException:
         raise
@@ -165,13 +270,15 @@ async def update_assessment(assessment_id: str, assessment_update: AssessmentCre
 async def delete_assessment(assessment_id: str):
     """Delete an assessment"""
     try:
-        result = await db.assessments.delete_one({"id": assessment_id})
+        deleted = await db.assessments.find_one_and_delete({"id": assessment_id}, projection={"player_name": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Assessment not found"
             )
+        await player_cache.invalidate(deleted.get("player_name"))
+        await refresh_assessments(db, deleted.get("player_name"))
         
         return {"message": "Assessment deleted successfully"}
     except HTTPException:
@@ -188,10 +295,7 @@ async def get_player_analysis(player_name: str):
     """Get detailed analysis for a player including strengths, weaknesses, and recommendations"""
     try:
         # Get latest assessment
-        assessment = await db.assessments.find_one(
-            {"player_name": player_name},
-            sort=[("created_at", -1)]
-        )
+        assessment = await latest_assessment(db, player_name)
         
         if not assessment:
             raise HTTPException(
@@ -199,7 +303,7 @@ async def get_player_analysis(player_name: str):
                 detail="No assessment found for player"
             )
         
-        assessment_data = parse_from_mongo(assessment)
+        assessment_data = load_document(PlayerAssessment, assessment)
         
         # Analyze strengths and weaknesses
         analysis = analyze_strengths_and_weaknesses(assessment_data)
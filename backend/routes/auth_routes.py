@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
+import asyncio
 import logging
-import hashlib
 import jwt
 import os
 from datetime import datetime, timezone, timedelta
 from models import User, UserCreate, UserLogin, SavedReport, SavedReportCreate, UserProfile, AssessmentBenchmark, AssessmentBenchmarkCreate
-from utils.database import prepare_for_mongo, parse_from_mongo, db
+from utils.database import db
+from utils.converters import dump_model, load_document
+from utils.trusted_read import trusted_paginate
+from utils.pagination import PageParams, paginate, fetch_page, keyset_sort, NEXT_CURSOR_HEADER
+from utils.passwords import hash_password, verify_password, needs_rehash, DUMMY_HASH
+from utils.auth_context import AuthContext, cached_claims, invalidate_user, invalidate_profile
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -18,14 +23,6 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production'
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return hashlib.sha256(password.encode()).hexdigest() == hashed_password
-
 def create_access_token(user_id: str, username: str) -> str:
     """Create JWT access token"""
     payload = {
@@ -35,23 +32,29 @@ def create_access_token(user_id: str, username: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Verify JWT token and return user info"""
+def decode_token(token: str) -> dict:
+    """Decode and validate a JWT access token"""
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Verify JWT token and return user info (decoded claims are cached until exp)"""
+    return cached_claims(credentials.credentials, decode_token)
+
+def get_auth_context(current_user: dict = Depends(verify_token)) -> AuthContext:
+    """Verified claims plus cached access to the user and profile documents"""
+    return AuthContext(db, current_user)
+
 @router.post("/register", response_model=dict)
 async def register_user(user_data: UserCreate):
     """Register a new user"""
@@ -73,7 +76,7 @@ async def register_user(user_data: UserCreate):
             )
         
         # Create new user
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         
         # For player role, set player_id to username or generate unique ID
         player_id = None
@@ -93,12 +96,12 @@ async def register_user(user_data: UserCreate):
         )
         
         # Save user to database
-        user_data_dict = prepare_for_mongo(user.dict())
+        user_data_dict = dump_model(user)
         result = await db.users.insert_one(user_data_dict)
         
         # Create user profile
         profile = UserProfile(user_id=user.id)
-        profile_data = prepare_for_mongo(profile.dict())
+        profile_data = dump_model(profile)
         await db.user_profiles.insert_one(profile_data)
         
         # Create access token
@@ -137,15 +140,16 @@ async def login_user(login_data: UserLogin):
         # Find user by username
         user_doc = await db.users.find_one({"username": login_data.username})
         if not user_doc:
+            await verify_password(login_data.password, DUMMY_HASH)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
             )
         
-        user = User(**parse_from_mongo(user_doc))
+        user = User(**load_document(User, user_doc))
         
         # Verify password
-        if not verify_password(login_data.password, user.hashed_password):
+        if not await verify_password(login_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
@@ -157,6 +161,14 @@ async def login_user(login_data: UserLogin):
             {"$set": {"last_login": datetime.now(timezone.utc)}}
         )
         
+        # Upgrade legacy SHA-256 (or outdated scrypt) hashes now that we have the password
+        if needs_rehash(user.hashed_password):
+            await db.users.update_one(
+                {"id": user.id, "hashed_password": user.hashed_password},
+                {"$set": {"hashed_password": await hash_password(login_data.password)}}
+            )
+        invalidate_user(user.id)
+        
         # Create access token
         access_token = create_access_token(user.id, user.username)
         
@@ -187,27 +199,28 @@ async def login_user(login_data: UserLogin):
         )
 
 @router.get("/profile", response_model=dict)
-async def get_user_profile(current_user: dict = Depends(verify_token)):
+async def get_user_profile(auth: AuthContext = Depends(get_auth_context)):
     """Get user profile information"""
     try:
-        user_doc = await db.users.find_one({"id": current_user["user_id"]})
+        user_doc = await auth.user()
         if not user_doc:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user = User(**parse_from_mongo(user_doc))
+        user = User(**load_document(User, user_doc))
         
         # Get user profile
-        profile_doc = await db.user_profiles.find_one({"user_id": user.id})
+        profile_doc = await auth.profile()
         if profile_doc:
-            profile = UserProfile(**parse_from_mongo(profile_doc))
+            profile = UserProfile(**load_document(UserProfile, profile_doc))
         else:
             # Create profile if it doesn't exist
             profile = UserProfile(user_id=user.id)
-            profile_data = prepare_for_mongo(profile.dict())
+            profile_data = dump_model(profile)
             await db.user_profiles.insert_one(profile_data)
+            invalidate_profile(user.id)
         
         return {
             "user": {
@@ -246,12 +259,13 @@ async def get_user_profile(current_user: dict = Depends(verify_token)):
 @router.post("/save-report", response_model=SavedReport)
 async def save_assessment_report(
     report_data: SavedReportCreate, 
-    current_user: dict = Depends(verify_token)
+    auth: AuthContext = Depends(get_auth_context)
 ):
     """Save assessment report to user profile"""
     try:
+        current_user = auth.claims
         # Verify user owns this report or is a coach
-        user_doc = await db.users.find_one({"id": current_user["user_id"]})
+        user_doc = await auth.user()
         if not user_doc:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -270,7 +284,7 @@ async def save_assessment_report(
         )
         
         # Save to database
-        report_dict = prepare_for_mongo(saved_report.dict())
+        report_dict = dump_model(saved_report)
         await db.saved_reports.insert_one(report_dict)
         
         # Update user profile
@@ -284,6 +298,7 @@ async def save_assessment_report(
                 "$set": {"updated_at": datetime.now(timezone.utc)}
             }
         )
+        invalidate_profile(current_user["user_id"])
         
         logger.info(f"Report saved for user {current_user['username']}: {saved_report.id}")
         return saved_report
@@ -298,14 +313,17 @@ async def save_assessment_report(
         )
 
 @router.get("/saved-reports", response_model=List[SavedReport])
-async def get_saved_reports(current_user: dict = Depends(verify_token)):
+async def get_saved_reports(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: dict = Depends(verify_token)
+):
     """Get all saved reports for the current user"""
     try:
-        reports = await db.saved_reports.find(
-            {"user_id": current_user["user_id"]}
-        ).sort("saved_at", -1).to_list(1000)
-        
-        return [SavedReport(**parse_from_mongo(report)) for report in reports]
+        return await paginate(
+            db.saved_reports, {"user_id": current_user["user_id"]}, "saved_at", page, response,
+            transform=lambda report: SavedReport(**load_document(SavedReport, report))
+        )
         
     except Exception as e:
         logger.error(f"Error fetching saved reports: {e}")
@@ -329,7 +347,7 @@ async def get_saved_report(report_id: str, current_user: dict = Depends(verify_t
                 detail="Report not found"
             )
         
-        return SavedReport(**parse_from_mongo(report))
+        return SavedReport(**load_document(SavedReport, report))
         
     except HTTPException:
         raise
@@ -360,6 +378,7 @@ async def delete_saved_report(report_id: str, current_user: dict = Depends(verif
             {"user_id": current_user["user_id"]},
             {"$pull": {"saved_reports": report_id}}
         )
+        invalidate_profile(current_user["user_id"])
         
         return {"message": "Report deleted successfully"}
         
@@ -403,7 +422,7 @@ async def save_assessment_benchmark(
                 {"user_id": current_user["user_id"], "player_name": benchmark_data.player_name}
             ).sort("benchmark_date", -1).limit(1).to_list(1)
             if prev_doc:
-                previous_benchmark = AssessmentBenchmark(**parse_from_mongo(prev_doc[0]))
+                previous_benchmark = AssessmentBenchmark(**load_document(AssessmentBenchmark, prev_doc[0]))
         
         # Calculate improvement from baseline if not the first benchmark
         improvement_from_baseline = None
@@ -459,7 +478,7 @@ async def save_assessment_benchmark(
         )
         
         # Save to database
-        benchmark_dict = prepare_for_mongo(benchmark.dict())
+        benchmark_dict = dump_model(benchmark)
         await db.assessment_benchmarks.insert_one(benchmark_dict)
         
         # Update user profile
@@ -480,6 +499,7 @@ async def save_assessment_benchmark(
             update_data,
             upsert=True
         )
+        invalidate_profile(current_user["user_id"])
         
         logger.info(f"Benchmark saved for user {current_user['username']}: {benchmark.id} (baseline: {is_baseline})")
         return benchmark
@@ -495,7 +515,9 @@ async def save_assessment_benchmark(
 
 @router.get("/benchmarks", response_model=List[AssessmentBenchmark])
 async def get_user_benchmarks(
+    response: Response,
     player_name: Optional[str] = None,
+    page: PageParams = Depends(),
     current_user: dict = Depends(verify_token)
 ):
     """Get all benchmarks for the current user, optionally filtered by player name"""
@@ -504,9 +526,9 @@ async def get_user_benchmarks(
         if player_name:
             query["player_name"] = player_name
         
-        benchmarks = await db.assessment_benchmarks.find(query).sort("benchmark_date", -1).to_list(1000)
-        
-        return [AssessmentBenchmark(**parse_from_mongo(benchmark)) for benchmark in benchmarks]
+        return await trusted_paginate(
+            db.assessment_benchmarks, query, "benchmark_date", page, response, AssessmentBenchmark
+        )
         
     except Exception as e:
         logger.error(f"Error fetching benchmarks: {e}")
@@ -534,7 +556,7 @@ async def get_baseline_benchmark(
                 detail="Baseline benchmark not found for this player"
             )
         
-        return AssessmentBenchmark(**parse_from_mongo(benchmark))
+        return AssessmentBenchmark(**load_document(AssessmentBenchmark, benchmark))
         
     except HTTPException:
         raise
@@ -560,7 +582,7 @@ async def get_benchmark(benchmark_id: str, current_user: dict = Depends(verify_t
                 detail="Benchmark not found"
             )
         
-        return AssessmentBenchmark(**parse_from_mongo(benchmark))
+        return AssessmentBenchmark(**load_document(AssessmentBenchmark, benchmark))
         
     except HTTPException:
         raise
@@ -609,6 +631,7 @@ async def delete_benchmark(benchmark_id: str, current_user: dict = Depends(verif
             {"user_id": current_user["user_id"]},
             {"$pull": {"benchmarks": benchmark_id}}
         )
+        invalidate_profile(current_user["user_id"])
         
         return {"message": "Benchmark deleted successfully"}
         
@@ -624,32 +647,47 @@ async def delete_benchmark(benchmark_id: str, current_user: dict = Depends(verif
 @router.get("/benchmarks/progress/{player_name}", response_model=dict)
 async def get_player_progress(
     player_name: str,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(verify_token)
 ):
-    """Get comprehensive progress analysis for a player"""
+    """Get comprehensive progress analysis for a player
+    
+    The benchmarks and timeline are one page, oldest first; the totals and
+    baseline/latest comparison cover every benchmark.
+    """
     try:
-        # Get all benchmarks for this player
-        benchmarks = await db.assessment_benchmarks.find({
+        query = {
             "user_id": current_user["user_id"],
             "player_name": player_name
-        }).sort("benchmark_date", 1).to_list(1000)
+        }
+        first, last, total = await asyncio.gather(
+            db.assessment_benchmarks.find_one(query, sort=keyset_sort("benchmark_date", 1)),
+            db.assessment_benchmarks.find_one(query, sort=keyset_sort("benchmark_date")),
+            db.assessment_benchmarks.count_documents(query),
+        )
         
-        if not benchmarks:
+        if not first:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No benchmarks found for this player"
             )
         
-        benchmark_list = [AssessmentBenchmark(**parse_from_mongo(b)) for b in benchmarks]
+        benchmark_list, next_cursor = await fetch_page(
+            db.assessment_benchmarks, query, "benchmark_date", page, direction=1,
+            transform=lambda b: AssessmentBenchmark(**load_document(AssessmentBenchmark, b))
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         # Get baseline and latest
-        baseline = benchmark_list[0]
-        latest = benchmark_list[-1]
+        baseline = AssessmentBenchmark(**load_document(AssessmentBenchmark, first))
+        latest = AssessmentBenchmark(**load_document(AssessmentBenchmark, last))
         
         # Calculate overall progress
         progress = {
             "player_name": player_name,
-            "total_benchmarks": len(benchmark_list),
+            "total_benchmarks": total,
             "baseline_date": baseline.benchmark_date,
             "latest_date": latest.benchmark_date,
             "baseline_score": baseline.overall_score,
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Query
 from typing import List, Optional, Dict, Any
 import logging
 from models import (
     DailyProgress, DailyProgressCreate, WeeklyProgress, WeeklyProgressCreate,
     PerformanceMetric, ExerciseCompletion, ExerciseCompletionCreate
 )
-from utils.database import prepare_for_mongo, parse_from_mongo, db
+from utils.database import mongo_date, db
+from utils.converters import dump_model, load_document, parse_datetime
+from utils.pagination import PageParams, paginate, fetch_page, NEXT_CURSOR_HEADER
+from utils.program_calendar import program_position, phase_for_week
+from utils.player_cache import player_cache, program_schedule
+from utils.player_summary import get_summary, summary_response, record_training_day, record_metrics
 from datetime import datetime, timezone, timedelta
 
+# utils.analytics is imported where it is used, so a new worker does not load
+# it before its first metrics request
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -34,8 +42,10 @@ async def log_daily_progress(progress: DailyProgressCreate):
         )
         
         # Save to database
-        progress_data = prepare_for_mongo(daily_progress.dict())
+        progress_data = dump_model(daily_progress)
         await db.daily_progress.insert_one(progress_data)
+        await player_cache.invalidate(progress.player_id)
+        await record_training_day(db, progress.player_id, progress_data["date"])
         
         # Update performance metrics based on completed exercises
         await update_performance_metrics(progress.player_id, completed_exercises)
@@ -51,18 +61,19 @@ async def log_daily_progress(progress: DailyProgressCreate):
         )
 
 @router.get("/daily/{player_id}", response_model=List[DailyProgress])
-async def get_daily_progress(player_id: str, days: int = 30):
+async def get_daily_progress(player_id: str, response: Response, days: int = 30, page: PageParams = Depends()):
     """Get daily progress history for a player"""
     try:
         start_date = datetime.now(timezone.utc) - timedelta(days=days)
-        progress_entries = await db.daily_progress.find(
+        return await paginate(
+            db.daily_progress,
             {
                 "player_id": player_id,
-                "date": {"$gte": start_date}
-            }
-        ).sort("date", -1).to_list(1000)
-        
-        return [DailyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+                "date": {"$gte": mongo_date(start_date)}
+            },
+            "date", page, response,
+            transform=lambda entry: DailyProgress(**load_document(DailyProgress, entry))
+        )
     except Exception as e:
         logger.error(f"Error fetching daily progress: {e}")
         raise HTTPException(
@@ -75,7 +86,7 @@ async def log_weekly_progress(progress: WeeklyProgressCreate):
     """Log weekly training progress"""
     try:
         weekly_progress = WeeklyProgress(**progress.dict())
-        progress_data = prepare_for_mongo(weekly_progress.dict())
+        progress_data = dump_model(weekly_progress)
         await db.weekly_progress.insert_one(progress_data)
         
         logger.info(f"Weekly progress logged for player: {progress.player_id}")
@@ -89,14 +100,13 @@ async def log_weekly_progress(progress: WeeklyProgressCreate):
         )
 
 @router.get("/weekly/{player_id}", response_model=List[WeeklyProgress])
-async def get_weekly_progress(player_id: str):
+async def get_weekly_progress(player_id: str, response: Response, page: PageParams = Depends()):
     """Get weekly progress history for a player"""
     try:
-        progress_entries = await db.weekly_progress.find(
-            {"player_id": player_id}
-        ).sort("created_at", -1).to_list(1000)
-        
-        return [WeeklyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await paginate(
+            db.weekly_progress, {"player_id": player_id}, "created_at", page, response,
+            transform=lambda entry: WeeklyProgress(**load_document(WeeklyProgress, entry))
+        )
     except Exception as e:
         logger.error(f"Error fetching weekly progress: {e}")
         raise HTTPException(
@@ -105,30 +115,40 @@ async def get_weekly_progress(player_id: str):
         )
 
 @router.get("/metrics/{player_id}")
-async def get_performance_metrics(player_id: str):
-    """Get performance metrics and progress tracking"""
+async def get_performance_metrics(
+    player_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    weeks: Optional[int] = Query(None, ge=1, description="Limit improvement trends to the last N weeks"),
+    phase: Optional[int] = Query(None, ge=1, description="Limit improvement trends to one program phase")
+):
+    """Get performance metrics and progress tracking (metrics are paginated)"""
+    from utils.analytics import improvement_trends
     try:
-        # Get recent performance metrics
-        metrics = await db.performance_metrics.find(
-            {"player_id": player_id}
-        ).sort("measurement_date", -1).to_list(1000)
+        # Get one page of recent performance metrics
+        metrics, next_cursor = await fetch_page(
+            db.performance_metrics, {"player_id": player_id}, "measurement_date", page
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         # Get daily progress for visualization
         progress_entries = await db.daily_progress.find(
             {"player_id": player_id}
         ).sort("date", -1).limit(30).to_list(1000)
         
-        # Calculate improvement trends
-        improvement_data = calculate_improvement_trends(metrics)
+        # Improvement trends over all (or the windowed) metrics, aggregated in MongoDB
+        improvement_data = await improvement_trends(db.performance_metrics, player_id, weeks, phase)
         
         # Get next assessment date
         next_assessment = await get_next_assessment_date(player_id)
         
         return {
-            "metrics": [PerformanceMetric(**parse_from_mongo(metric)) for metric in metrics],
-            "daily_progress": [DailyProgress(**parse_from_mongo(entry)) for entry in progress_entries],
+            "metrics": [PerformanceMetric(**load_document(PerformanceMetric, metric)) for metric in metrics],
+            "daily_progress": [DailyProgress(**load_document(DailyProgress, entry)) for entry in progress_entries],
             "improvement_trends": improvement_data,
-            "next_assessment": next_assessment
+            "next_assessment": next_assessment,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -139,51 +159,27 @@ async def get_performance_metrics(player_id: str):
         )
 
 @router.get("/summary/{player_id}")
-async def get_progress_summary(player_id: str):
-    """Get a comprehensive progress summary for a player"""
+async def get_progress_summary(
+    player_id: str,
+    weeks: Optional[int] = Query(None, ge=1, description="Limit improvement trends to the last N weeks"),
+    phase: Optional[int] = Query(None, ge=1, description="Limit improvement trends to one program phase")
+):
+    """Get a comprehensive progress summary for a player (one read of the player_summary view)"""
     try:
-        # Get latest assessment for baseline
-        assessment = await db.assessments.find_one(
-            {"player_name": player_id},
-            sort=[("created_at", -1)]
-        )
+        summary = await get_summary(db, player_id)
         
-        if not assessment:
+        if not summary.get("assessment"):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No assessment found for player"
             )
         
-        # Get training completion stats
-        thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-        
-        daily_sessions = await db.daily_progress.count_documents(
-            {
-                "player_id": player_id,
-                "date": {"$gte": thirty_days_ago}
-            }
-        )
-        
-        # Get performance trends
-        metrics = await db.performance_metrics.find(
-            {"player_id": player_id}
-        ).sort("measurement_date", -1).to_list(100)
-        
-        trends = calculate_improvement_trends(metrics)
-        
-        # Calculate training consistency
-        training_consistency = min(100, (daily_sessions / 30) * 100)
-        
-        return {
-            "player_id": player_id,
-            "assessment_date": assessment.get("created_at"),
-            "overall_score": assessment.get("overall_score", 0),
-            "performance_level": assessment.get("performance_level", "Developing"),
-            "training_sessions_30_days": daily_sessions,
-            "training_consistency_percentage": round(training_consistency, 1),
-            "improvement_trends": trends,
-            "next_assessment_date": await get_next_assessment_date(player_id)
-        }
+        result = summary_response(summary)
+        if weeks is not None or phase is not None:
+            # Windowed trends are not materialized
+            from utils.analytics import improvement_trends
+            result["improvement_trends"] = await improvement_trends(db.performance_metrics, player_id, weeks, phase)
+        return result
         
     except HTTPException:
         raise
@@ -198,11 +194,8 @@ async def get_progress_summary(player_id: str):
 async def update_performance_metrics(player_id: str, completed_exercises: List[ExerciseCompletion]):
     """Update performance metrics based on completed exercises"""
     try:
-        # Get current program to determine phase and week
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
+        # Get current program to determine phase and week (schedule fields only)
+        program = await program_schedule(db, player_id)
         
         if not program:
             return
@@ -211,6 +204,7 @@ async def update_performance_metrics(player_id: str, completed_exercises: List[E
         current_phase = calculate_current_phase(program)
         
         # Update metrics based on exercise performance
+        metrics = []
         for exercise in completed_exercises:
             if exercise.performance_rating and exercise.performance_rating >= 4:
                 # Good performance - create positive metric entry
@@ -222,77 +216,31 @@ async def update_performance_metrics(player_id: str, completed_exercises: List[E
                     week_number=current_week
                 )
                 
-                metric_data = prepare_for_mongo(metric.dict())
-                await db.performance_metrics.insert_one(metric_data)
+                metrics.append(dump_model(metric))
+        
+        if metrics:
+            await db.performance_metrics.insert_many(metrics)
+            await record_metrics(db, player_id, metrics)
         
     except Exception as e:
         logger.error(f"Error updating performance metrics: {e}")
 
 def calculate_current_week(program: Dict[str, Any]) -> int:
     """Calculate current week in program"""
-    start_date = program["program_start_date"]
-    if isinstance(start_date, str):
-        start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-    current_date = datetime.now(timezone.utc)
-    days_elapsed = (current_date - start_date).days
-    return (days_elapsed // 7) + 1
+    return program_position(program)[0]
 
 def calculate_current_phase(program: Dict[str, Any]) -> int:
     """Calculate current phase in program"""
-    current_week = calculate_current_week(program)
-    week_count = 0
-    
-    for i, macro_cycle in enumerate(program["macro_cycles"]):
-        week_count += macro_cycle["duration_weeks"]
-        if current_week <= week_count:
-            return i + 1
-    
-    return len(program["macro_cycles"])
-
-def calculate_improvement_trends(metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Calculate improvement trends from performance metrics"""
-    trends = {}
-    
-    # Group metrics by type
-    metric_groups = {}
-    for metric in metrics:
-        metric_type = metric["metric_name"]
-        if metric_type not in metric_groups:
-            metric_groups[metric_type] = []
-        metric_groups[metric_type].append(metric)
-    
-    # Calculate trends for each metric type
-    for metric_type, metric_list in metric_groups.items():
-        if len(metric_list) >= 2:
-            # Sort by date
-            sorted_metrics = sorted(metric_list, key=lambda x: x["measurement_date"])
-            first_value = sorted_metrics[0]["value"]
-            last_value = sorted_metrics[-1]["value"]
-            
-            if first_value > 0:
-                improvement_percentage = ((last_value - first_value) / first_value) * 100
-                trends[metric_type] = {
-                    "improvement_percentage": round(improvement_percentage, 2),
-                    "trend_direction": "up" if improvement_percentage > 0 else "down",
-                    "data_points": len(sorted_metrics)
-                }
-    
-    return trends
+    return phase_for_week(program, calculate_current_week(program))
 
 async def get_next_assessment_date(player_id: str) -> Optional[datetime]:
     """Get the next assessment date for a player"""
     try:
         # Get player's program to find next assessment date
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id},
-            sort=[("created_at", -1)]
-        )
+        program = await program_schedule(db, player_id)
         
         if program:
-            next_date = program.get("next_assessment_date")
-            if isinstance(next_date, str):
-                return datetime.fromisoformat(next_date.replace('Z', '+00:00'))
-            return next_date
+            return parse_datetime(program.get("next_assessment_date"))
         
         # Default to 4 weeks from now
         return datetime.now(timezone.utc) + timedelta(weeks=4)
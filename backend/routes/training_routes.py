@@ -1,30 +1,35 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Query
 from typing import List, Optional, Dict, Any
 import logging
 from models import (
     PeriodizedProgram, PeriodizedProgramCreate, TrainingProgram, TrainingProgramCreate,
     DailyRoutine, MicroCycle, MacroCycle, Exercise
 )
-from utils.database import prepare_for_mongo, parse_from_mongo, db
-from utils.llm_integration import generate_training_program, generate_adaptive_exercises
-from exercise_database import (
-    PERIODIZATION_TEMPLATES, EXERCISE_DATABASE, 
-    generate_daily_routine, get_intensity_rating, get_focus_areas
-)
+from utils.database import db
+from utils.converters import dump_model, load_document
+from utils.trusted_read import trusted_response
+from utils.pagination import PageParams, paginate
+from utils.program_calendar import index_program, current_routine
+from utils.player_cache import player_cache, latest_assessment, latest_program, program_schedule
+from utils.player_summary import record_program
+from utils.llm_jobs import llm_jobs, QueueFullError
 from datetime import datetime, timezone, timedelta
 
+# The exercise database and catalog, and the LLM integration, are imported
+# where they are used so a new worker does not load them before its first
+# program request
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.post("/periodized-programs", response_model=PeriodizedProgram)
 async def create_periodized_program(program: PeriodizedProgramCreate):
     """Create a comprehensive periodized training program"""
+    from exercise_database import PERIODIZATION_TEMPLATES, generate_daily_routine
+    from utils.exercise_catalog import compact_program, archive_catalog
     try:
         # Determine player weaknesses based on latest assessment
-        assessment = await db.assessments.find_one(
-            {"player_name": program.player_id}, 
-            sort=[("created_at", -1)]
-        )
+        assessment = await latest_assessment(db, program.player_id)
         
         weaknesses = []
         if assessment:
@@ -61,6 +66,7 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
                     exercises = []
                     for ex_data in routine_data["exercises"]:
                         exercise = Exercise(
+                            exercise_key=ex_data.get("exercise_key"),
                             name=ex_data["name"],
                             category=ex_data["category"],
                             description=ex_data["description"],
@@ -130,9 +136,12 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
             program_objectives=program.program_objectives
         )
         
-        # Save to database
-        program_data = prepare_for_mongo(periodized_program.dict())
+        # Save to database, storing exercise references instead of full copies
+        program_data = index_program(compact_program(dump_model(periodized_program)))
+        await archive_catalog(db)
         await db.periodized_programs.insert_one(program_data)
+        await player_cache.invalidate(program.player_id)
+        await record_program(db, program.player_id, program_data)
         
         logger.info(f"Periodized program created for player: {program.player_id}")
         return periodized_program
@@ -147,15 +156,12 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
 @router.get("/periodized-programs/{player_id}", response_model=Optional[PeriodizedProgram])
 async def get_player_program(player_id: str):
     """Get the current periodized program for a player"""
+    from utils.exercise_catalog import expand_program, catalog_for, VERSION_FIELD
     try:
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
-        
+        program = await latest_program(db, player_id)
         if program:
-            return PeriodizedProgram(**parse_from_mongo(program))
-        return None
+            program = expand_program(program, await catalog_for(db, program.get(VERSION_FIELD)))
+        return trusted_response(PeriodizedProgram, program)
     except Exception as e:
         logger.error(f"Error fetching player program: {e}")
         raise HTTPException(
@@ -166,52 +172,13 @@ async def get_player_program(player_id: str):
 @router.get("/current-routine/{player_id}")
 async def get_current_routine(player_id: str):
     """Get today's training routine for a player"""
+    from utils.exercise_catalog import expand_routine, catalog_for, VERSION_FIELD
     try:
-        # Get player's current program
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
-        
-        if not program:
-            return {"message": "No training program found", "routine": None}
-        
-        # Calculate current position in program
-        start_date = program["program_start_date"]
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        current_date = datetime.now(timezone.utc)
-        days_elapsed = (current_date - start_date).days
-        
-        current_week = (days_elapsed // 7) + 1
-        current_day = (days_elapsed % 7) + 1
-        
-        # Find current routine
-        current_routine = None
-        current_phase = None
-        
-        week_count = 0
-        for macro_cycle in program["macro_cycles"]:
-            for micro_cycle in macro_cycle["micro_cycles"]:
-                week_count += 1
-                if week_count == current_week:
-                    current_phase = macro_cycle["phase_number"]
-                    if current_day <= len(micro_cycle["daily_routines"]) and current_day <= 5:  # Only weekdays
-                        current_routine = micro_cycle["daily_routines"][current_day - 1]
-                    break
-            if current_routine:
-                break
-        
-        if not current_routine:
-            return {"message": "Rest day or program completed", "routine": None}
-        
-        return {
-            "routine": current_routine,
-            "current_week": current_week,
-            "current_day": current_day,
-            "current_phase": current_phase,
-            "program_name": program["program_name"]
-        }
+        schedule = await program_schedule(db, player_id)
+        result = await current_routine(db.periodized_programs, schedule)
+        if result["routine"]:
+            result["routine"] = expand_routine(result["routine"], await catalog_for(db, schedule.get(VERSION_FIELD)))
+        return result
         
     except Exception as e:
         logger.error(f"Error fetching current routine: {e}")
@@ -220,42 +187,52 @@ async def get_current_routine(player_id: str):
             detail="Failed to fetch current routine"
         )
 
+async def find_latest_assessment(player_id: str, detail: str) -> Dict[str, Any]:
+    """Latest assessment for a player, or 404"""
+    assessment = await latest_assessment(db, player_id)
+    if not assessment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    return assessment
+
+async def build_training_program(program: TrainingProgramCreate, assessment: Dict[str, Any]) -> TrainingProgram:
+    """Generate the AI program content and save the training program"""
+    from utils.llm_integration import generate_training_program
+    program_content = await generate_training_program(assessment, week_number=1)
+    
+    # Create training program object
+    training_program = TrainingProgram(
+        player_id=program.player_id,
+        program_type=program.program_type,
+        program_content=program_content,
+        weekly_schedule={},
+        milestones=[],
+        is_group=program.is_group or False,
+        spotify_playlist=program.spotify_playlist
+    )
+    
+    # Save to database
+    program_data = dump_model(training_program)
+    await db.training_programs.insert_one(program_data)
+    
+    logger.info(f"Training program created for player: {program.player_id}")
+    return training_program
+
+def submit_job(kind: str, run) -> Dict[str, Any]:
+    try:
+        return llm_jobs.submit(kind, run)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
 @router.post("/programs", response_model=TrainingProgram)
 async def create_training_program(program: TrainingProgramCreate):
     """Create AI-generated training program (legacy endpoint)"""
     try:
         # Get player's latest assessment for context
-        assessment = await db.assessments.find_one(
-            {"player_name": program.player_id},
-            sort=[("created_at", -1)]
+        assessment = await find_latest_assessment(
+            program.player_id,
+            "No assessment found for player. Please complete assessment first."
         )
-        
-        if not assessment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No assessment found for player. Please complete assessment first."
-            )
-        
-        # Generate AI training program
-        program_content = await generate_training_program(assessment, week_number=1)
-        
-        # Create training program object
-        training_program = TrainingProgram(
-            player_id=program.player_id,
-            program_type=program.program_type,
-            program_content=program_content,
-            weekly_schedule={},
-            milestones=[],
-            is_group=program.is_group or False,
-            spotify_playlist=program.spotify_playlist
-        )
-        
-        # Save to database
-        program_data = prepare_for_mongo(training_program.dict())
-        await db.training_programs.insert_one(program_data)
-        
-        logger.info(f"Training program created for player: {program.player_id}")
-        return training_program
+        return await build_training_program(program, assessment)
         
     except HTTPException:
         raise
@@ -266,15 +243,23 @@ async def create_training_program(program: TrainingProgramCreate):
             detail=f"Failed to create training program: {str(e)}"
         )
 
+@router.post("/programs/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_training_program_job(program: TrainingProgramCreate):
+    """Queue AI training program generation; poll /jobs/{job_id} for the result"""
+    assessment = await find_latest_assessment(
+        program.player_id,
+        "No assessment found for player. Please complete assessment first."
+    )
+    return submit_job("training_program", lambda: build_training_program(program, assessment))
+
 @router.get("/programs/{player_id}", response_model=List[TrainingProgram])
-async def get_player_programs(player_id: str):
+async def get_player_programs(player_id: str, response: Response, page: PageParams = Depends()):
     """Get all training programs for a player"""
     try:
-        programs = await db.training_programs.find(
-            {"player_id": player_id}
-        ).sort("created_at", -1).to_list(1000)
-        
-        return [TrainingProgram(**parse_from_mongo(program)) for program in programs]
+        return await paginate(
+            db.training_programs, {"player_id": player_id}, "created_at", page, response,
+            transform=lambda program: TrainingProgram(**load_document(TrainingProgram, program))
+        )
     except Exception as e:
         logger.error(f"Error fetching player programs: {e}")
         raise HTTPException(
@@ -282,6 +267,27 @@ async def get_player_programs(player_id: str):
             detail="Failed to fetch player programs"
         )
 
+def identify_weaknesses(assessment: Dict[str, Any]) -> List[str]:
+    weaknesses = []
+    if assessment.get("sprint_30m", 10) > 4.5:
+        weaknesses.append("speed")
+    if assessment.get("ball_control", 3) < 4:
+        weaknesses.append("technical")
+    if assessment.get("game_intelligence", 3) < 4:
+        weaknesses.append("tactical")
+    return weaknesses
+
+async def build_adaptive_exercises(player_id: str, phase: str, week_number: int, weaknesses: List[str]) -> Dict[str, Any]:
+    from utils.llm_integration import generate_adaptive_exercises
+    exercises = await generate_adaptive_exercises(weaknesses, phase, week_number)
+    return {
+        "player_id": player_id,
+        "phase": phase,
+        "week_number": week_number,
+        "identified_weaknesses": weaknesses,
+        "adaptive_exercises": exercises
+    }
+
 @router.post("/adaptive-exercises")
 async def get_adaptive_exercises(
     player_id: str,
@@ -291,36 +297,8 @@ async def get_adaptive_exercises(
     """Generate adaptive exercises based on player weaknesses"""
     try:
         # Get player's latest assessment
-        assessment = await db.assessments.find_one(
-            {"player_name": player_id},
-            sort=[("created_at", -1)]
-        )
-        
-        if not assessment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No assessment found for player"
-            )
-        
-        # Identify weaknesses
-        weaknesses = []
-        if assessment.get("sprint_30m", 10) > 4.5:
-            weaknesses.append("speed")
-        if assessment.get("ball_control", 3) < 4:
-            weaknesses.append("technical")
-        if assessment.get("game_intelligence", 3) < 4:
-            weaknesses.append("tactical")
-        
-        # Generate adaptive exercises
-        exercises = await generate_adaptive_exercises(weaknesses, phase, week_number)
-        
-        return {
-            "player_id": player_id,
-            "phase": phase,
-            "week_number": week_number,
-            "identified_weaknesses": weaknesses,
-            "adaptive_exercises": exercises
-        }
+        assessment = await find_latest_assessment(player_id, "No assessment found for player")
+        return await build_adaptive_exercises(player_id, phase, week_number, identify_weaknesses(assessment))
         
     except HTTPException:
         raise
@@ -329,4 +307,26 @@ async def get_adaptive_exercises(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate adaptive exercises"
-        )
\ No newline at end of file
+        )
+
+@router.post("/adaptive-exercises/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_adaptive_exercises_job(
+    player_id: str,
+    phase: str = "development",
+    week_number: int = 1
+):
+    """Queue adaptive exercise generation; poll /jobs/{job_id} for the result"""
+    assessment = await find_latest_assessment(player_id, "No assessment found for player")
+    weaknesses = identify_weaknesses(assessment)
+    return submit_job(
+        "adaptive_exercises",
+        lambda: build_adaptive_exercises(player_id, phase, week_number, weaknesses)
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Get a generation job; with wait > 0 the request is held until the job finishes or the wait expires"""
+    job = await llm_jobs.wait(job_id, wait)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
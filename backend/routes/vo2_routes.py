@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from typing import List, Optional
 import logging
 from models import VO2MaxBenchmark, VO2MaxBenchmarkCreate
-from utils.database import prepare_for_mongo, parse_from_mongo, db
+from utils.database import db
+from utils.converters import dump_model, load_document
+from utils.pagination import PageParams, paginate
+from utils.player_cache import player_cache, latest_vo2_benchmark
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,8 +15,9 @@ async def save_vo2_benchmark(benchmark: VO2MaxBenchmarkCreate):
     """Save a VO2 Max benchmark test result"""
     try:
         benchmark_obj = VO2MaxBenchmark(**benchmark.dict())
-        benchmark_data = prepare_for_mongo(benchmark_obj.dict())
+        benchmark_data = dump_model(benchmark_obj)
         await db.vo2_benchmarks.insert_one(benchmark_data)
+        await player_cache.invalidate(benchmark.player_id)
         
         logger.info(f"VO2 Max benchmark saved for player: {benchmark.player_id}")
         return benchmark_obj
@@ -25,14 +29,13 @@ async def save_vo2_benchmark(benchmark: VO2MaxBenchmarkCreate):
         )
 
 @router.get("/benchmarks/{player_id}", response_model=List[VO2MaxBenchmark])
-async def get_vo2_benchmarks(player_id: str):
+async def get_vo2_benchmarks(player_id: str, response: Response, page: PageParams = Depends()):
     """Get all VO2 Max benchmarks for a player"""
     try:
-        benchmarks = await db.vo2_benchmarks.find(
-            {"player_id": player_id}
-        ).sort("test_date", -1).to_list(1000)
-        
-        return [VO2MaxBenchmark(**parse_from_mongo(benchmark)) for benchmark in benchmarks]
+        return await paginate(
+            db.vo2_benchmarks, {"player_id": player_id}, "test_date", page, response,
+            transform=lambda benchmark: VO2MaxBenchmark(**load_document(VO2MaxBenchmark, benchmark))
+        )
     except Exception as e:
         logger.error(f"Error fetching VO2 benchmarks: {e}")
         raise HTTPException(
@@ -44,13 +47,10 @@ async def get_vo2_benchmarks(player_id: str):
 async def get_latest_vo2_benchmark(player_id: str):
     """Get the latest VO2 Max benchmark for a player"""
     try:
-        benchmark = await db.vo2_benchmarks.find_one(
-            {"player_id": player_id}, 
-            sort=[("test_date", -1)]
-        )
+        benchmark = await latest_vo2_benchmark(db, player_id)
         
         if benchmark:
-            return VO2MaxBenchmark(**parse_from_mongo(benchmark))
+            return VO2MaxBenchmark(**load_document(VO2MaxBenchmark, benchmark))
         return None
     except Exception as e:
         logger.error(f"Error fetching latest VO2 benchmark: {e}")
@@ -63,13 +63,14 @@ async def get_latest_vo2_benchmark(player_id: str):
 async def delete_vo2_benchmark(benchmark_id: str):
     """Delete a specific VO2 Max benchmark"""
     try:
-        result = await db.vo2_benchmarks.delete_one({"id": benchmark_id})
+        deleted = await db.vo2_benchmarks.find_one_and_delete({"id": benchmark_id}, projection={"player_id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Benchmark not found"
             )
+        await player_cache.invalidate(deleted.get("player_id"))
         
         return {"message": "Benchmark deleted successfully"}
     except HTTPException:
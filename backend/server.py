@@ -1,27 +1,66 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+# Time the imports below (and deferred ones at first use) for the startup report
+from utils.startup_report import startup_report
+startup_report.start()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Response, Query, Request, Header, BackgroundTasks
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import random
+from contextlib import asynccontextmanager
+from utils.scoring_kernel import score_assessment
+from utils.indexes import bootstrap_indexes
+from utils.pagination import PageParams, paginate, fetch_page, keyset_sort, NEXT_CURSOR_HEADER
+from utils.database import mongo_date, db
+from utils.db_lifecycle import mongo
+from utils.metrics import metrics, MetricsMiddleware
+from utils import auth_context
+from utils.converters import dump_model, load_document
+from utils.trusted_read import trusted_response, trusted_paginate, serializer_for
+from utils.program_calendar import index_program, current_routine, program_position, phase_for_week
+from utils.player_cache import player_cache, latest_program, program_schedule, latest_vo2_benchmark
+from utils.player_summary import refresh_assessments, record_training_day, record_metrics, record_program
+from utils.llm_jobs import llm_jobs, QueueFullError
+from utils.achievements import record_progress, METRIC_TYPE_PATTERN
+from utils.analytics import improvement_trends
+from utils.notifications import (
+    dispatch_notifications, dispatch_in_background, unread_count, mark_read, mark_all_read,
+    backfill_delivered_at, deliver_scheduled
+)
+from utils.notification_hub import notification_hub, notification_stream, SSE_MEDIA_TYPE
+from utils.scheduler import scheduler, ScheduleSource, SCHEDULER_ENABLED
+from utils.bulk_import import bulk_import, upload_format, TooManyRowsError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled MongoDB client per process (utils/db_lifecycle.py), shared with the routers
+    with startup_report.phase("database"):
+        await mongo.connect()
+        await bootstrap_indexes(db)
+        await backfill_delivered_at(db)
+    if SCHEDULER_ENABLED:
+        await scheduler.start(db)
+    startup_report.log()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await llm_jobs.shutdown()
+        await mongo.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -99,6 +138,7 @@ class RetestSchedule(BaseModel):
     retest_date: datetime
     retest_type: str  # "4_week", "8_week", "seasonal", "custom"
     status: str = Field(default="scheduled")  # "scheduled", "completed", "cancelled"
+    reminded_at: Optional[datetime] = None  # set when the retest-day reminder went out
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class RetestScheduleCreate(BaseModel):
@@ -137,7 +177,7 @@ class ProgressEntry(BaseModel):
 
 class ProgressEntryCreate(BaseModel):
     player_id: str
-    metric_type: str
+    metric_type: str = Field(pattern=METRIC_TYPE_PATTERN)
     metric_name: str
     value: float
 
@@ -174,6 +214,7 @@ class VO2MaxBenchmarkCreate(BaseModel):
 # Enhanced Training Program Models with Periodization
 class Exercise(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    exercise_key: Optional[str] = None  # Key in the exercise catalog, None for AI generated exercises
     name: str
     category: str  # "speed", "technical", "tactical", "physical", "psychological"
     description: str  # What the exercise is
@@ -336,6 +377,8 @@ class Notification(BaseModel):
     spotify_link: Optional[str] = None
     is_read: bool = Field(default=False)
     scheduled_at: Optional[datetime] = None
+    dedupe_key: Optional[str] = None  # repeated notifications with the same key are dropped
+    delivered_at: Optional[datetime] = None  # unset until a scheduled notification is due
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class NotificationCreate(BaseModel):
@@ -346,254 +389,34 @@ class NotificationCreate(BaseModel):
     spotify_link: Optional[str] = None
     scheduled_at: Optional[datetime] = None
 
-# Youth Handbook Assessment Standards and Evaluation
-YOUTH_HANDBOOK_STANDARDS = {
-    "12-14": {
-        "sprint_30m": {"excellent": 4.5, "good": 4.7, "average": 4.9, "poor": 5.0},
-        "yo_yo_test": {"excellent": 1200, "good": 1000, "average": 900, "poor": 800},
-        "vo2_max": {"excellent": 52, "good": 50, "average": 49, "poor": 48},
-        "vertical_jump": {"excellent": 40, "good": 35, "average": 32, "poor": 30},
-        "body_fat": {"excellent": 12, "good": 15, "average": 16, "poor": 18},
-        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "passing_accuracy": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
-        "dribbling_success": {"excellent": 55, "good": 50, "average": 45, "poor": 40},
-        "shooting_accuracy": {"excellent": 60, "good": 55, "average": 50, "poor": 45},
-        "defensive_duels": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
-        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
-    },
-    "15-16": {
-        "sprint_30m": {"excellent": 4.2, "good": 4.4, "average": 4.6, "poor": 4.7},
-        "yo_yo_test": {"excellent": 1600, "good": 1400, "average": 1300, "poor": 1200},
-        "vo2_max": {"excellent": 56, "good": 54, "average": 53, "poor": 52},
-        "vertical_jump": {"excellent": 50, "good": 45, "average": 42, "poor": 40},
-        "body_fat": {"excellent": 10, "good": 12, "average": 14, "poor": 15},
-        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "passing_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
-        "dribbling_success": {"excellent": 65, "good": 60, "average": 55, "poor": 50},
-        "shooting_accuracy": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
-        "defensive_duels": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
-        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
-    },
-    "17-18": {
-        "sprint_30m": {"excellent": 4.0, "good": 4.2, "average": 4.4, "poor": 4.5},
-        "yo_yo_test": {"excellent": 2000, "good": 1800, "average": 1700, "poor": 1600},
-        "vo2_max": {"excellent": 60, "good": 58, "average": 57, "poor": 56},
-        "vertical_jump": {"excellent": 60, "good": 55, "average": 52, "poor": 50},
-        "body_fat": {"excellent": 8, "good": 10, "average": 11, "poor": 12},
-        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "passing_accuracy": {"excellent": 90, "good": 85, "average": 80, "poor": 75},
-        "dribbling_success": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
-        "shooting_accuracy": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
-        "defensive_duels": {"excellent": 80, "good": 75, "average": 70, "poor": 65},
-        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
-    },
-    "elite": {
-        "sprint_30m": {"excellent": 3.8, "good": 3.9, "average": 4.0, "poor": 4.1},
-        "yo_yo_test": {"excellent": 2400, "good": 2300, "average": 2200, "poor": 2100},
-        "vo2_max": {"excellent": 65, "good": 62, "average": 60, "poor": 58},
-        "vertical_jump": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
-        "body_fat": {"excellent": 6, "good": 8, "average": 9, "poor": 10},
-        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "passing_accuracy": {"excellent": 95, "good": 90, "average": 85, "poor": 80},
-        "dribbling_success": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
-        "shooting_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
-        "defensive_duels": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
-        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
-        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
-    }
-}
-
-ASSESSMENT_WEIGHTS = {
-    "technical": 0.40,     # 40%
-    "tactical": 0.30,      # 30%
-    "physical": 0.20,      # 20%
-    "psychological": 0.10  # 10%
-}
-
-def get_age_category(age: int) -> str:
-    """Get age category based on Youth Handbook standards"""
-    if age >= 12 and age <= 14:
-        return "12-14"
-    elif age >= 15 and age <= 16:
-        return "15-16"
-    elif age >= 17 and age <= 18:
-        return "17-18"
-    else:
-        return "elite"
-
-def evaluate_performance(value: float, metric: str, age_category: str) -> str:
-    """Evaluate performance level based on handbook standards"""
-    standards = YOUTH_HANDBOOK_STANDARDS.get(age_category, {}).get(metric)
-    if not standards:
-        return "average"
-    
-    excellent, good, average, poor = standards["excellent"], standards["good"], standards["average"], standards["poor"]
-    
-    # Lower is better for these metrics
-    lower_is_better = ["sprint_30m", "body_fat"]
-    
-    if metric in lower_is_better:
-        if value <= excellent:
-            return "excellent"
-        elif value <= good:
-            return "good"
-        elif value <= average:
-            return "average"
-        else:
-            return "poor"
-    else:
-        # Higher is better for all other metrics
-        if value >= excellent:
-            return "excellent"
-        elif value >= good:
-            return "good"
-        elif value >= average:
-            return "average"
-        else:
-            return "poor"
-
+# Youth Handbook Assessment Scoring (shared kernel, see utils/scoring_kernel.py)
 def calculate_assessment_scores(assessment_data: dict, age: int) -> dict:
     """Calculate comprehensive assessment scores based on Youth Handbook weighting"""
-    age_category = get_age_category(age)
-    
-    # Define metric categories
-    physical_metrics = ["sprint_30m", "yo_yo_test", "vo2_max", "vertical_jump", "body_fat"]
-    technical_metrics = ["ball_control", "passing_accuracy", "dribbling_success", "shooting_accuracy", "defensive_duels"]
-    tactical_metrics = ["game_intelligence", "positioning", "decision_making"]
-    psychological_metrics = ["coachability", "mental_toughness"]
-    
-    score_map = {"excellent": 5, "good": 4, "average": 3, "poor": 2}
-    
-    def calculate_category_score(metrics):
-        total_score = 0
-        valid_metrics = 0
-        
-        for metric in metrics:
-            value = assessment_data.get(metric)
-            if value is not None:
-                performance = evaluate_performance(value, metric, age_category)
-                total_score += score_map.get(performance, 3)
-                valid_metrics += 1
-        
-        return total_score / valid_metrics if valid_metrics > 0 else 3
-    
-    # Calculate category scores
-    physical_score = calculate_category_score(physical_metrics)
-    technical_score = calculate_category_score(technical_metrics)
-    tactical_score = calculate_category_score(tactical_metrics)
-    psychological_score = calculate_category_score(psychological_metrics)
-    
-    # Calculate weighted overall score
-    overall_score = (
-        physical_score * ASSESSMENT_WEIGHTS["physical"] +
-        technical_score * ASSESSMENT_WEIGHTS["technical"] +
-        tactical_score * ASSESSMENT_WEIGHTS["tactical"] +
-        psychological_score * ASSESSMENT_WEIGHTS["psychological"]
-    )
-    
+    scores = score_assessment(assessment_data, age)
     return {
-        "overall": round(overall_score, 2),
-        "physical": round(physical_score, 2),
-        "technical": round(technical_score, 2),
-        "tactical": round(tactical_score, 2),
-        "psychological": round(psychological_score, 2)
+        "overall": scores["overall_rating"],
+        **scores["category_ratings"]
     }
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-    return data
-
-# Helper function to parse data from MongoDB
-def parse_from_mongo(item):
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and key.endswith('_at'):
-                try:
-                    item[key] = datetime.fromisoformat(value)
-                except:
-                    pass
-    return item
 
 # Achievement System
 async def check_and_award_achievements(player_id: str, progress_entry: ProgressEntry) -> List[Trophy]:
     """Check for achievements and award trophies and coins"""
-    trophies_awarded = []
-    
-    # Get player's progress history
-    progress_history = await db.progress.find({"player_id": player_id}).to_list(1000)
-    existing_trophies = await db.trophies.find({"player_id": player_id}).to_list(1000)
-    existing_trophy_types = [trophy["trophy_type"] for trophy in existing_trophies]
-    
-    # Speed Achievement
-    if progress_entry.metric_type == "speed" and "speed_master" not in existing_trophy_types:
-        if progress_entry.value <= 4.0:  # Under 4 seconds for 40m
-            trophy = Trophy(
+    trophies, player_name = await record_progress(db, player_id, progress_entry.metric_type, progress_entry.value)
+    if trophies:
+        # total_coins changed on the assessment, which is also cached by player_name
+        await player_cache.invalidate(player_id, player_name)
+        # Stored like any notification, so open streams get it and reconnects replay it
+        await dispatch_notifications(db, [
+            dump_model(Notification(
                 player_id=player_id,
-                trophy_name="سيد السرعة",
-                trophy_type="speed_master",
-                description="حقق وقت أقل من 4 ثوان في عدو 40 متر",
-                coins_reward=200,
-                icon="🏃‍♂️"
-            )
-            trophies_awarded.append(trophy)
-    
-    # Consistency Achievement
-    speed_entries = [p for p in progress_history if p.get("metric_type") == "speed"]
-    if len(speed_entries) >= 5 and "consistency_king" not in existing_trophy_types:
-        trophy = Trophy(
-            player_id=player_id,
-            trophy_name="ملك الثبات",
-            trophy_type="consistency_king",
-            description="سجل 5 إدخالات تقدم في السرعة",
-            coins_reward=150,
-            icon="👑"
-        )
-        trophies_awarded.append(trophy)
-    
-    # Fire Boy Special Achievement
-    if progress_entry.metric_type == "ball_handling" and progress_entry.value >= 95 and "fire_boy" not in existing_trophy_types:
-        trophy = Trophy(
-            player_id=player_id,
-            trophy_name="يويو الفتى الناري",
-            trophy_type="fire_boy",
-            description="حقق دقة 95% أو أكثر في التحكم بالكرة",
-            coins_reward=500,
-            icon="🔥"
-        )
-        trophies_awarded.append(trophy)
-    
-    # Save trophies and update coins
-    total_coins_earned = 0
-    for trophy in trophies_awarded:
-        trophy_data = prepare_for_mongo(trophy.dict())
-        await db.trophies.insert_one(trophy_data)
-        total_coins_earned += trophy.coins_reward
-    
-    # Update player coins
-    if total_coins_earned > 0:
-        await db.assessments.update_one(
-            {"id": player_id},
-            {"$inc": {"total_coins": total_coins_earned}}
-        )
-    
-    return trophies_awarded
+                title=f"{trophy['icon']} {trophy['trophy_name']}",
+                message=trophy["description"],
+                notification_type="achievement",
+                dedupe_key=f"trophy:{trophy['id']}"
+            ))
+            for trophy in trophies
+        ])
+    return [Trophy(**trophy) for trophy in trophies]
 
 # Enhanced Weekly Progress Tracking
 class WeeklyProgress(BaseModel):
@@ -684,17 +507,12 @@ def adjust_exercises_based_on_progress(player_assessment: dict, weekly_progress_
 # Enhanced AI Training Program Generator with Weekly Adaptation
 async def generate_adaptive_training_program(assessment: PlayerAssessment, week_number: int = 1, progress_history: List[dict] = None) -> str:
     """Generate training program that adapts based on weekly progress"""
+    # The LLM integration loads on the first generation, not at worker start
+    from utils.llm_integration import create_chat, user_message, prompt_inputs
     try:
         # Get dynamic exercise adjustments
         exercise_adjustment = adjust_exercises_based_on_progress(assessment.dict(), progress_history or [])
         
-        # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
-            session_id=f"training_{assessment.id}_week_{week_number}",
-            system_message="أنت مدرب يويو الفتى الناري النخبوي، خبير تدريب كرة قدم محترف ومتقدم. أنشئ برامج تدريبية نخبوية قابلة للتكيف حسب التقدم الأسبوعي. يجب أن تجيب باللغة العربية فقط مع طاقة عالية وحماس نخبوي."
-        ).with_model("openai", "gpt-4o")
-
         # Create comprehensive assessment summary
         assessment_text = f"""
         بيانات تقييم يويو الفتى الناري النخبوي:
@@ -757,9 +575,25 @@ async def generate_adaptive_training_program(assessment: PlayerAssessment, week_
         يجب أن يكون الرد باللغة العربية فقط ومناسب ليويو الفتى الناري النخبوي!
         """
 
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        return response
+        async def request_program() -> str:
+            # Only built on a cache miss
+            chat = create_chat(
+                session_id=f"training_{assessment.id}_week_{week_number}",
+                system_message="أنت مدرب يويو الفتى الناري النخبوي، خبير تدريب كرة قدم محترف ومتقدم. أنشئ برامج تدريبية نخبوية قابلة للتكيف حسب التقدم الأسبوعي. يجب أن تجيب باللغة العربية فقط مع طاقة عالية وحماس نخبوي."
+            )
+            return await chat.send_message(user_message(prompt))
+
+        return await llm_jobs.generate(
+            "adaptive_training_program",
+            prompt_inputs(
+                assessment.dict(),
+                level=assessment.level,
+                overall_score=assessment.overall_score,
+                week_number=week_number,
+                exercise_adjustment=exercise_adjustment
+            ),
+            request_program
+        )
 
     except Exception as e:
         logging.error(f"خطأ في إنشاء البرنامج التدريبي التكيفي: {e}")
@@ -767,14 +601,8 @@ async def generate_adaptive_training_program(assessment: PlayerAssessment, week_
 
 # AI Training Program Generator in Arabic
 async def generate_ai_training_program(assessment: PlayerAssessment) -> str:
+    from utils.llm_integration import create_chat, user_message, prompt_inputs
     try:
-        # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
-            session_id=f"training_{assessment.id}",
-            system_message="أنت مدرب يويو الفتى الناري، خبير تدريب كرة قدم محترف ومحفز. أنشئ برامج تدريبية ممتعة ومحفزة للشباب. يجب أن تجيب باللغة العربية فقط مع طاقة عالية وحماس."
-        ).with_model("openai", "gpt-4o")
-
         # Create assessment summary in Arabic using Youth Handbook fields
         assessment_text = f"""
         بيانات تقييم يويو الفتى الناري:
@@ -827,20 +655,34 @@ async def generate_ai_training_program(assessment: PlayerAssessment) -> str:
         يجب أن يكون الرد باللغة العربية فقط ومناسب ليويو الفتى الناري الشجاع!
         """
 
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        return response
+        async def request_program() -> str:
+            # Only built on a cache miss
+            chat = create_chat(
+                session_id=f"training_{assessment.id}",
+                system_message="أنت مدرب يويو الفتى الناري، خبير تدريب كرة قدم محترف ومحفز. أنشئ برامج تدريبية ممتعة ومحفزة للشباب. يجب أن تجيب باللغة العربية فقط مع طاقة عالية وحماس."
+            )
+            return await chat.send_message(user_message(prompt))
+
+        return await llm_jobs.generate(
+            "ai_training_program",
+            prompt_inputs(
+                assessment.dict(),
+                level=assessment.level,
+                total_coins=assessment.total_coins,
+                overall_score=assessment.overall_score
+            ),
+            request_program
+        )
 
     except Exception as e:
         logging.error(f"خطأ في إنشاء برنامج التدريب بالذكاء الاصطناعي: {e}")
         return "خطأ في إنشاء برنامج التدريب. يرجى المحاولة مرة أخرى."
     try:
         # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=os.environ.get('EMERGENT_LLM_KEY'),
+        chat = create_chat(
             session_id=f"training_{assessment.id}",
             system_message="أنت مدرب يويو الفتى الناري، خبير تدريب كرة قدم محترف ومحفز. أنشئ برامج تدريبية ممتعة ومحفزة للشباب. يجب أن تجيب باللغة العربية فقط مع طاقة عالية وحماس."
-        ).with_model("openai", "gpt-4o")
+        )
 
         # Create assessment summary in Arabic using Youth Handbook fields
         assessment_text = f"""
@@ -894,9 +736,7 @@ async def generate_ai_training_program(assessment: PlayerAssessment) -> str:
         يجب أن يكون الرد باللغة العربية فقط ومناسب ليويو الفتى الناري الشجاع!
         """
 
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        return response
+        return await chat.send_message(user_message(prompt))
 
     except Exception as e:
         logging.error(f"خطأ في إنشاء برنامج التدريب بالذكاء الاصطناعي: {e}")
@@ -923,33 +763,74 @@ async def create_assessment(assessment: AssessmentCreate):
         }
         
         assessment_obj = PlayerAssessment(**assessment_dict)
-        assessment_data = prepare_for_mongo(assessment_obj.dict())
+        assessment_data = dump_model(assessment_obj)
         await db.assessments.insert_one(assessment_data)
+        await player_cache.invalidate(assessment_obj.player_name, assessment_obj.id)
+        await refresh_assessments(db, assessment_obj.player_name)
         return assessment_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_scored_assessments(assessments: List[AssessmentCreate]) -> List[dict]:
+    """Score a batch of validated rows and build their documents"""
+    from utils.batch_scoring import rate_records
+
+    rows = [assessment.dict() for assessment in assessments]
+    documents = []
+    # Same ratings as calculate_assessment_scores, graded a column at a time
+    for assessment_dict, scores in zip(rows, rate_records(rows)):
+        assessment_dict["overall_score"] = scores.pop("overall")
+        assessment_dict["category_scores"] = scores
+        documents.append(dump_model(PlayerAssessment(**assessment_dict)))
+    return documents
+
+@api_router.post("/assessments/bulk", response_model=Dict[str, Any])
+async def bulk_import_assessments(request: Request):
+    """Import a squad from a CSV (text/csv) or NDJSON (application/x-ndjson) request body"""
+    fmt = upload_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson)")
+    imported_players = set()
+    imported_ids = set()
+
+    def build_documents(assessments: List[AssessmentCreate]) -> List[dict]:
+        documents = build_scored_assessments(assessments)
+        imported_players.update(doc["player_name"] for doc in documents)
+        imported_ids.update(doc["id"] for doc in documents)
+        return documents
+
+    try:
+        try:
+            return await bulk_import(db.assessments, request.stream(), fmt, AssessmentCreate, build_documents)
+        finally:
+            await player_cache.invalidate_many(imported_players | imported_ids)
+            await refresh_assessments(db, *imported_players)
+    except TooManyRowsError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/assessments", response_model=List[PlayerAssessment])
-async def get_assessments(user_id: Optional[str] = None):
+async def get_assessments(response: Response, user_id: Optional[str] = None, page: PageParams = Depends()):
     try:
         query = {}
         if user_id:
             query["user_id"] = user_id
-            
-        assessments = await db.assessments.find(query).to_list(1000)
-        valid_assessments = []
-        
-        for assessment in assessments:
+
+        def to_assessment(assessment):
             try:
                 # Only include assessments that have the new Youth Handbook fields
-                parsed_assessment = parse_from_mongo(assessment)
+                parsed_assessment = load_document(PlayerAssessment, assessment)
                 if all(field in parsed_assessment for field in ['sprint_30m', 'yo_yo_test', 'vo2_max', 'ball_control', 'game_intelligence', 'coachability']):
-                    valid_assessments.append(PlayerAssessment(**parsed_assessment))
+                    return PlayerAssessment(**parsed_assessment)
             except Exception as e:
                 # Skip assessments that don't match the new format
-                continue
-                
-        return valid_assessments
+                pass
+            return None
+
+        return await paginate(db.assessments, query, "created_at", page, response, transform=to_assessment)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -959,40 +840,32 @@ async def get_assessment(player_id: str):
         assessment = await db.assessments.find_one({"id": player_id})
         if not assessment:
             raise HTTPException(status_code=404, detail="لم يتم العثور على تقييم يويو")
-        return PlayerAssessment(**parse_from_mongo(assessment))
+        return PlayerAssessment(**load_document(PlayerAssessment, assessment))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/training-programs", response_model=TrainingProgram)
-async def create_training_program(program: TrainingProgramCreate):
-    try:
-        # Get player assessment
-        assessment = await db.assessments.find_one({"id": program.player_id})
-        if not assessment:
-            raise HTTPException(status_code=404, detail="لم يتم العثور على تقييم يويو")
-        
-        assessment_obj = PlayerAssessment(**parse_from_mongo(assessment))
-        
-        # Generate program content based on type
-        if program.program_type == "AI_Generated":
-            program_content = await generate_ai_training_program(assessment_obj)
-            weekly_schedule = {
-                "Monday": "تدريب السرعة الناري 🔥",
-                "Tuesday": "تحدي التحكم بالكرة ⚽",
-                "Wednesday": "يوم المرونة والتعافي 🧘‍♂️",
-                "Thursday": "مهارات يويو الفنية ✨",
-                "Friday": "معركة محاكاة المباراة ⚔️",
-                "Saturday": "تحدي نقاط الضعف 💪",
-                "Sunday": "يوم راحة المحارب 😴"
-            }
-            milestones = [
-                {"week": 2, "target": "فتح إنجاز السرعة الأولى 🏃‍♂️", "coins": 50},
-                {"week": 4, "target": "كسب لقب محارب الرشاقة ⚡", "coins": 100},
-                {"week": 6, "target": "إتقان مهارات يويو الناري 🔥", "coins": 150},
-                {"week": 8, "target": "أن تصبح أسطورة يويو 👑", "coins": 300}
-            ]
-        elif program.program_type == "Ronaldo_Template":
-            program_content = """
+async def build_training_program(program: TrainingProgramCreate, assessment_obj: PlayerAssessment) -> TrainingProgram:
+    """Build the program content for its type and save the training program"""
+    # Generate program content based on type
+    if program.program_type == "AI_Generated":
+        program_content = await generate_ai_training_program(assessment_obj)
+        weekly_schedule = {
+            "Monday": "تدريب السرعة الناري 🔥",
+            "Tuesday": "تحدي التحكم بالكرة ⚽",
+            "Wednesday": "يوم المرونة والتعافي 🧘‍♂️",
+            "Thursday": "مهارات يويو الفنية ✨",
+            "Friday": "معركة محاكاة المباراة ⚔️",
+            "Saturday": "تحدي نقاط الضعف 💪",
+            "Sunday": "يوم راحة المحارب 😴"
+        }
+        milestones = [
+            {"week": 2, "target": "فتح إنجاز السرعة الأولى 🏃‍♂️", "coins": 50},
+            {"week": 4, "target": "كسب لقب محارب الرشاقة ⚡", "coins": 100},
+            {"week": 6, "target": "إتقان مهارات يويو الناري 🔥", "coins": 150},
+            {"week": 8, "target": "أن تصبح أسطورة يويو 👑", "coins": 300}
+        ]
+    elif program.program_type == "Ronaldo_Template":
+        program_content = """
             🔥 برنامج يويو الفتى الناري المستوحى من رونالدو الأسطورة! 🔥
             
             هذا البرنامج الناري مبني على أسرار تدريب رونالدو:
@@ -1025,47 +898,64 @@ async def create_training_program(program: TrainingProgramCreate):
             - قوة التصور الذهني الفولاذية 🧠
             - تحسين التعافي الذهبي ✨
             """
-            weekly_schedule = {
-                "Monday": "يوم القوة والسرعة الناري 🔥",
-                "Tuesday": "تحدي المهارات الفنية ✨",
-                "Wednesday": "يوم العضلات الأساسية والمرونة 💪",
-                "Thursday": "إتقان سحر الكرة ⚽",
-                "Friday": "الإعداد الناري للمعركة ⚔️",
-                "Saturday": "يوم المجد والمنافسة 🏆",
-                "Sunday": "التعافي الذهبي للمحارب ✨"
-            }
-            milestones = [
-                {"week": 2, "target": "إتقان 1000 لمسة سحرية ⚽", "coins": 100},
-                {"week": 4, "target": "تحطيم الرقم القياسي في العدو ⚡", "coins": 150},
-                {"week": 6, "target": "إتقان 80% من الضربات الحرة 🎯", "coins": 200},
-                {"week": 8, "target": "أن تصبح أسطورة مثل رونالدو 👑", "coins": 500}
-            ]
-        else:
-            program_content = "برنامج تدريب يويو المخصص سيتم تحديده قريباً! 🔥"
-            weekly_schedule = {}
-            milestones = []
+        weekly_schedule = {
+            "Monday": "يوم القوة والسرعة الناري 🔥",
+            "Tuesday": "تحدي المهارات الفنية ✨",
+            "Wednesday": "يوم العضلات الأساسية والمرونة 💪",
+            "Thursday": "إتقان سحر الكرة ⚽",
+            "Friday": "الإعداد الناري للمعركة ⚔️",
+            "Saturday": "يوم المجد والمنافسة 🏆",
+            "Sunday": "التعافي الذهبي للمحارب ✨"
+        }
+        milestones = [
+            {"week": 2, "target": "إتقان 1000 لمسة سحرية ⚽", "coins": 100},
+            {"week": 4, "target": "تحطيم الرقم القياسي في العدو ⚡", "coins": 150},
+            {"week": 6, "target": "إتقان 80% من الضربات الحرة 🎯", "coins": 200},
+            {"week": 8, "target": "أن تصبح أسطورة مثل رونالدو 👑", "coins": 500}
+        ]
+    else:
+        program_content = "برنامج تدريب يويو المخصص سيتم تحديده قريباً! 🔥"
+        weekly_schedule = {}
+        milestones = []
+
+    program_obj = TrainingProgram(
+        player_id=program.player_id,
+        program_type=program.program_type,
+        program_content=program_content,
+        weekly_schedule=weekly_schedule,
+        milestones=milestones,
+        is_group=program.is_group or False,
+        spotify_playlist=program.spotify_playlist
+    )
+    
+    program_data = dump_model(program_obj)
+    await db.training_programs.insert_one(program_data)
+    return program_obj
 
-        program_obj = TrainingProgram(
-            player_id=program.player_id,
-            program_type=program.program_type,
-            program_content=program_content,
-            weekly_schedule=weekly_schedule,
-            milestones=milestones,
-            is_group=program.is_group or False,
-            spotify_playlist=program.spotify_playlist
-        )
-        
-        program_data = prepare_for_mongo(program_obj.dict())
-        await db.training_programs.insert_one(program_data)
-        return program_obj
+@api_router.post("/training-programs", response_model=TrainingProgram)
+async def create_training_program(program: TrainingProgramCreate):
+    try:
+        # Get player assessment
+        assessment_obj = await get_assessment_or_404(program.player_id)
+        return await build_training_program(program, assessment_obj)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/training-programs/jobs", status_code=202)
+async def submit_training_program_job(program: TrainingProgramCreate):
+    """Queue training program creation; poll /training-programs/jobs/{job_id} for the result"""
+    assessment_obj = await get_assessment_or_404(program.player_id)
+    try:
+        return llm_jobs.submit("training_program", lambda: build_training_program(program, assessment_obj))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 @api_router.get("/training-programs/{player_id}", response_model=List[TrainingProgram])
-async def get_training_programs(player_id: str):
+async def get_training_programs(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        programs = await db.training_programs.find({"player_id": player_id}).to_list(1000)
-        return [TrainingProgram(**parse_from_mongo(program)) for program in programs]
+        return await trusted_paginate(
+            db.training_programs, {"player_id": player_id}, "created_at", page, response, TrainingProgram
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1076,7 +966,7 @@ async def add_progress_entry(progress: ProgressEntryCreate):
         coins_earned = random.randint(10, 50)  # Base coins
         
         progress_obj = ProgressEntry(**progress.dict(), coins_earned=coins_earned)
-        progress_data = prepare_for_mongo(progress_obj.dict())
+        progress_data = dump_model(progress_obj)
         await db.progress.insert_one(progress_data)
         
         # Check for achievements
@@ -1092,18 +982,28 @@ async def add_progress_entry(progress: ProgressEntryCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/progress/{player_id}", response_model=List[ProgressEntry])
-async def get_progress(player_id: str):
+async def get_progress(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        progress_entries = await db.progress.find({"player_id": player_id}).sort("date", -1).to_list(1000)
-        return [ProgressEntry(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await trusted_paginate(db.progress, {"player_id": player_id}, "date", page, response, ProgressEntry)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/trophies/{player_id}", response_model=List[Trophy])
-async def get_player_trophies(player_id: str):
+async def get_player_trophies(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        trophies = await db.trophies.find({"player_id": player_id}).sort("unlocked_at", -1).to_list(1000)
-        return [Trophy(**parse_from_mongo(trophy)) for trophy in trophies]
+        to_trophy = lambda trophy: Trophy(**load_document(Trophy, trophy))
+        if page.after is not None or page.stream:
+            return await paginate(db.trophies, {"player_id": player_id}, "unlocked_at", page, response, transform=to_trophy)
+
+        # First page, polled by the dashboards
+        trophies, next_cursor = await player_cache.get_or_load(
+            "trophies", player_id,
+            lambda: fetch_page(db.trophies, {"player_id": player_id}, "unlocked_at", page),
+            variant=page.limit
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return [to_trophy(trophy) for trophy in trophies]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1112,35 +1012,37 @@ async def get_player_trophies(player_id: str):
 async def create_weekly_progress(progress: WeeklyProgressCreate):
     try:
         progress_obj = WeeklyProgress(**progress.dict())
-        progress_data = prepare_for_mongo(progress_obj.dict())
+        progress_data = dump_model(progress_obj)
         await db.weekly_progress.insert_one(progress_data)
         return progress_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/weekly-progress/{player_id}", response_model=List[WeeklyProgress])
-async def get_weekly_progress(player_id: str):
+async def get_weekly_progress(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        progress_entries = await db.weekly_progress.find({"player_id": player_id}).sort("created_at", -1).to_list(1000)
-        return [WeeklyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await trusted_paginate(
+            db.weekly_progress, {"player_id": player_id}, "created_at", page, response, WeeklyProgress
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/weekly-progress/{player_id}/{program_id}", response_model=List[WeeklyProgress])
-async def get_weekly_progress_by_program(player_id: str, program_id: str):
+async def get_weekly_progress_by_program(
+    player_id: str, program_id: str, response: Response, page: PageParams = Depends()
+):
     try:
-        progress_entries = await db.weekly_progress.find({
-            "player_id": player_id, 
-            "program_id": program_id
-        }).sort("week_number", 1).to_list(1000)
-        return [WeeklyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await trusted_paginate(
+            db.weekly_progress, {"player_id": player_id, "program_id": program_id}, "week_number",
+            page, response, WeeklyProgress, direction=1
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/weekly-progress/{progress_id}", response_model=WeeklyProgress)
 async def update_weekly_progress(progress_id: str, progress_update: WeeklyProgressCreate):
     try:
-        update_data = prepare_for_mongo(progress_update.dict())
+        update_data = dump_model(progress_update)
         result = await db.weekly_progress.update_one(
             {"id": progress_id},
             {"$set": update_data}
@@ -1149,11 +1051,45 @@ async def update_weekly_progress(progress_id: str, progress_update: WeeklyProgre
             raise HTTPException(status_code=404, detail="Weekly progress not found")
         
         updated_progress = await db.weekly_progress.find_one({"id": progress_id})
-        return WeeklyProgress(**parse_from_mongo(updated_progress))
+        return WeeklyProgress(**load_document(WeeklyProgress, updated_progress))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Enhanced Training Program Generation with Weekly Adaptation
+# Weeks of progress history the adaptive program averages over
+ADAPTIVE_HISTORY_WEEKS = 52
+
+async def recent_weekly_progress(player_id: str) -> List[Dict[str, Any]]:
+    return await db.weekly_progress.find({"player_id": player_id}).sort(
+        keyset_sort("created_at")
+    ).limit(ADAPTIVE_HISTORY_WEEKS).to_list(ADAPTIVE_HISTORY_WEEKS)
+
+async def get_assessment_or_404(player_id: str) -> PlayerAssessment:
+    assessment = await db.assessments.find_one({"id": player_id})
+    if not assessment:
+        raise HTTPException(status_code=404, detail="لم يتم العثور على تقييم يويو")
+    return PlayerAssessment(**load_document(PlayerAssessment, assessment))
+
+async def build_adaptive_program(assessment_obj: PlayerAssessment, player_id: str, week_number: int) -> Dict[str, Any]:
+    # Get weekly progress history
+    progress_history = await recent_weekly_progress(player_id)
+    progress_history_dicts = [load_document(WeeklyProgress, p) for p in progress_history]
+    
+    # Generate adaptive program
+    program_content = await generate_adaptive_training_program(
+        assessment_obj, 
+        week_number, 
+        progress_history_dicts
+    )
+    
+    return {
+        "program_content": program_content,
+        "week_number": week_number,
+        "player_id": player_id,
+        "adaptation_level": "نخبوي متقدم",
+        "message": f"تم إنشاء برنامج تدريبي نخبوي للأسبوع {week_number}! 🔥👑"
+    }
+
 @api_router.post("/training-programs/adaptive", response_model=Dict[str, Any])
 async def create_adaptive_training_program(request: Dict[str, Any]):
     try:
@@ -1161,67 +1097,69 @@ async def create_adaptive_training_program(request: Dict[str, Any]):
         week_number = request.get("week_number", 1)
         
         # Get player assessment
-        assessment = await db.assessments.find_one({"id": player_id})
-        if not assessment:
-            raise HTTPException(status_code=404, detail="لم يتم العثور على تقييم يويو")
-        
-        assessment_obj = PlayerAssessment(**parse_from_mongo(assessment))
-        
-        # Get weekly progress history
-        progress_history = await db.weekly_progress.find({"player_id": player_id}).to_list(1000)
-        progress_history_dicts = [parse_from_mongo(p) for p in progress_history]
-        
-        # Generate adaptive program
-        program_content = await generate_adaptive_training_program(
-            assessment_obj, 
-            week_number, 
-            progress_history_dicts
-        )
-        
-        return {
-            "program_content": program_content,
-            "week_number": week_number,
-            "player_id": player_id,
-            "adaptation_level": "نخبوي متقدم",
-            "message": f"تم إنشاء برنامج تدريبي نخبوي للأسبوع {week_number}! 🔥👑"
-        }
+        assessment_obj = await get_assessment_or_404(player_id)
+        return await build_adaptive_program(assessment_obj, player_id, week_number)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/training-programs/adaptive/jobs", status_code=202)
+async def submit_adaptive_training_program_job(request: Dict[str, Any]):
+    """Queue adaptive program generation; poll /training-programs/jobs/{job_id} for the result"""
+    player_id = request.get("player_id")
+    week_number = request.get("week_number", 1)
+    assessment_obj = await get_assessment_or_404(player_id)
+    try:
+        return llm_jobs.submit(
+            "adaptive_training_program",
+            lambda: build_adaptive_program(assessment_obj, player_id, week_number)
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@api_router.get("/training-programs/jobs/{job_id}")
+async def get_training_program_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Get a generation job; with wait > 0 the request is held until the job finishes or the wait expires"""
+    job = await llm_jobs.wait(job_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @api_router.post("/group-training", response_model=GroupTraining)
-async def create_group_training(group: GroupTrainingCreate):
+async def create_group_training(group: GroupTrainingCreate, background_tasks: BackgroundTasks):
     try:
         group_obj = GroupTraining(**group.dict())
-        group_data = prepare_for_mongo(group_obj.dict())
+        group_data = dump_model(group_obj)
         await db.group_trainings.insert_one(group_data)
         
-        # Send invitations to members
-        for member_id in group.invited_members:
-            notification = Notification(
+        # Send invitations to members after responding
+        notifications = [
+            dump_model(Notification(
                 player_id=member_id,
                 title="دعوة للتدريب الجماعي! 🔥",
                 message=f"يويو يدعوك للانضمام إلى '{group.training_name}'",
                 notification_type="group",
-                spotify_link=group.spotify_playlist
-            )
-            notification_data = prepare_for_mongo(notification.dict())
-            await db.notifications.insert_one(notification_data)
+                spotify_link=group.spotify_playlist,
+                dedupe_key=f"group:{group_obj.id}"
+            ))
+            for member_id in group.invited_members
+        ]
+        background_tasks.add_task(dispatch_in_background, db, notifications)
             
         return group_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/group-training/{player_id}", response_model=List[GroupTraining])
-async def get_group_trainings(player_id: str):
+async def get_group_trainings(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        groups = await db.group_trainings.find({
+        query = {
             "$or": [
                 {"creator_id": player_id},
                 {"members": player_id},
                 {"invited_members": player_id}
             ]
-        }).to_list(1000)
-        return [GroupTraining(**parse_from_mongo(group)) for group in groups]
+        }
+        return await trusted_paginate(db.group_trainings, query, "created_at", page, response, GroupTraining)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1229,52 +1167,92 @@ async def get_group_trainings(player_id: str):
 async def create_notification(notification: NotificationCreate):
     try:
         notification_obj = Notification(**notification.dict())
-        notification_data = prepare_for_mongo(notification_obj.dict())
-        await db.notifications.insert_one(notification_data)
+        notification_data = dump_model(notification_obj)
+        await dispatch_notifications(db, [notification_data])
+        scheduler.schedule("notifications", notification_data)
         return notification_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/notifications/{player_id}", response_model=List[Notification])
-async def get_notifications(player_id: str):
+async def get_notifications(player_id: str, response: Response, page: PageParams = Depends()):
+    try:
+        # Delivered ones only, newest delivery first; scheduled ones appear when the scheduler delivers them
+        return await paginate(
+            db.notifications, {"player_id": player_id, "delivered_at": {"$ne": None}}, "delivered_at", page, response,
+            transform=lambda notification: Notification(**load_document(Notification, notification))
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/notifications/{player_id}/stream")
+async def stream_notifications(
+    player_id: str,
+    last_event_id: Optional[str] = Query(None, description="Resume after this notification id"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Server-Sent Events stream of new notifications, replacing inbox polling"""
+    return StreamingResponse(
+        notification_stream(db, player_id, last_event_id_header or last_event_id, serializer_for(Notification).serialize),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/notifications/{player_id}/unread-count")
+async def get_unread_notification_count(player_id: str):
+    try:
+        return {"player_id": player_id, "unread": await unread_count(db, player_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.put("/notifications/{notification_id}/read")
+async def mark_notification_read(notification_id: str):
     try:
-        notifications = await db.notifications.find({"player_id": player_id}).sort("created_at", -1).to_list(1000)
-        return [Notification(**parse_from_mongo(notification)) for notification in notifications]
+        return {"notification_id": notification_id, "updated": await mark_read(db, notification_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.put("/notifications/player/{player_id}/read-all")
+async def mark_all_notifications_read(player_id: str):
+    try:
+        return {"player_id": player_id, "updated": await mark_all_read(db, player_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/retests/schedule", response_model=RetestSchedule)
-async def schedule_retest(retest: RetestScheduleCreate):
+async def schedule_retest(retest: RetestScheduleCreate, background_tasks: BackgroundTasks):
     try:
         retest_obj = RetestSchedule(**retest.dict())
-        retest_data = prepare_for_mongo(retest_obj.dict())
+        retest_data = dump_model(retest_obj)
         await db.retest_schedules.insert_one(retest_data)
+        scheduler.schedule("retests", retest_data)
         
-        # Create notification for retest
+        # Confirm now; the scheduler sends the reminder on the retest date
         notification = Notification(
             player_id=retest.player_id,
             title="🔥 Retest Scheduled - Time to Show Your Progress!",
             message=f"Your retest is scheduled for {retest.retest_date.strftime('%B %d, %Y')}. Time to demonstrate your improvements!",
             notification_type="retest",
-            scheduled_at=retest.retest_date
+            dedupe_key=f"retest:{retest_obj.id}"
         )
-        notification_data = prepare_for_mongo(notification.dict())
-        await db.notifications.insert_one(notification_data)
+        background_tasks.add_task(dispatch_in_background, db, [dump_model(notification)])
         
         return retest_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/retests/{player_id}", response_model=List[RetestSchedule])
-async def get_scheduled_retests(player_id: str):
+async def get_scheduled_retests(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        retests = await db.retest_schedules.find({"player_id": player_id}).to_list(1000)
-        return [RetestSchedule(**parse_from_mongo(retest)) for retest in retests]
+        # Soonest first
+        return await trusted_paginate(
+            db.retest_schedules, {"player_id": player_id}, "retest_date", page, response, RetestSchedule, direction=1
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/assessments/{assessment_id}/retest")
-async def create_retest_assessment(assessment_id: str, assessment: AssessmentCreate):
+async def create_retest_assessment(assessment_id: str, assessment: AssessmentCreate, background_tasks: BackgroundTasks):
     try:
         # Get original assessment
         original = await db.assessments.find_one({"id": assessment_id})
@@ -1291,8 +1269,10 @@ async def create_retest_assessment(assessment_id: str, assessment: AssessmentCre
         
         # Create new assessment
         assessment_obj = PlayerAssessment(**assessment_dict)
-        assessment_data = prepare_for_mongo(assessment_obj.dict())
+        assessment_data = dump_model(assessment_obj)
         await db.assessments.insert_one(assessment_data)
+        await player_cache.invalidate(assessment_obj.player_name, assessment_obj.id)
+        await refresh_assessments(db, assessment_obj.player_name)
         
         # Compare with original and create progress notification
         original_score = original.get("overall_score", 0)
@@ -1311,40 +1291,50 @@ async def create_retest_assessment(assessment_id: str, assessment: AssessmentCre
             player_id=assessment.player_id if hasattr(assessment, 'player_id') else assessment_obj.id,
             title="🏆 Retest Results - Progress Update!",
             message=f"Retest completed! {improvement_message}",
-            notification_type="progress"
+            notification_type="progress",
+            dedupe_key=f"retest_result:{assessment_obj.id}"
         )
-        notification_data = prepare_for_mongo(notification.dict())
-        await db.notifications.insert_one(notification_data)
+        background_tasks.add_task(dispatch_in_background, db, [dump_model(notification)])
         
         return assessment_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/assessments/{player_id}/progress")
-async def get_assessment_progress(player_id: str):
+async def get_assessment_progress(player_id: str, response: Response, page: PageParams = Depends()):
+    """Score history, oldest first, one page at a time; totals cover every assessment"""
     try:
-        # Get all assessments for player, ordered by date
-        assessments = await db.assessments.find({"player_name": player_id}).sort("assessment_date", 1).to_list(1000)
-        
-        if not assessments:
+        query = {"player_name": player_id}
+        first, latest, total = await asyncio.gather(
+            db.assessments.find_one(query, sort=keyset_sort("assessment_date", 1)),
+            db.assessments.find_one(query, sort=keyset_sort("assessment_date")),
+            db.assessments.count_documents(query),
+        )
+        if not first:
             raise HTTPException(status_code=404, detail="No assessments found")
         
-        progress_data = []
-        for assessment in assessments:
-            progress_data.append({
+        def to_progress(assessment):
+            return {
                 "date": assessment.get("assessment_date"),
                 "overall_score": assessment.get("overall_score", 0),
                 "category_scores": assessment.get("category_scores", {}),
                 "is_retest": assessment.get("previous_assessment_id") is not None
-            })
+            }
+        progress_data, next_cursor = await fetch_page(
+            db.assessments, query, "assessment_date", page, direction=1, transform=to_progress
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return {
             "player_id": player_id,
             "assessments": progress_data,
-            "total_assessments": len(assessments),
-            "latest_score": progress_data[-1]["overall_score"] if progress_data else 0,
-            "improvement": progress_data[-1]["overall_score"] - progress_data[0]["overall_score"] if len(progress_data) > 1 else 0
+            "total_assessments": total,
+            "latest_score": latest.get("overall_score", 0),
+            "improvement": latest.get("overall_score", 0) - first.get("overall_score", 0) if total > 1 else 0
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 @api_router.post("/weekly-progress", response_model=WeeklyProgress)
@@ -1352,47 +1342,49 @@ async def create_weekly_progress(progress: WeeklyProgressCreate):
     try:
         progress_dict = progress.dict()
         progress_obj = WeeklyProgress(**progress_dict)
-        progress_data = prepare_for_mongo(progress_obj.dict())
+        progress_data = dump_model(progress_obj)
         await db.weekly_progress.insert_one(progress_data)
         return progress_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/weekly-progress/{player_id}", response_model=List[WeeklyProgress])
-async def get_weekly_progress(player_id: str):
+async def get_weekly_progress(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        progress_entries = await db.weekly_progress.find({"player_id": player_id}).sort("created_at", -1).to_list(1000)
-        return [WeeklyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await trusted_paginate(
+            db.weekly_progress, {"player_id": player_id}, "created_at", page, response, WeeklyProgress
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/weekly-progress/{player_id}/{program_id}", response_model=List[WeeklyProgress])
-async def get_program_weekly_progress(player_id: str, program_id: str):
+async def get_program_weekly_progress(
+    player_id: str, program_id: str, response: Response, page: PageParams = Depends()
+):
     try:
-        progress_entries = await db.weekly_progress.find({
-            "player_id": player_id, 
-            "program_id": program_id
-        }).sort("week_number", 1).to_list(1000)
-        return [WeeklyProgress(**parse_from_mongo(entry)) for entry in progress_entries]
+        return await trusted_paginate(
+            db.weekly_progress, {"player_id": player_id, "program_id": program_id}, "week_number",
+            page, response, WeeklyProgress, direction=1
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/weekly-progress/{progress_id}", response_model=WeeklyProgress)
 async def update_weekly_progress(progress_id: str, progress: WeeklyProgressCreate):
     try:
-        progress_dict = progress.dict()
+        progress_dict = dump_model(progress)
         progress_dict["id"] = progress_id
         
         await db.weekly_progress.update_one(
             {"id": progress_id},
-            {"$set": prepare_for_mongo(progress_dict)}
+            {"$set": progress_dict}
         )
         
         updated_progress = await db.weekly_progress.find_one({"id": progress_id})
         if not updated_progress:
             raise HTTPException(status_code=404, detail="Weekly progress not found")
         
-        return WeeklyProgress(**parse_from_mongo(updated_progress))
+        return WeeklyProgress(**load_document(WeeklyProgress, updated_progress))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1404,10 +1396,10 @@ async def create_adaptive_training_program(player_id: str, week_number: int = 1)
         if not assessment:
             raise HTTPException(status_code=404, detail="Player assessment not found")
         
-        assessment_obj = PlayerAssessment(**parse_from_mongo(assessment))
+        assessment_obj = PlayerAssessment(**load_document(PlayerAssessment, assessment))
         
         # Get weekly progress history
-        progress_history = await db.weekly_progress.find({"player_id": player_id}).to_list(1000)
+        progress_history = await recent_weekly_progress(player_id)
         
         # Generate adaptive program
         program_content = await generate_adaptive_training_program(
@@ -1435,7 +1427,7 @@ async def create_adaptive_training_program(player_id: str, week_number: int = 1)
             ]
         )
         
-        program_data = prepare_for_mongo(program_obj.dict())
+        program_data = dump_model(program_obj)
         await db.training_programs.insert_one(program_data)
         return program_obj
         
@@ -1446,17 +1438,19 @@ async def create_adaptive_training_program(player_id: str, week_number: int = 1)
 async def add_voice_note(note: VoiceNoteCreate):
     try:
         note_obj = VoiceNote(**note.dict())
-        note_data = prepare_for_mongo(note_obj.dict())
+        note_data = dump_model(note_obj)
         await db.voice_notes.insert_one(note_data)
         return note_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/voice-notes/{player_id}", response_model=List[VoiceNote])
-async def get_voice_notes(player_id: str):
+async def get_voice_notes(player_id: str, response: Response, page: PageParams = Depends()):
     try:
-        notes = await db.voice_notes.find({"player_id": player_id}).sort("created_at", -1).to_list(1000)
-        return [VoiceNote(**parse_from_mongo(note)) for note in notes]
+        return await paginate(
+            db.voice_notes, {"player_id": player_id}, "created_at", page, response,
+            transform=lambda note: VoiceNote(**load_document(VoiceNote, note))
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1466,18 +1460,21 @@ async def save_vo2_benchmark(benchmark: VO2MaxBenchmarkCreate):
     """Save a VO2 Max benchmark test result"""
     try:
         benchmark_obj = VO2MaxBenchmark(**benchmark.dict())
-        benchmark_data = prepare_for_mongo(benchmark_obj.dict())
+        benchmark_data = dump_model(benchmark_obj)
         await db.vo2_benchmarks.insert_one(benchmark_data)
+        await player_cache.invalidate(benchmark_obj.player_id)
         return benchmark_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/vo2-benchmarks/{player_id}", response_model=List[VO2MaxBenchmark])
-async def get_vo2_benchmarks(player_id: str):
+async def get_vo2_benchmarks(player_id: str, response: Response, page: PageParams = Depends()):
     """Get all VO2 Max benchmarks for a player"""
     try:
-        benchmarks = await db.vo2_benchmarks.find({"player_id": player_id}).sort("test_date", -1).to_list(1000)
-        return [VO2MaxBenchmark(**parse_from_mongo(benchmark)) for benchmark in benchmarks]
+        return await paginate(
+            db.vo2_benchmarks, {"player_id": player_id}, "test_date", page, response,
+            transform=lambda benchmark: VO2MaxBenchmark(**load_document(VO2MaxBenchmark, benchmark))
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1485,12 +1482,9 @@ async def get_vo2_benchmarks(player_id: str):
 async def get_latest_vo2_benchmark(player_id: str):
     """Get the latest VO2 Max benchmark for a player"""
     try:
-        benchmark = await db.vo2_benchmarks.find_one(
-            {"player_id": player_id}, 
-            sort=[("test_date", -1)]
-        )
+        benchmark = await latest_vo2_benchmark(db, player_id)
         if benchmark:
-            return VO2MaxBenchmark(**parse_from_mongo(benchmark))
+            return VO2MaxBenchmark(**load_document(VO2MaxBenchmark, benchmark))
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1499,9 +1493,10 @@ async def get_latest_vo2_benchmark(player_id: str):
 async def delete_vo2_benchmark(benchmark_id: str):
     """Delete a specific VO2 Max benchmark"""
     try:
-        result = await db.vo2_benchmarks.delete_one({"id": benchmark_id})
-        if result.deleted_count == 0:
+        deleted = await db.vo2_benchmarks.find_one_and_delete({"id": benchmark_id}, projection={"player_id": 1})
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Benchmark not found")
+        await player_cache.invalidate(deleted.get("player_id"))
         return {"message": "Benchmark deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1512,6 +1507,7 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
     """Create a comprehensive periodized training program"""
     try:
         from exercise_database import PERIODIZATION_TEMPLATES, generate_daily_routine
+        from utils.exercise_catalog import compact_program, archive_catalog
         
         # Determine player weaknesses based on latest assessment
         assessment = await db.assessments.find_one(
@@ -1597,9 +1593,12 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
             program_objectives=program.program_objectives
         )
         
-        # Save to database
-        program_data = prepare_for_mongo(periodized_program.dict())
+        # Save to database, storing exercise references instead of full copies
+        program_data = index_program(compact_program(dump_model(periodized_program)))
+        await archive_catalog(db)
         await db.periodized_programs.insert_one(program_data)
+        await player_cache.invalidate(periodized_program.player_id)
+        await record_program(db, periodized_program.player_id, program_data)
         
         return periodized_program
         
@@ -1609,14 +1608,12 @@ async def create_periodized_program(program: PeriodizedProgramCreate):
 @api_router.get("/periodized-programs/{player_id}", response_model=Optional[PeriodizedProgram])
 async def get_player_program(player_id: str):
     """Get the current periodized program for a player"""
+    from utils.exercise_catalog import expand_program, catalog_for, VERSION_FIELD
     try:
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
+        program = await latest_program(db, player_id)
         if program:
-            return PeriodizedProgram(**parse_from_mongo(program))
-        return None
+            program = expand_program(program, await catalog_for(db, program.get(VERSION_FIELD)))
+        return trusted_response(PeriodizedProgram, program)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1643,8 +1640,10 @@ async def log_daily_progress(progress: DailyProgressCreate):
         )
         
         # Save to database
-        progress_data = prepare_for_mongo(daily_progress.dict())
+        progress_data = dump_model(daily_progress)
         await db.daily_progress.insert_one(progress_data)
+        await player_cache.invalidate(progress.player_id)
+        await record_training_day(db, progress.player_id, progress_data["date"])
         
         # Update performance metrics based on completed exercises
         await update_performance_metrics(progress.player_id, completed_exercises)
@@ -1655,118 +1654,65 @@ async def log_daily_progress(progress: DailyProgressCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/daily-progress/{player_id}")
-async def get_daily_progress(player_id: str, days: int = 30):
+async def get_daily_progress(player_id: str, response: Response, days: int = 30, page: PageParams = Depends()):
     """Get daily progress history for a player"""
     try:
-        # Get all entries for the player first, then filter by date in Python
-        # This handles the string vs datetime comparison issue
-        progress_entries = await db.daily_progress.find(
-            {"player_id": player_id}
-        ).sort("date", -1).to_list(1000)
-        
-        # Filter by date in Python after parsing
+        # The window is evaluated by MongoDB on the (player_id, date) index
         start_date = datetime.now(timezone.utc) - timedelta(days=days)
-        filtered_entries = []
-        
-        for entry in progress_entries:
-            # Parse the entry and convert date string to datetime
-            parsed_entry = parse_from_mongo(entry)
-            
-            # Handle date field conversion (not just _at fields)
-            if 'date' in parsed_entry and isinstance(parsed_entry['date'], str):
-                try:
-                    parsed_entry['date'] = datetime.fromisoformat(parsed_entry['date'])
-                except:
-                    # If date parsing fails, include the entry anyway
-                    pass
-            
-            # Filter by date if we have a valid datetime
-            if isinstance(parsed_entry.get('date'), datetime):
-                if parsed_entry['date'] >= start_date:
-                    filtered_entries.append(parsed_entry)
-            else:
-                # Include entries with invalid dates
-                filtered_entries.append(parsed_entry)
-        
-        return [DailyProgress(**entry) for entry in filtered_entries]
+        return await paginate(
+            db.daily_progress,
+            {"player_id": player_id, "date": {"$gte": mongo_date(start_date)}},
+            "date", page, response,
+            transform=lambda entry: DailyProgress(**load_document(DailyProgress, entry))
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/current-routine/{player_id}")
 async def get_current_routine(player_id: str):
     """Get today's training routine for a player"""
+    from utils.exercise_catalog import expand_routine, catalog_for, VERSION_FIELD
     try:
-        # Get player's current program
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
-        
-        if not program:
-            return {"message": "No training program found", "routine": None}
-        
-        # Calculate current position in program
-        start_date = program["program_start_date"]
-        if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        current_date = datetime.now(timezone.utc)
-        days_elapsed = (current_date - start_date).days
-        
-        current_week = (days_elapsed // 7) + 1
-        current_day = (days_elapsed % 7) + 1
-        
-        # Find current routine
-        current_routine = None
-        current_phase = None
-        
-        week_count = 0
-        for macro_cycle in program["macro_cycles"]:
-            for micro_cycle in macro_cycle["micro_cycles"]:
-                week_count += 1
-                if week_count == current_week:
-                    current_phase = macro_cycle["phase_number"]
-                    if current_day <= len(micro_cycle["daily_routines"]):
-                        current_routine = micro_cycle["daily_routines"][current_day - 1]
-                    break
-            if current_routine:
-                break
-        
-        if not current_routine:
-            return {"message": "Rest day or program completed", "routine": None}
-        
-        return {
-            "routine": current_routine,
-            "current_week": current_week,
-            "current_day": current_day,
-            "current_phase": current_phase,
-            "program_name": program["program_name"]
-        }
+        schedule = await program_schedule(db, player_id)
+        result = await current_routine(db.periodized_programs, schedule)
+        if result["routine"]:
+            result["routine"] = expand_routine(result["routine"], await catalog_for(db, schedule.get(VERSION_FIELD)))
+        return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/performance-metrics/{player_id}")
-async def get_performance_metrics(player_id: str):
-    """Get performance metrics and progress tracking"""
+async def get_performance_metrics(
+    player_id: str,
+    response: Response,
+    page: PageParams = Depends(),
+    weeks: Optional[int] = Query(None, ge=1, description="Limit improvement trends to the last N weeks"),
+    phase: Optional[int] = Query(None, ge=1, description="Limit improvement trends to one program phase")
+):
+    """Get performance metrics and progress tracking (metrics are paginated)"""
     try:
-        # Get recent performance metrics
-        metrics = await db.performance_metrics.find(
-            {"player_id": player_id}
-        ).sort("measurement_date", -1).to_list(1000)
+        # Get one page of recent performance metrics
+        metrics, next_cursor = await fetch_page(
+            db.performance_metrics, {"player_id": player_id}, "measurement_date", page
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         # Get daily progress for visualization
         progress_entries = await db.daily_progress.find(
             {"player_id": player_id}
         ).sort("date", -1).limit(30).to_list(1000)
         
-        # Calculate improvement trends
-        improvement_data = calculate_improvement_trends(metrics)
+        # Improvement trends over all (or the windowed) metrics, aggregated in MongoDB
+        improvement_data = await improvement_trends(db.performance_metrics, player_id, weeks, phase)
         
         return {
-            "metrics": [PerformanceMetric(**parse_from_mongo(metric)) for metric in metrics],
-            "daily_progress": [DailyProgress(**parse_from_mongo(entry)) for entry in progress_entries],
+            "metrics": [PerformanceMetric(**load_document(PerformanceMetric, metric)) for metric in metrics],
+            "daily_progress": [DailyProgress(**load_document(DailyProgress, entry)) for entry in progress_entries],
             "improvement_trends": improvement_data,
-            "next_assessment": get_next_assessment_date(player_id)
+            "next_assessment": get_next_assessment_date(player_id),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -1775,11 +1721,8 @@ async def get_performance_metrics(player_id: str):
 async def update_performance_metrics(player_id: str, completed_exercises: List[ExerciseCompletion]):
     """Update performance metrics based on completed exercises"""
     try:
-        # Get current program to determine phase and week
-        program = await db.periodized_programs.find_one(
-            {"player_id": player_id}, 
-            sort=[("created_at", -1)]
-        )
+        # Get current program to determine phase and week (schedule fields only)
+        program = await program_schedule(db, player_id)
         
         if not program:
             return
@@ -1788,6 +1731,7 @@ async def update_performance_metrics(player_id: str, completed_exercises: List[E
         current_phase = calculate_current_phase(program)
         
         # Update metrics based on exercise performance
+        metrics = []
         for exercise in completed_exercises:
             if exercise.performance_rating and exercise.performance_rating >= 4:
                 # Good performance - create positive metric entry
@@ -1799,62 +1743,22 @@ async def update_performance_metrics(player_id: str, completed_exercises: List[E
                     week_number=current_week
                 )
                 
-                metric_data = prepare_for_mongo(metric.dict())
-                await db.performance_metrics.insert_one(metric_data)
+                metrics.append(dump_model(metric))
+        
+        if metrics:
+            await db.performance_metrics.insert_many(metrics)
+            await record_metrics(db, player_id, metrics)
         
     except Exception as e:
         print(f"Error updating performance metrics: {e}")
 
 def calculate_current_week(program):
     """Calculate current week in program"""
-    start_date = program["program_start_date"]
-    if isinstance(start_date, str):
-        start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-    current_date = datetime.now(timezone.utc)
-    days_elapsed = (current_date - start_date).days
-    return (days_elapsed // 7) + 1
+    return program_position(program)[0]
 
 def calculate_current_phase(program):
     """Calculate current phase in program"""
-    current_week = calculate_current_week(program)
-    week_count = 0
-    
-    for i, macro_cycle in enumerate(program["macro_cycles"]):
-        week_count += macro_cycle["duration_weeks"]
-        if current_week <= week_count:
-            return i + 1
-    
-    return len(program["macro_cycles"])
-
-def calculate_improvement_trends(metrics):
-    """Calculate improvement trends from performance metrics"""
-    trends = {}
-    
-    # Group metrics by type
-    metric_groups = {}
-    for metric in metrics:
-        metric_type = metric["metric_name"]
-        if metric_type not in metric_groups:
-            metric_groups[metric_type] = []
-        metric_groups[metric_type].append(metric)
-    
-    # Calculate trends for each metric type
-    for metric_type, metric_list in metric_groups.items():
-        if len(metric_list) >= 2:
-            # Sort by date
-            sorted_metrics = sorted(metric_list, key=lambda x: x["measurement_date"])
-            first_value = sorted_metrics[0]["value"]
-            last_value = sorted_metrics[-1]["value"]
-            
-            if first_value > 0:
-                improvement_percentage = ((last_value - first_value) / first_value) * 100
-                trends[metric_type] = {
-                    "improvement_percentage": round(improvement_percentage, 2),
-                    "trend_direction": "up" if improvement_percentage > 0 else "down",
-                    "data_points": len(sorted_metrics)
-                }
-    
-    return trends
+    return phase_for_week(program, calculate_current_week(program))
 
 def get_next_assessment_date(player_id: str):
     """Get the next assessment date for a player"""
@@ -1879,7 +1783,10 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+# Per-route latency, status codes and MongoDB commands (GET /metrics)
+app.add_middleware(MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -1888,6 +1795,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Scheduled deliveries (see utils/scheduler.py)
+async def send_retest_reminder(retest: Dict[str, Any]) -> None:
+    notification = Notification(
+        player_id=retest["player_id"],
+        title="🔥 Retest Day - Time to Show Your Progress!",
+        message="Your retest is today. Time to demonstrate your improvements!",
+        notification_type="retest",
+        dedupe_key=f"retest_due:{retest['id']}"
+    )
+    await dispatch_notifications(db, [dump_model(notification)])
+
+scheduler.register(ScheduleSource(
+    name="notifications", collection="notifications", due_field="scheduled_at",
+    marker_field="delivered_at", deliver=lambda notification: deliver_scheduled(db, notification)
+))
+scheduler.register(ScheduleSource(
+    name="retests", collection="retest_schedules", due_field="retest_date",
+    marker_field="reminded_at", deliver=send_retest_reminder, filter={"status": "scheduled"}
+))
+
+@app.get("/health/db")
+async def database_health():
+    """MongoDB ping and connection pool metrics (checkout waits, saturation)"""
+    try:
+        return await mongo.health()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, MongoDB command, cache, queue and pool metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+for name, stats in (
+    ("mongo_pool", mongo.stats),
+    ("player_cache", player_cache.stats),
+    ("llm_jobs", llm_jobs.stats),
+    ("auth_cache", auth_context.stats),
+    ("notification_hub", notification_hub.stats),
+    ("scheduler", scheduler.stats),
+):
+    metrics.register_stats(name, stats)
+
+@app.get("/health/startup")
+async def startup_health():
+    """Cold start breakdown: startup phases and the slowest imports"""
+    return startup_report.report()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""Incremental achievement engine.
+
+Each player has one small ``achievement_state`` document::
+
+    {"player_id": "...", "counters": {"speed": 7, ...}, "awarded_mask": 5}
+
+``counters`` counts progress entries per metric type and ``awarded_mask`` has
+bit ``rule["bit"]`` set once that rule's trophy was awarded. Logging a progress
+entry increments its counter and reads the state back in one round trip, then
+evaluates ``ACHIEVEMENT_RULES`` against that single event. Trophies are claimed
+with a compare-and-set on the mask (``$bitsAllClear`` + ``$bit``), so
+concurrent entries can never award the same trophy twice. Coins are only
+credited once the trophies are stored.
+
+Metric types become field names under ``counters``, so only
+``METRIC_TYPE_PATTERN`` names are counted; anything else (a dot or a leading
+``$`` would address another field) is ignored.
+
+The state of players without one is seeded once from their progress history
+and existing trophies.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import re
+import uuid
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import mongo_date
+
+STATE_COLLECTION = "achievement_state"
+
+# Metric types usable as a counters.<metric_type> field name
+METRIC_TYPE_PATTERN = r"^[A-Za-z0-9_]+$"
+_METRIC_TYPE = re.compile(METRIC_TYPE_PATTERN)
+
+# Rules are evaluated against the new progress entry only. Conditions:
+#   value_lte / value_gte  - the entry's value crosses a threshold
+#   count_gte              - number of entries of this metric type so far
+# Bits are persisted in awarded_mask: never renumber an existing rule.
+ACHIEVEMENT_RULES: List[Dict[str, Any]] = [
+    {
+        "bit": 0,
+        "trophy_type": "speed_master",
+        "trophy_name": "سيد السرعة",
+        "description": "حقق وقت أقل من 4 ثوان في عدو 40 متر",
+        "coins_reward": 200,
+        "icon": "🏃‍♂️",
+        "metric_type": "speed",
+        "value_lte": 4.0,  # Under 4 seconds for 40m
+    },
+    {
+        "bit": 1,
+        "trophy_type": "consistency_king",
+        "trophy_name": "ملك الثبات",
+        "description": "سجل 5 إدخالات تقدم في السرعة",
+        "coins_reward": 150,
+        "icon": "👑",
+        "metric_type": "speed",
+        "count_gte": 5,
+    },
+    {
+        "bit": 2,
+        "trophy_type": "fire_boy",
+        "trophy_name": "يويو الفتى الناري",
+        "description": "حقق دقة 95% أو أكثر في التحكم بالكرة",
+        "coins_reward": 500,
+        "icon": "🔥",
+        "metric_type": "ball_handling",
+        "value_gte": 95,
+    },
+]
+
+RULES_BY_TYPE = {rule["trophy_type"]: rule for rule in ACHIEVEMENT_RULES}
+
+def rule_matches(rule: Dict[str, Any], metric_type: str, value: float, count: int) -> bool:
+    if rule["metric_type"] != metric_type:
+        return False
+    if "value_lte" in rule and not value <= rule["value_lte"]:
+        return False
+    if "value_gte" in rule and not value >= rule["value_gte"]:
+        return False
+    if "count_gte" in rule and not count >= rule["count_gte"]:
+        return False
+    return True
+
+def evaluate_rules(state: Dict[str, Any], metric_type: str, value: float) -> List[Dict[str, Any]]:
+    """Rules newly satisfied by this event that have not been awarded yet"""
+    mask = state.get("awarded_mask", 0)
+    count = state.get("counters", {}).get(metric_type, 0)
+    return [
+        rule for rule in ACHIEVEMENT_RULES
+        if not mask & (1 << rule["bit"]) and rule_matches(rule, metric_type, value, count)
+    ]
+
+def rules_mask(rules: List[Dict[str, Any]]) -> int:
+    mask = 0
+    for rule in rules:
+        mask |= 1 << rule["bit"]
+    return mask
+
+def trophy_document(rule: Dict[str, Any], player_id: str) -> Dict[str, Any]:
+    """Trophy document for an awarded rule, in the shape of the Trophy model"""
+    return {
+        "id": str(uuid.uuid4()),
+        "player_id": player_id,
+        "trophy_name": rule["trophy_name"],
+        "trophy_type": rule["trophy_type"],
+        "description": rule["description"],
+        "coins_reward": rule["coins_reward"],
+        "icon": rule["icon"],
+        "unlocked_at": datetime.now(timezone.utc),
+    }
+
+async def _seed_state(db, player_id: str) -> Optional[Dict[str, Any]]:
+    """Build the state of a player from history. Returns None if another request seeded it first."""
+    counts, trophy_types = await asyncio.gather(
+        db.progress.aggregate([
+            {"$match": {"player_id": player_id}},
+            {"$group": {"_id": "$metric_type", "count": {"$sum": 1}}},
+        ]).to_list(None),
+        db.trophies.distinct("trophy_type", {"player_id": player_id}),
+    )
+    state = {
+        "player_id": player_id,
+        "counters": {
+            row["_id"]: row["count"] for row in counts
+            if isinstance(row["_id"], str) and _METRIC_TYPE.match(row["_id"])
+        },
+        "awarded_mask": rules_mask([RULES_BY_TYPE[t] for t in trophy_types if t in RULES_BY_TYPE]),
+    }
+    try:
+        result = await db[STATE_COLLECTION].update_one(
+            {"player_id": player_id}, {"$setOnInsert": state}, upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    return state if result.upserted_id is not None else None
+
+async def _increment_state(db, player_id: str, metric_type: str) -> Optional[Dict[str, Any]]:
+    return await db[STATE_COLLECTION].find_one_and_update(
+        {"player_id": player_id},
+        {"$inc": {f"counters.{metric_type}": 1}},
+        projection={"_id": 0, "counters": 1, "awarded_mask": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def _claim(db, player_id: str, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Atomically set the bits of ``rules``; returns the rules this call won"""
+    if not rules:
+        return []
+    collection = db[STATE_COLLECTION]
+    mask = rules_mask(rules)
+    result = await collection.update_one(
+        {"player_id": player_id, "awarded_mask": {"$bitsAllClear": mask}},
+        {"$bit": {"awarded_mask": {"or": mask}}},
+    )
+    if result.modified_count or len(rules) == 1:
+        return rules if result.modified_count else []
+
+    # A concurrent entry claimed some of these bits; claim the rest one by one
+    won = []
+    for rule in rules:
+        won.extend(await _claim(db, player_id, [rule]))
+    return won
+
+async def record_progress(db, player_id: str, metric_type: str,
+                          value: float) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Update the achievement state for a new progress entry and award any trophies.
+
+    Must be called after the entry is inserted (seeding counts it from history).
+    Returns the inserted trophy documents and, when coins were credited, the
+    player_name of the credited assessment (its cached reads are keyed by name).
+    """
+    if not _METRIC_TYPE.match(metric_type):
+        return [], None
+
+    state = await _increment_state(db, player_id, metric_type)
+    if state is None:
+        state = await _seed_state(db, player_id) or await _increment_state(db, player_id, metric_type)
+
+    awarded = await _claim(db, player_id, evaluate_rules(state, metric_type, value))
+    if not awarded:
+        return [], None
+
+    trophies = [trophy_document(rule, player_id) for rule in awarded]
+    await db.trophies.insert_many([
+        {**trophy, "unlocked_at": mongo_date(trophy["unlocked_at"])} for trophy in trophies
+    ])
+    credited = await db.assessments.find_one_and_update(
+        {"id": player_id},
+        {"$inc": {"total_coins": sum(rule["coins_reward"] for rule in awarded)}},
+        projection={"_id": 0, "player_name": 1}
+    )
+    return trophies, (credited or {}).get("player_name")
@@ -0,0 +1,73 @@
+"""Progress analytics computed with MongoDB aggregation pipelines.
+
+Only per-metric summaries cross the wire; the raw ``performance_metrics``
+rows stay on the server.
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+
+from utils.database import mongo_date
+
+def improvement_trends_pipeline(
+    player_id: str,
+    weeks: Optional[int] = None,
+    phase_number: Optional[int] = None,
+    now: Optional[datetime] = None,
+    min_points: int = 2,
+) -> List[Dict[str, Any]]:
+    """First/last value and date and count per metric, optionally windowed.
+
+    The sort matches the (player_id, metric_name, measurement_date desc)
+    index, so ``$first`` is the latest measurement and ``$last`` the earliest.
+    """
+    match: Dict[str, Any] = {"player_id": player_id}
+    if weeks is not None:
+        since = (now or datetime.now(timezone.utc)) - timedelta(weeks=weeks)
+        match["measurement_date"] = {"$gte": mongo_date(since)}
+    if phase_number is not None:
+        match["phase_number"] = phase_number
+    return [
+        {"$match": match},
+        {"$sort": {"metric_name": 1, "measurement_date": -1}},
+        {"$group": {
+            "_id": "$metric_name",
+            "last_value": {"$first": "$value"},
+            "first_value": {"$last": "$value"},
+            "last_date": {"$first": "$measurement_date"},
+            "first_date": {"$last": "$measurement_date"},
+            "data_points": {"$sum": 1},
+        }},
+        {"$match": {"data_points": {"$gte": min_points}}},
+    ]
+
+def trends_from_summaries(summaries: List[Dict[str, Any]], key: str = "_id") -> Dict[str, Any]:
+    """Improvement percentage per metric from per-metric summaries (the pipeline output by default)"""
+    trends = {}
+    for summary in summaries:
+        first_value = summary["first_value"]
+        last_value = summary["last_value"]
+        if first_value > 0:
+            improvement_percentage = ((last_value - first_value) / first_value) * 100
+            trends[summary[key]] = {
+                "improvement_percentage": round(improvement_percentage, 2),
+                "trend_direction": "up" if improvement_percentage > 0 else "down",
+                "data_points": summary["data_points"]
+            }
+    return trends
+
+async def improvement_trends(
+    collection,
+    player_id: str,
+    weeks: Optional[int] = None,
+    phase_number: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Improvement trends of a player's performance metrics.
+
+    ``weeks`` limits the trend to the last N weeks, ``phase_number`` to one
+    program phase.
+    """
+    summaries = await collection.aggregate(
+        improvement_trends_pipeline(player_id, weeks, phase_number)
+    ).to_list(None)
+    return trends_from_summaries(summaries)
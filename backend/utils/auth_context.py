@@ -0,0 +1,98 @@
+"""Per-request auth context backed by claim, user and profile caches.
+
+- Decoded JWT claims are cached by SHA-256 of the token until the token's
+  ``exp``, so a repeated token skips ``jwt.decode``. Failed decodes are not
+  cached.
+- User and profile documents are cached by user id for
+  ``AUTH_USER_CACHE_TTL_SECONDS``. Writes in this process call
+  ``invalidate_user`` / ``invalidate_profile``; other workers may serve the
+  previous document until the TTL runs out.
+
+``AuthContext`` loads the user and profile lazily, so an endpoint that only
+needs the claims costs no database round trip at all. Cached documents are
+shared between requests; treat them as read-only.
+"""
+
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import os
+import time
+
+from utils.ttl_cache import TTLCache
+
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_TOKEN_CACHE_MAX_ENTRIES', '10000'))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_USER_CACHE_TTL_SECONDS', '30'))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_USER_CACHE_MAX_ENTRIES', '4096'))
+
+_MISSING = object()
+
+_claims = TTLCache(maxsize=AUTH_TOKEN_CACHE_MAX_ENTRIES)
+_users = TTLCache(maxsize=AUTH_USER_CACHE_MAX_ENTRIES, ttl=AUTH_USER_CACHE_TTL_SECONDS)
+_profiles = TTLCache(maxsize=AUTH_USER_CACHE_MAX_ENTRIES, ttl=AUTH_USER_CACHE_TTL_SECONDS)
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def cached_claims(token: str, decode: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Claims of ``token``, decoded with ``decode`` (which raises if invalid) on a miss"""
+    key = token_digest(token)
+    claims = _claims.get(key)
+    if claims is None:
+        claims = decode(token)
+        exp = claims.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else AUTH_USER_CACHE_TTL_SECONDS
+        if ttl > 0:
+            # TTLCache runs on the monotonic clock; exp is wall-clock seconds
+            _claims.set(key, claims, ttl=ttl)
+    return claims
+
+async def get_user(db, user_id: str) -> Optional[Dict[str, Any]]:
+    user = _users.get(user_id, _MISSING)
+    if user is _MISSING:
+        user = await db.users.find_one({"id": user_id})
+        if user is not None:
+            _users.set(user_id, user)
+    return user
+
+async def get_profile(db, user_id: str) -> Optional[Dict[str, Any]]:
+    profile = _profiles.get(user_id, _MISSING)
+    if profile is _MISSING:
+        profile = await db.user_profiles.find_one({"user_id": user_id})
+        if profile is not None:
+            _profiles.set(user_id, profile)
+    return profile
+
+def invalidate_user(user_id: Optional[str]) -> None:
+    if user_id:
+        _users.pop(user_id)
+
+def invalidate_profile(user_id: Optional[str]) -> None:
+    if user_id:
+        _profiles.pop(user_id)
+
+def stats() -> Dict[str, Any]:
+    return {
+        name: {"entries": len(cache), "hits": cache.hits, "misses": cache.misses}
+        for name, cache in (("claims", _claims), ("users", _users), ("profiles", _profiles))
+    }
+
+class AuthContext:
+    """Claims of the verified token plus lazily loaded user and profile documents"""
+
+    def __init__(self, db, claims: Dict[str, Any]):
+        self.db = db
+        self.claims = claims
+
+    @property
+    def user_id(self) -> str:
+        return self.claims["user_id"]
+
+    @property
+    def username(self) -> str:
+        return self.claims["username"]
+
+    async def user(self) -> Optional[Dict[str, Any]]:
+        return await get_user(self.db, self.user_id)
+
+    async def profile(self) -> Optional[Dict[str, Any]]:
+        return await get_profile(self.db, self.user_id)
@@ -0,0 +1,193 @@
+"""Vectorized batch scoring for player assessments.
+
+Scores a column-oriented batch of assessments in one pass with NumPy. The
+thresholds compiled by ``utils.scoring_kernel`` are turned into a threshold
+matrix at import time so that re-scoring a whole academy does not grade
+metrics one value at a time. Results match ``calculate_overall_score`` and
+``get_performance_level`` exactly, and ``rate_records`` matches the 0-5
+ratings of ``score_assessment`` that server.py stores.
+"""
+
+from typing import Dict, Any, List, Mapping, Sequence
+import numpy as np
+
+from utils.handbook_standards import CATEGORY_WEIGHTS, CATEGORY_METRICS
+from utils.scoring_kernel import HANDBOOK_TABLE, FIVE_POINT_TABLE, METRICS, LOWER_IS_BETTER_MASK
+
+# Age categories in the order used by the threshold matrices
+AGE_CATEGORIES = ["12-14", "15-16", "17-18", "elite"]
+
+# Upper age bound (inclusive) of each category except the last one
+AGE_CATEGORY_BOUNDS = np.array([14, 16, 18])
+
+LEVELS = ["excellent", "good", "average"]
+
+# Performance level thresholds, highest first (see get_performance_level)
+PERFORMANCE_LEVEL_THRESHOLDS = [
+    (85, "Elite"),
+    (75, "Advanced"),
+    (65, "Intermediate"),
+    (50, "Developing"),
+]
+DEFAULT_PERFORMANCE_LEVEL = "Beginner"
+
+def build_threshold_matrix(compiled_table: Mapping[str, Sequence[Any]]) -> np.ndarray:
+    """Build an (age category, metric, level) matrix of excellent/good/average thresholds
+    from a table compiled by ``scoring_kernel.compile_standards``.
+
+    Metrics without standards are filled with NaN, which the scorer treats as
+    "average" just like the scalar kernel.
+    """
+    matrix = np.full((len(AGE_CATEGORIES), len(METRICS), len(LEVELS)), np.nan)
+    for a, age_category in enumerate(AGE_CATEGORIES):
+        for m, thresholds in enumerate(compiled_table[age_category]):
+            if thresholds is not None:
+                matrix[a, m] = thresholds
+    return matrix
+
+THRESHOLDS = build_threshold_matrix(HANDBOOK_TABLE)
+FIVE_POINT_THRESHOLDS = build_threshold_matrix(FIVE_POINT_TABLE)
+LOWER_IS_BETTER = np.array([bool((LOWER_IS_BETTER_MASK >> m) & 1) for m in range(len(METRICS))])
+
+def age_category_index(ages: np.ndarray) -> np.ndarray:
+    """Map an array of ages to indexes into AGE_CATEGORIES (same rules as handbook_age_category)"""
+    return np.searchsorted(AGE_CATEGORY_BOUNDS, ages, side="left")
+
+def five_point_age_index(ages: np.ndarray) -> np.ndarray:
+    """Same as age_category_index, except that players under 12 use elite standards
+    (five_point_age_category)"""
+    return np.where(ages < 12, len(AGE_CATEGORIES) - 1, age_category_index(ages))
+
+def score_metric(values: np.ndarray, age_index: np.ndarray, metric: str,
+                 matrix: np.ndarray = THRESHOLDS) -> np.ndarray:
+    """Return the 2-5 performance score of one metric for every row"""
+    m = METRICS.index(metric)
+    thresholds = matrix[age_index, m]
+    excellent, good, average = thresholds[:, 0], thresholds[:, 1], thresholds[:, 2]
+
+    if LOWER_IS_BETTER[m]:
+        conditions = [values <= excellent, values <= good, values <= average]
+    else:
+        conditions = [values >= excellent, values >= good, values >= average]
+    scores = np.select(conditions, [5.0, 4.0, 3.0], default=2.0)
+
+    # Metrics without standards evaluate to "average"
+    return np.where(np.isnan(excellent), 3.0, scores)
+
+def performance_levels(overall_scores: np.ndarray) -> np.ndarray:
+    """Vectorized get_performance_level"""
+    conditions = [overall_scores >= threshold for threshold, _ in PERFORMANCE_LEVEL_THRESHOLDS]
+    labels = [label for _, label in PERFORMANCE_LEVEL_THRESHOLDS]
+    return np.select(conditions, labels, default=DEFAULT_PERFORMANCE_LEVEL)
+
+def category_grades(columns: Mapping[str, Sequence[Any]], age_index: np.ndarray,
+                    matrix: np.ndarray) -> Dict[str, Any]:
+    """Per category, (mean 2-5 grade of the present metrics, whether any were present) per row"""
+    size = age_index.shape[0]
+    grades = {}
+    for category, metrics in CATEGORY_METRICS.items():
+        total_score = np.zeros(size)
+        valid_metrics = np.zeros(size)
+
+        for metric in metrics:
+            if metric not in columns:
+                continue
+            values = np.asarray(columns[metric], dtype=float)
+            if values.shape != (size,):
+                raise ValueError(f"Column '{metric}' has {values.shape[0]} rows, expected {size}")
+
+            valid = ~np.isnan(values)
+            scores = score_metric(values, age_index, metric, matrix)
+            total_score += np.where(valid, scores, 0.0)
+            valid_metrics += valid
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            grades[category] = (total_score / valid_metrics, valid_metrics > 0)
+    return grades
+
+def score_batch(columns: Mapping[str, Sequence[Any]], ages: Sequence[Any]) -> Dict[str, Any]:
+    """Score a column-oriented batch of assessments.
+
+    ``columns`` maps metric names to equally sized arrays; missing values are
+    NaN (or None). Metrics absent from ``columns`` count as missing for every
+    row. Returns overall scores, per-category scores and performance levels.
+    """
+    ages = np.asarray(ages, dtype=float)
+    grades = category_grades(columns, age_category_index(ages), THRESHOLDS)
+    category_scores = {
+        category: np.where(present, mean * 20, 0.0) for category, (mean, present) in grades.items()
+    }
+    size = ages.shape[0]
+
+    # Accumulate in the same order as calculate_overall_score so floats match exactly
+    overall = np.zeros(size)
+    for category, weight in CATEGORY_WEIGHTS.items():
+        overall = overall + category_scores[category] * weight
+    overall = np.clip(overall, 0, 100)
+
+    return {
+        "overall_scores": overall,
+        "category_scores": category_scores,
+        "performance_levels": performance_levels(overall),
+    }
+
+def rate_batch(columns: Mapping[str, Sequence[Any]], ages: Sequence[Any]) -> Dict[str, Any]:
+    """The 0-5 ratings of ``score_assessment`` for a column-oriented batch, unrounded.
+
+    Categories without values rate 3. Returns overall and per-category ratings.
+    """
+    ages = np.asarray(ages, dtype=float)
+    grades = category_grades(columns, five_point_age_index(ages), FIVE_POINT_THRESHOLDS)
+    category_ratings = {
+        category: np.where(present, mean, 3.0) for category, (mean, present) in grades.items()
+    }
+
+    overall = np.zeros(ages.shape[0])
+    for category, weight in CATEGORY_WEIGHTS.items():
+        overall = overall + category_ratings[category] * weight
+    return {"overall_ratings": overall, "category_ratings": category_ratings}
+
+def columns_from_records(records: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Convert row-oriented assessment dicts into the (columns, ages) batch format"""
+    columns = {}
+    for metric in METRICS:
+        column = np.full(len(records), np.nan)
+        for i, record in enumerate(records):
+            value = record.get(metric)
+            if value is not None and value != "":
+                column[i] = float(value)
+        columns[metric] = column
+    ages = np.array([record.get('age', 18) for record in records], dtype=float)
+    return {"columns": columns, "ages": ages}
+
+def score_records(records: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Score row-oriented assessment dicts and return one result dict per row"""
+    batch = columns_from_records(records)
+    result = score_batch(batch["columns"], batch["ages"])
+    return [
+        {
+            "overall_score": float(result["overall_scores"][i]),
+            "category_scores": {
+                category: float(scores[i]) for category, scores in result["category_scores"].items()
+            },
+            "performance_level": str(result["performance_levels"][i]),
+        }
+        for i in range(len(records))
+    ]
+
+def rate_records(records: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Rate row-oriented assessment dicts like server.calculate_assessment_scores:
+    ``{"overall": rating, <category>: rating, ...}`` per row, rounded to 2 decimals"""
+    batch = columns_from_records(records)
+    result = rate_batch(batch["columns"], batch["ages"])
+    # Python's round, as the scalar kernel uses, rather than np.round
+    return [
+        {
+            "overall": round(float(result["overall_ratings"][i]), 2),
+            **{
+                category: round(float(ratings[i]), 2)
+                for category, ratings in result["category_ratings"].items()
+            },
+        }
+        for i in range(len(records))
+    ]
@@ -0,0 +1,195 @@
+"""Streaming bulk import of row-oriented uploads (CSV or NDJSON).
+
+The request body is read chunk by chunk and parsed into rows as it arrives.
+Each row is validated against a Pydantic model; valid rows are collected into
+batches of ``BULK_IMPORT_BATCH_SIZE`` that are turned into documents by a
+caller-supplied ``build_documents`` (e.g. scoring a whole batch at once) and
+written with an unordered ``insert_many``. While one batch is being written
+the next one is parsed.
+
+Rows that fail validation or insertion are reported individually; they never
+abort the rest of the import. Row numbers are 1-based data rows (the CSV
+header is not counted).
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import codecs
+import csv
+import json
+import os
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', '500'))
+BULK_IMPORT_MAX_ROWS = int(os.environ.get('BULK_IMPORT_MAX_ROWS', '10000'))
+
+# Error details returned in one response; the counts always cover every row
+MAX_REPORTED_ERRORS = 1000
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+class TooManyRowsError(ValueError):
+    """Raised when an upload exceeds BULK_IMPORT_MAX_ROWS"""
+
+def upload_format(content_type: Optional[str]) -> Optional[str]:
+    """Map a Content-Type header to "csv" / "ndjson", or None if unsupported"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream and yield its lines (newline included, BOM stripped)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    header = None
+    buffer = ""
+    async for line in iter_lines(chunks):
+        buffer += line
+        # A quoted field may span lines; wait until every quote is closed
+        if buffer.count('"') % 2:
+            continue
+        record, buffer = buffer, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        # Empty cells are left out so required fields report "missing"
+        yield {name: value for name, value in zip(header, values) if value.strip() != ""}
+    if buffer.strip():
+        raise ValueError("Unterminated quoted field at end of CSV")
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e.msg}")
+
+def row_errors(error: Exception) -> List[Dict[str, Any]]:
+    if isinstance(error, ValidationError):
+        return [
+            {"field": ".".join(str(part) for part in item["loc"]) or None, "message": item["msg"]}
+            for item in error.errors()
+        ]
+    return [{"field": None, "message": str(error)}]
+
+class BulkImportReport:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row: int, errors: List[Dict[str, Any]]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+async def _insert_batch(collection, rows: List[int], documents: List[Dict[str, Any]], report: BulkImportReport) -> None:
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        report.inserted += len(result.inserted_ids)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        report.inserted += e.details.get("nInserted", 0)
+        for write_error in write_errors:
+            report.add_error(rows[write_error["index"]], [{"field": None, "message": write_error.get("errmsg", "Write failed")}])
+
+async def bulk_import(
+    collection,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    model: type,
+    build_documents: Callable[[List[BaseModel]], List[Dict[str, Any]]],
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    max_rows: int = BULK_IMPORT_MAX_ROWS,
+) -> Dict[str, Any]:
+    """Validate, build and insert every row of an upload; returns the import report.
+
+    Raises ``TooManyRowsError`` once ``max_rows`` is exceeded (the rows before
+    the limit are imported, nothing further is read) and ``ValueError`` for a
+    malformed CSV stream.
+    """
+    records = iter_csv_records(chunks) if fmt == "csv" else iter_ndjson_records(chunks)
+    report = BulkImportReport()
+    batch: List[Tuple[int, BaseModel]] = []
+    pending: Optional[asyncio.Task] = None
+    limit_exceeded = False
+
+    async def flush() -> Optional[asyncio.Task]:
+        rows = [row for row, _ in batch]
+        try:
+            documents = build_documents([item for _, item in batch])
+        except Exception as e:
+            for row in rows:
+                report.add_error(row, row_errors(e))
+            return pending
+        if pending is not None:
+            await pending
+        return asyncio.create_task(_insert_batch(collection, rows, documents, report))
+
+    try:
+        async for record in records:
+            if report.received >= max_rows:
+                limit_exceeded = True
+                break
+            report.received += 1
+            row = report.received
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ValueError("Row must be an object")
+                batch.append((row, model(**record)))
+            except (ValidationError, ValueError) as e:
+                report.add_error(row, row_errors(e))
+                continue
+
+            if len(batch) >= batch_size:
+                pending = await flush()
+                batch = []
+
+        if batch:
+            pending = await flush()
+        if pending is not None:
+            await pending
+    except BaseException:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        raise
+
+    if limit_exceeded:
+        raise TooManyRowsError(
+            f"Upload exceeds the limit of {max_rows} rows; only the first {max_rows} were processed "
+            f"({report.inserted} inserted, {report.failed} failed)"
+        )
+    return report.as_dict()
@@ -0,0 +1,173 @@
+"""Per-model document converters compiled from Pydantic field types.
+
+``prepare_for_mongo`` / ``parse_from_mongo`` in utils/database.py walk every
+key of every nested dict looking for dates. The converters here are built
+once per model from its annotations and only visit the field paths that can
+hold a date, e.g. for ``PeriodizedProgram`` just
+``macro_cycles[].start_date/end_date/assessment_date`` plus the top-level
+dates; micro cycles, routines and exercises are never walked.
+
+Fields typed ``Any`` or ``Dict[str, Any]`` may contain anything, so on write
+they fall back to the generic ``prepare_for_mongo``. On read they are left
+as stored: Pydantic keeps untyped values as they are and a stored ISO string
+serializes exactly like the datetime it came from.
+
+    dump_model(program)                              # model -> Mongo document
+    PeriodizedProgram(**load_document(PeriodizedProgram, doc))
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
+from datetime import datetime, date, time
+import types
+from pydantic import BaseModel
+
+from utils.database import mongo_date, prepare_for_mongo
+
+Convert = Callable[[Any], Any]
+
+def parse_datetime(value: Any) -> Any:
+    """Parse a stored ISO string; BSON datetimes and unparseable values pass through"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    return value
+
+def _dump_date(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return mongo_date(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _dump_time(value: Any) -> Any:
+    return value.strftime('%H:%M:%S') if isinstance(value, time) else value
+
+def _generic_dump(value: Any) -> Any:
+    if isinstance(value, dict):
+        return prepare_for_mongo(value)
+    if isinstance(value, list):
+        return [prepare_for_mongo(item) if isinstance(item, dict) else item for item in value]
+    return _dump_date(_dump_time(value))
+
+def _each(convert: Convert) -> Convert:
+    def convert_items(value):
+        if isinstance(value, (list, tuple)):
+            return [convert(item) for item in value]
+        return value
+    return convert_items
+
+def _each_value(convert: Convert) -> Convert:
+    def convert_values(value):
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        return value
+    return convert_values
+
+def _compile_type(annotation: Any, dump: bool) -> Optional[Convert]:
+    """Converter for one annotation, or None when values of this type never need converting"""
+    if annotation is Any:
+        return _generic_dump if dump else None
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            converter = converter_for(annotation)
+            if dump:
+                return converter.to_mongo if converter.dump_fields else None
+            return converter.from_mongo if converter.load_fields else None
+        if issubclass(annotation, datetime):
+            return _dump_date if dump else parse_datetime
+        if issubclass(annotation, date):
+            # Plain dates come back as ISO strings that Pydantic parses itself
+            return _dump_date if dump else None
+        if issubclass(annotation, time):
+            return _dump_time if dump else None
+        return None
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Union or origin is getattr(types, "UnionType", None):
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _compile_type(members[0], dump)
+        # Ambiguous unions: convert if any member might need it
+        if dump and any(_compile_type(member, dump) for member in members):
+            return _generic_dump
+        return None
+    if origin in (list, List, tuple, Tuple, set, frozenset):
+        item = _compile_type(args[0], dump) if args else _compile_type(Any, dump)
+        return _each(item) if item else None
+    if origin in (dict, Dict):
+        value = _compile_type(args[1], dump) if len(args) == 2 else _compile_type(Any, dump)
+        return _each_value(value) if value else None
+    # Literal, constrained and other special forms hold plain values
+    return None
+
+class ModelConverter:
+    """Converts documents of one model to and from their stored form.
+
+    Only the fields whose type can hold a date (directly or nested) are
+    touched; the document is copied shallowly at each converted level.
+    """
+
+    def __init__(self, model: type):
+        self.model = model
+        self._dumpers: List[Tuple[str, Convert]] = []
+        self._loaders: List[Tuple[str, Convert]] = []
+
+    def _compile(self) -> None:
+        for name, field in self.model.model_fields.items():
+            dumper = _compile_type(field.annotation, dump=True)
+            if dumper:
+                self._dumpers.append((name, dumper))
+            loader = _compile_type(field.annotation, dump=False)
+            if loader:
+                self._loaders.append((name, loader))
+
+    @property
+    def dump_fields(self) -> List[str]:
+        """Fields converted on write"""
+        return [name for name, _ in self._dumpers]
+
+    @property
+    def load_fields(self) -> List[str]:
+        """Fields converted on read"""
+        return [name for name, _ in self._loaders]
+
+    def to_mongo(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(data, dict):
+            return data
+        result = dict(data)
+        for name, convert in self._dumpers:
+            value = result.get(name)
+            if value is not None:
+                result[name] = convert(value)
+        return result
+
+    def from_mongo(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(doc, dict):
+            return doc
+        result = dict(doc)
+        for name, convert in self._loaders:
+            value = result.get(name)
+            if value is not None:
+                result[name] = convert(value)
+        return result
+
+_CONVERTERS: Dict[type, ModelConverter] = {}
+
+def converter_for(model: type) -> ModelConverter:
+    """The compiled converter of a model, built on first use"""
+    converter = _CONVERTERS.get(model)
+    if converter is None:
+        converter = _CONVERTERS[model] = ModelConverter(model)
+        converter._compile()
+    return converter
+
+def dump_model(obj: BaseModel) -> Dict[str, Any]:
+    """Model instance -> document ready to insert"""
+    return converter_for(type(obj)).to_mongo(obj.dict())
+
+def load_document(model: type, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored document -> dict ready for ``model(**...)``"""
+    return converter_for(model).from_mongo(doc)
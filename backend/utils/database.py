@@ -1,25 +1,50 @@
 from datetime import datetime, date, time, timezone
 from typing import Dict, Any
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-database_name = os.environ.get('DB_NAME', 'soccer_training_db')
-client = AsyncIOMotorClient(mongo_url)
-db = client[database_name]
+from utils.db_lifecycle import mongo
+
+# MongoDB connection: one lazily created, pooled client per process (see utils/db_lifecycle.py)
+db = mongo.db
+
+# How datetimes are persisted: "iso" keeps the legacy ISO-8601 strings, "bson"
+# stores native BSON datetimes so date ranges and sorts are evaluated by MongoDB.
+# Existing collections are converted with `python -m utils.migrate_dates`.
+DATE_STORAGE_MODE = os.environ.get('DATE_STORAGE_MODE', 'iso').lower()
+
+# Fields that hold datetimes in any collection
+DATE_FIELDS = (
+    'created_at', 'updated_at', 'test_date', 'completion_date', 'measurement_date',
+    'start_date', 'end_date', 'assessment_date', 'program_start_date', 'next_assessment_date',
+    'retest_date', 'date', 'saved_at', 'benchmark_date', 'unlocked_at', 'last_login',
+    'scheduled_at', 'delivered_at', 'reminded_at'
+)
 
 def get_database():
     """Get database connection"""
     return db
 
+def mongo_date(value: datetime):
+    """Convert a datetime to the stored representation, for use in query filters
+
+    Naive values are taken as UTC and aware ones converted to it, so ISO
+    strings always carry ``+00:00`` and compare in time order.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    else:
+        value = value.astimezone(timezone.utc)
+    if DATE_STORAGE_MODE == 'bson':
+        return value
+    return value.isoformat()
+
 def prepare_for_mongo(data: Dict[str, Any]) -> Dict[str, Any]:
     """Prepare data for MongoDB storage by converting Python objects to serializable formats"""
     if isinstance(data, dict):
         result = {}
         for key, value in data.items():
             if isinstance(value, datetime):
-                result[key] = value.isoformat()
+                result[key] = mongo_date(value)
             elif isinstance(value, date):
                 result[key] = value.isoformat()
             elif isinstance(value, time):
@@ -38,8 +63,7 @@ def parse_from_mongo(data: Dict[str, Any]) -> Dict[str, Any]:
     if isinstance(data, dict):
         result = {}
         for key, value in data.items():
-            if key in ['created_at', 'updated_at', 'test_date', 'completion_date', 'measurement_date', 
-                      'start_date', 'end_date', 'assessment_date', 'program_start_date', 'next_assessment_date', 'retest_date', 'date']:
+            if key in DATE_FIELDS:
                 if isinstance(value, str):
                     try:
                         # Handle ISO format with timezone
@@ -0,0 +1,283 @@
+"""One pooled Motor client per process, created lazily and closed on shutdown.
+
+``mongo.db`` (re-exported as ``utils.database.db``) stands in for the
+database from import time on; the client behind it is built on first use,
+normally by ``connect()`` in the app lifespan, from:
+
+- ``MONGO_URL`` / ``DB_NAME``
+- ``MONGO_MIN_POOL_SIZE`` / ``MONGO_MAX_POOL_SIZE`` / ``MONGO_MAX_IDLE_TIME_MS``
+- ``MONGO_CONNECT_TIMEOUT_MS`` / ``MONGO_SERVER_SELECTION_TIMEOUT_MS`` /
+  ``MONGO_SOCKET_TIMEOUT_MS`` / ``MONGO_WAIT_QUEUE_TIMEOUT_MS``
+- ``MONGO_COMPRESSORS``, e.g. ``zstd,snappy,zlib`` (zstd and snappy need the
+  ``zstandard`` / ``python-snappy`` packages; unavailable ones are skipped)
+- ``MONGO_<CLASS>_WRITE_CONCERN`` / ``MONGO_<CLASS>_READ_CONCERN`` per
+  collection class (see ``COLLECTION_CLASSES``); unset means the server
+  default.
+
+``PoolMonitor`` records connection checkouts, so ``stats()`` shows how long
+requests wait for a pooled connection and how close the pool is to
+saturation (also served at ``/health/db``); ``utils.metrics.command_monitor``
+attributes each command to the request that issued it (``/metrics``).
+
+``STORAGE_BACKEND=memory`` replaces MongoDB with the in-memory, indexed
+store of ``utils/memory_store.py``: no client is created, and the whole API
+runs without a database (for benchmarks, load tests and tests).
+"""
+
+from typing import Any, Dict, Optional
+import bisect
+import logging
+import os
+import threading
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from utils.metrics import command_monitor
+
+logger = logging.getLogger(__name__)
+
+# Collections grouped by how much durability their writes need
+COLLECTION_CLASSES: Dict[str, tuple] = {
+    "critical": (
+        "users", "user_profiles", "saved_reports", "assessments", "assessment_benchmarks",
+        "periodized_programs", "retest_schedules",
+    ),
+    "activity": (
+        "progress", "daily_progress", "weekly_progress", "performance_metrics", "exercise_completions",
+        "notifications", "notification_counters", "trophies", "achievement_state", "player_summary",
+    ),
+}
+DEFAULT_CLASS = "default"
+
+# Checkout wait histogram bucket bounds, in milliseconds
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+def _write_concern(value: Optional[str]) -> Optional[WriteConcern]:
+    if not value:
+        return None
+    return WriteConcern(w=int(value) if value.isdigit() else value)
+
+def _read_concern(value: Optional[str]) -> Optional[ReadConcern]:
+    return ReadConcern(value) if value else None
+
+def collection_class(name: str) -> str:
+    for class_name, collections in COLLECTION_CLASSES.items():
+        if name in collections:
+            return class_name
+    return DEFAULT_CLASS
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool events -> checkout wait times and pool occupancy.
+
+    pymongo checks connections out synchronously on the calling thread, so
+    the start of a checkout is kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.checkouts = 0
+            self.failures: Dict[str, int] = {}
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.pool_clears = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = (time.perf_counter() - getattr(self._local, "started", time.perf_counter())) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, waited)] += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            reason = str(event.reason)
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self, max_pool_size: int) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets["gt_{}ms".format(WAIT_BUCKETS_MS[-1])] = self.wait_buckets[-1]
+            return {
+                "max_pool_size": max_pool_size,
+                "connections_open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "saturation": round(self.in_use / max_pool_size, 3) if max_pool_size else None,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.failures),
+                "checkout_wait_ms": {
+                    "avg": round(self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                    "max": round(self.wait_max, 3),
+                    "buckets": buckets,
+                },
+                "pool_clears": self.pool_clears,
+            }
+
+class LazyDatabase:
+    """Stands in for the AsyncIOMotorDatabase; collections carry their class's concerns"""
+
+    # Database-level methods forwarded as they are
+    _DATABASE_ATTRIBUTES = frozenset({
+        "command", "list_collection_names", "list_collections", "aggregate", "watch",
+        "drop_collection", "create_collection", "get_collection", "client", "name",
+    })
+
+    def __init__(self, lifecycle: "MongoLifecycle"):
+        self._lifecycle = lifecycle
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._DATABASE_ATTRIBUTES:
+            return getattr(self._lifecycle.database, name)
+        return self._lifecycle.collection(name)
+
+    def __getitem__(self, name: str):
+        return self._lifecycle.collection(name)
+
+class MongoLifecycle:
+    def __init__(self):
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._database = None
+        self._collections: Dict[str, Any] = {}
+        self.monitor = PoolMonitor()
+        self.db = LazyDatabase(self)
+        self.max_pool_size = 100
+
+    def _client_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"tz_aware": True, "event_listeners": [self.monitor, command_monitor]}
+        for option, variable in (
+            ("minPoolSize", "MONGO_MIN_POOL_SIZE"),
+            ("maxPoolSize", "MONGO_MAX_POOL_SIZE"),
+            ("maxIdleTimeMS", "MONGO_MAX_IDLE_TIME_MS"),
+            ("connectTimeoutMS", "MONGO_CONNECT_TIMEOUT_MS"),
+            ("serverSelectionTimeoutMS", "MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+            ("socketTimeoutMS", "MONGO_SOCKET_TIMEOUT_MS"),
+            ("waitQueueTimeoutMS", "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        ):
+            value = _env_int(variable)
+            if value is not None:
+                options[option] = value
+        compressors = os.environ.get('MONGO_COMPRESSORS')
+        if compressors:
+            options["compressors"] = compressors
+        return options
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            options = self._client_options()
+            self._client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), **options)
+            self.max_pool_size = options.get("maxPoolSize", 100)
+            logger.info(
+                f"MongoDB client created (pool {options.get('minPoolSize', 0)}-{self.max_pool_size}, "
+                f"compressors: {options.get('compressors', 'none')})"
+            )
+        return self._client
+
+    @property
+    def storage_backend(self) -> str:
+        return os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+
+    @property
+    def database(self):
+        if self._database is None:
+            name = os.environ.get('DB_NAME', 'soccer_training_db')
+            if self.storage_backend == "memory":
+                from utils.memory_store import MemoryDatabase
+                self._database = MemoryDatabase(name)
+                logger.info(f"Using the in-memory storage backend for {name}; data is not persisted")
+            else:
+                self._database = self.client[name]
+        return self._database
+
+    def collection(self, name: str):
+        collection = self._collections.get(name)
+        if collection is None:
+            class_name = collection_class(name).upper()
+            collection = self.database.get_collection(
+                name,
+                write_concern=_write_concern(os.environ.get(f'MONGO_{class_name}_WRITE_CONCERN')),
+                read_concern=_read_concern(os.environ.get(f'MONGO_{class_name}_READ_CONCERN')),
+            )
+            self._collections[name] = collection
+        return collection
+
+    async def connect(self) -> None:
+        """Create the client (idempotent); call from the app lifespan"""
+        self.database
+
+    async def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._database = None
+            self._collections.clear()
+            logger.info("MongoDB client closed")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.monitor.stats(self.max_pool_size)
+
+    async def health(self) -> Dict[str, Any]:
+        """Ping the server; raises if it cannot be reached"""
+        start = time.perf_counter()
+        await self.database.command("ping")
+        return {
+            "status": "healthy",
+            "storage_backend": self.storage_backend,
+            "ping_ms": round((time.perf_counter() - start) * 1000, 3),
+            "pool": self.stats(),
+        }
+
+# Process-wide lifecycle; utils.database.db is mongo.db
+mongo = MongoLifecycle()
@@ -0,0 +1,166 @@
+"""In-process exercise catalog and compact exercise references.
+
+Periodized programs used to embed a full copy of every ``EXERCISE_DATABASE``
+entry (instructions, purpose, progression tables...) in each daily routine.
+Programs now store only a reference per exercise::
+
+    {"id": "<instance uuid>", "exercise_key": "sprint_intervals_30m", "overrides": {...}}
+
+where ``overrides`` holds just the fields that differ from the catalog for that
+day. Full exercises are resolved at read time from the catalog below.
+
+Each program records the ``exercise_catalog_version`` it was written against,
+and every version a program was written with is archived in the
+``exercise_catalog`` collection (``archive_catalog``). Reads resolve references
+against the program's own version (``catalog_for``), so editing
+``EXERCISE_DATABASE`` never changes programs that were already written. A key
+missing from every catalog expands to a placeholder rather than failing the
+read. Documents written before this change embed full exercises and are passed
+through unchanged.
+"""
+
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from pymongo.errors import DuplicateKeyError
+
+from exercise_database import EXERCISE_DATABASE
+from utils.database import mongo_date
+
+logger = logging.getLogger(__name__)
+
+# Content hash of the catalog, stored on every compacted program
+CATALOG_VERSION = hashlib.sha256(
+    json.dumps(EXERCISE_DATABASE, sort_keys=True).encode()
+).hexdigest()[:12]
+
+# Per-instance fields that are never part of the catalog entry
+INSTANCE_FIELDS = ("id", "exercise_key")
+
+VERSION_FIELD = "exercise_catalog_version"
+CATALOG_COLLECTION = "exercise_catalog"
+
+# Catalogs by version: the current one plus archived ones loaded on demand
+_catalogs: Dict[str, Dict[str, Dict[str, Any]]] = {CATALOG_VERSION: EXERCISE_DATABASE}
+_archived = False
+
+async def archive_catalog(db) -> None:
+    """Store the current catalog under its version (once per process), before programs reference it"""
+    global _archived
+    if _archived:
+        return
+    try:
+        await db[CATALOG_COLLECTION].update_one(
+            {"version": CATALOG_VERSION},
+            {"$setOnInsert": {
+                "version": CATALOG_VERSION,
+                "entries": EXERCISE_DATABASE,
+                "archived_at": mongo_date(datetime.now(timezone.utc)),
+            }},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Another worker archived it first
+        pass
+    _archived = True
+
+async def catalog_for(db, version: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """The catalog a program was written against (the current one for unversioned programs)"""
+    if version is None or version in _catalogs:
+        return _catalogs.get(version, EXERCISE_DATABASE)
+
+    archived = await db[CATALOG_COLLECTION].find_one({"version": version}, {"_id": 0, "entries": 1})
+    if archived is None:
+        logger.warning(f"Exercise catalog {version} is not archived; resolving against {CATALOG_VERSION}")
+        return EXERCISE_DATABASE
+    _catalogs[version] = archived["entries"]
+    return archived["entries"]
+
+def missing_exercise(exercise_key: str) -> Dict[str, Any]:
+    """Stand-in for a key found in no catalog, so the rest of the program still reads"""
+    return {
+        "name": exercise_key,
+        "category": "unknown",
+        "description": "",
+        "instructions": [],
+        "purpose": "",
+        "expected_outcome": "",
+        "duration": 0,
+        "intensity": "low",
+    }
+
+def get_exercise(exercise_key: str) -> Optional[Dict[str, Any]]:
+    """Look up a catalog entry by key"""
+    return EXERCISE_DATABASE.get(exercise_key)
+
+def is_reference(exercise: Dict[str, Any]) -> bool:
+    """True for compact references, False for legacy embedded exercises"""
+    return "exercise_key" in exercise and "name" not in exercise
+
+def compact_exercise(exercise: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace an embedded exercise by a reference plus the fields that differ from the catalog"""
+    entry = get_exercise(exercise.get("exercise_key") or "")
+    if entry is None:
+        # Not a catalog exercise (e.g. AI generated); keep it embedded
+        return exercise
+
+    ref = {"id": exercise.get("id"), "exercise_key": exercise["exercise_key"]}
+    overrides = {
+        field: value for field, value in exercise.items()
+        if field not in INSTANCE_FIELDS and value != entry.get(field)
+    }
+    if overrides:
+        ref["overrides"] = overrides
+    return ref
+
+def expand_exercise(exercise: Dict[str, Any], catalog: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Resolve a reference into a full exercise. Legacy embedded exercises pass through."""
+    if not is_reference(exercise):
+        return exercise
+    key = exercise["exercise_key"]
+    entry = (catalog or EXERCISE_DATABASE).get(key) or get_exercise(key)
+    if entry is None:
+        logger.warning(f"Exercise {key} is in no catalog; expanding a placeholder")
+        entry = missing_exercise(key)
+    return {
+        **entry,
+        **exercise.get("overrides", {}),
+        "id": exercise.get("id"),
+        "exercise_key": exercise["exercise_key"],
+    }
+
+def compact_routine(routine: Dict[str, Any]) -> Dict[str, Any]:
+    return {**routine, "exercises": [compact_exercise(ex) for ex in routine.get("exercises", [])]}
+
+def expand_routine(routine: Dict[str, Any], catalog: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    return {**routine, "exercises": [expand_exercise(ex, catalog) for ex in routine.get("exercises", [])]}
+
+def _map_routines(program: Dict[str, Any], routine_fn) -> List[Dict[str, Any]]:
+    return [
+        {
+            **macro_cycle,
+            "micro_cycles": [
+                {
+                    **micro_cycle,
+                    "daily_routines": [routine_fn(routine) for routine in micro_cycle.get("daily_routines", [])]
+                }
+                for micro_cycle in macro_cycle.get("micro_cycles", [])
+            ]
+        }
+        for macro_cycle in program.get("macro_cycles", [])
+    ]
+
+def compact_program(program: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepare a periodized program document for storage"""
+    return {
+        **program,
+        "macro_cycles": _map_routines(program, compact_routine),
+        VERSION_FIELD: CATALOG_VERSION,
+    }
+
+def expand_program(program: Dict[str, Any], catalog: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Resolve every exercise reference in a stored periodized program against ``catalog``
+    (from ``catalog_for``; the current catalog by default)"""
+    return {**program, "macro_cycles": _map_routines(program, lambda routine: expand_routine(routine, catalog))}
@@ -0,0 +1,165 @@
+# Youth Handbook assessment standards shared by every scoring path
+# Each table maps age category -> metric -> excellent/good/average/poor thresholds
+
+# Youth Handbook Standards - Age-based performance benchmarks
+YOUTH_HANDBOOK_STANDARDS = {
+    "12-14": {
+        "sprint_30m": {"excellent": 4.5, "good": 4.8, "average": 5.1, "poor": 5.4},
+        "yo_yo_test": {"excellent": 1400, "good": 1200, "average": 1000, "poor": 800},
+        "vo2_max": {"excellent": 52, "good": 50, "average": 49, "poor": 48},
+        "vertical_jump": {"excellent": 45, "good": 40, "average": 35, "poor": 30},
+        "body_fat": {"excellent": 8, "good": 10, "average": 12, "poor": 15},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
+        "dribbling_success": {"excellent": 80, "good": 70, "average": 60, "poor": 50},
+        "shooting_accuracy": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
+        "defensive_duels": {"excellent": 85, "good": 75, "average": 65, "poor": 55},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "15-16": {
+        "sprint_30m": {"excellent": 4.2, "good": 4.5, "average": 4.8, "poor": 5.1},
+        "yo_yo_test": {"excellent": 1600, "good": 1400, "average": 1200, "poor": 1000},
+        "vo2_max": {"excellent": 56, "good": 54, "average": 53, "poor": 52},
+        "vertical_jump": {"excellent": 50, "good": 45, "average": 40, "poor": 35},
+        "body_fat": {"excellent": 7, "good": 9, "average": 11, "poor": 14},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 88, "good": 83, "average": 78, "poor": 73},
+        "dribbling_success": {"excellent": 83, "good": 73, "average": 63, "poor": 53},
+        "shooting_accuracy": {"excellent": 78, "good": 73, "average": 68, "poor": 63},
+        "defensive_duels": {"excellent": 88, "good": 78, "average": 68, "poor": 58},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "17-18": {
+        "sprint_30m": {"excellent": 4.0, "good": 4.3, "average": 4.6, "poor": 4.9},
+        "yo_yo_test": {"excellent": 1800, "good": 1600, "average": 1400, "poor": 1200},
+        "vo2_max": {"excellent": 60, "good": 58, "average": 57, "poor": 56},
+        "vertical_jump": {"excellent": 55, "good": 50, "average": 45, "poor": 40},
+        "body_fat": {"excellent": 6, "good": 8, "average": 10, "poor": 13},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 90, "good": 85, "average": 80, "poor": 75},
+        "dribbling_success": {"excellent": 85, "good": 75, "average": 65, "poor": 55},
+        "shooting_accuracy": {"excellent": 80, "good": 75, "average": 70, "poor": 65},
+        "defensive_duels": {"excellent": 90, "good": 80, "average": 70, "poor": 60},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "elite": {
+        "sprint_30m": {"excellent": 3.8, "good": 4.0, "average": 4.2, "poor": 4.5},
+        "yo_yo_test": {"excellent": 2200, "good": 2000, "average": 1800, "poor": 1600},
+        "vo2_max": {"excellent": 65, "good": 62, "average": 60, "poor": 58},
+        "vertical_jump": {"excellent": 65, "good": 60, "average": 55, "poor": 50},
+        "body_fat": {"excellent": 5, "good": 7, "average": 9, "poor": 12},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 92, "good": 88, "average": 84, "poor": 80},
+        "dribbling_success": {"excellent": 88, "good": 80, "average": 72, "poor": 64},
+        "shooting_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
+        "defensive_duels": {"excellent": 92, "good": 84, "average": 76, "poor": 68},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    }
+}
+
+# Standards behind the 0-5 category ratings stored on assessments by server.py
+FIVE_POINT_HANDBOOK_STANDARDS = {
+    "12-14": {
+        "sprint_30m": {"excellent": 4.5, "good": 4.7, "average": 4.9, "poor": 5.0},
+        "yo_yo_test": {"excellent": 1200, "good": 1000, "average": 900, "poor": 800},
+        "vo2_max": {"excellent": 52, "good": 50, "average": 49, "poor": 48},
+        "vertical_jump": {"excellent": 40, "good": 35, "average": 32, "poor": 30},
+        "body_fat": {"excellent": 12, "good": 15, "average": 16, "poor": 18},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
+        "dribbling_success": {"excellent": 55, "good": 50, "average": 45, "poor": 40},
+        "shooting_accuracy": {"excellent": 60, "good": 55, "average": 50, "poor": 45},
+        "defensive_duels": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "15-16": {
+        "sprint_30m": {"excellent": 4.2, "good": 4.4, "average": 4.6, "poor": 4.7},
+        "yo_yo_test": {"excellent": 1600, "good": 1400, "average": 1300, "poor": 1200},
+        "vo2_max": {"excellent": 56, "good": 54, "average": 53, "poor": 52},
+        "vertical_jump": {"excellent": 50, "good": 45, "average": 42, "poor": 40},
+        "body_fat": {"excellent": 10, "good": 12, "average": 14, "poor": 15},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
+        "dribbling_success": {"excellent": 65, "good": 60, "average": 55, "poor": 50},
+        "shooting_accuracy": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
+        "defensive_duels": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "17-18": {
+        "sprint_30m": {"excellent": 4.0, "good": 4.2, "average": 4.4, "poor": 4.5},
+        "yo_yo_test": {"excellent": 2000, "good": 1800, "average": 1700, "poor": 1600},
+        "vo2_max": {"excellent": 60, "good": 58, "average": 57, "poor": 56},
+        "vertical_jump": {"excellent": 60, "good": 55, "average": 52, "poor": 50},
+        "body_fat": {"excellent": 8, "good": 10, "average": 11, "poor": 12},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 90, "good": 85, "average": 80, "poor": 75},
+        "dribbling_success": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
+        "shooting_accuracy": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
+        "defensive_duels": {"excellent": 80, "good": 75, "average": 70, "poor": 65},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    },
+    "elite": {
+        "sprint_30m": {"excellent": 3.8, "good": 3.9, "average": 4.0, "poor": 4.1},
+        "yo_yo_test": {"excellent": 2400, "good": 2300, "average": 2200, "poor": 2100},
+        "vo2_max": {"excellent": 65, "good": 62, "average": 60, "poor": 58},
+        "vertical_jump": {"excellent": 70, "good": 65, "average": 60, "poor": 55},
+        "body_fat": {"excellent": 6, "good": 8, "average": 9, "poor": 10},
+        "ball_control": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "passing_accuracy": {"excellent": 95, "good": 90, "average": 85, "poor": 80},
+        "dribbling_success": {"excellent": 75, "good": 70, "average": 65, "poor": 60},
+        "shooting_accuracy": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
+        "defensive_duels": {"excellent": 85, "good": 80, "average": 75, "poor": 70},
+        "game_intelligence": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "positioning": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "decision_making": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "coachability": {"excellent": 5, "good": 4, "average": 3, "poor": 2},
+        "mental_toughness": {"excellent": 5, "good": 4, "average": 3, "poor": 2}
+    }
+}
+
+# Category weights used for the overall score
+CATEGORY_WEIGHTS = {
+    'physical': 0.20,
+    'technical': 0.40, 
+    'tactical': 0.30,
+    'psychological': 0.10
+}
+
+# Metrics belonging to each category
+CATEGORY_METRICS = {
+    'physical': ['sprint_30m', 'yo_yo_test', 'vo2_max', 'vertical_jump', 'body_fat'],
+    'technical': ['ball_control', 'passing_accuracy', 'dribbling_success', 'shooting_accuracy', 'defensive_duels'],
+    'tactical': ['game_intelligence', 'positioning', 'decision_making'],
+    'psychological': ['coachability', 'mental_toughness']
+}
+
+# Metrics where a lower value is better (sprint times, body fat)
+LOWER_IS_BETTER_METRICS = ['sprint_30m', 'body_fat']
@@ -0,0 +1,224 @@
+"""MongoDB index bootstrap and query-plan verification.
+
+Every query shape the routers issue is declared here next to the index that
+serves it. ``ensure_indexes`` creates the indexes idempotently at startup and
+``verify_query_plans`` runs ``explain`` on a registry of canonical queries,
+logging (or failing on) any that would still fall back to a COLLSCAN.
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+import os
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Plan check mode: "off", "warn" (log COLLSCANs) or "strict" (fail startup)
+INDEX_PLAN_CHECK = os.environ.get('INDEX_PLAN_CHECK', 'warn').lower()
+
+# Index declarations per collection. Paginated list shapes end with _id so the
+# keyset (sort field, _id) order is served by the index (see utils/pagination.py)
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "assessments": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("player_name", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("player_name", ASCENDING), ("assessment_date", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "progress": [
+        IndexModel([("player_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("metric_type", ASCENDING)]),
+    ],
+    "daily_progress": [
+        IndexModel([("player_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "weekly_progress": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("program_id", ASCENDING), ("week_number", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "performance_metrics": [
+        IndexModel([("player_id", ASCENDING), ("measurement_date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("metric_name", ASCENDING), ("measurement_date", DESCENDING)]),
+    ],
+    "periodized_programs": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "training_programs": [
+        IndexModel([("player_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "vo2_benchmarks": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("test_date", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "trophies": [
+        IndexModel([("player_id", ASCENDING), ("unlocked_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "achievement_state": [
+        IndexModel([("player_id", ASCENDING)], unique=True),
+    ],
+    "notifications": [
+        IndexModel([("player_id", ASCENDING), ("delivered_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("player_id", ASCENDING), ("is_read", ASCENDING)]),
+        IndexModel([("delivered_at", ASCENDING), ("scheduled_at", ASCENDING)]),
+        IndexModel(
+            [("player_id", ASCENDING), ("dedupe_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$type": "string"}},
+        ),
+    ],
+    "exercise_catalog": [
+        IndexModel([("version", ASCENDING)], unique=True),
+    ],
+    "player_summary": [
+        IndexModel([("player_id", ASCENDING)], unique=True),
+    ],
+    "notification_counters": [
+        IndexModel([("player_id", ASCENDING)], unique=True),
+    ],
+    "group_trainings": [
+        IndexModel([("creator_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("members", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("invited_members", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "retest_schedules": [
+        IndexModel([("player_id", ASCENDING), ("retest_date", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("reminded_at", ASCENDING), ("retest_date", ASCENDING)]),
+    ],
+    "voice_notes": [
+        IndexModel([("player_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "user_profiles": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "saved_reports": [
+        IndexModel([("user_id", ASCENDING), ("saved_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+    "assessment_benchmarks": [
+        IndexModel([("user_id", ASCENDING), ("player_name", ASCENDING), ("benchmark_date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("benchmark_date", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+}
+
+# Canonical query shapes that must be served by an index
+CANONICAL_QUERIES: List[Dict[str, Any]] = [
+    {"collection": "assessments", "filter": {"id": ""}},
+    {"collection": "assessments", "filter": {"player_name": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "assessments", "filter": {"player_name": ""}, "sort": [("assessment_date", ASCENDING), ("_id", ASCENDING)]},
+    {"collection": "assessments", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "assessments", "filter": {}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "progress", "filter": {"player_id": ""}, "sort": [("date", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "daily_progress", "filter": {"player_id": ""}, "sort": [("date", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "weekly_progress", "filter": {"player_id": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "weekly_progress", "filter": {"player_id": "", "program_id": ""}, "sort": [("week_number", ASCENDING), ("_id", ASCENDING)]},
+    {"collection": "performance_metrics", "filter": {"player_id": ""}, "sort": [("measurement_date", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "periodized_programs", "filter": {"player_id": ""}, "sort": [("created_at", DESCENDING)]},
+    {"collection": "training_programs", "filter": {"player_id": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "vo2_benchmarks", "filter": {"player_id": ""}, "sort": [("test_date", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "trophies", "filter": {"player_id": ""}, "sort": [("unlocked_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "notifications", "filter": {"player_id": "", "delivered_at": {"$ne": None}}, "sort": [("delivered_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "notifications", "filter": {"player_id": "", "delivered_at": {"$gt": ""}}, "sort": [("delivered_at", ASCENDING), ("_id", ASCENDING)]},
+    {"collection": "notifications", "filter": {"delivered_at": None, "scheduled_at": {"$lte": ""}}},
+    {"collection": "exercise_catalog", "filter": {"version": ""}},
+    {"collection": "retest_schedules", "filter": {"player_id": ""}, "sort": [("retest_date", ASCENDING), ("_id", ASCENDING)]},
+    {"collection": "group_trainings", "filter": {"creator_id": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "voice_notes", "filter": {"player_id": ""}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "users", "filter": {"username": ""}},
+    {"collection": "users", "filter": {"email": ""}},
+    {"collection": "users", "filter": {"id": ""}},
+    {"collection": "user_profiles", "filter": {"user_id": ""}},
+    {"collection": "saved_reports", "filter": {"user_id": ""}, "sort": [("saved_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "assessment_benchmarks", "filter": {"user_id": "", "player_name": ""}, "sort": [("benchmark_date", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "assessment_benchmarks", "filter": {"user_id": ""}, "sort": [("benchmark_date", DESCENDING), ("_id", DESCENDING)]},
+]
+
+class QueryPlanError(RuntimeError):
+    """Raised in strict mode when a canonical query is not served by an index"""
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create all declared indexes. Safe to run on every startup."""
+    created = {}
+    for collection_name, indexes in INDEX_SPECS.items():
+        try:
+            created[collection_name] = await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # Fall back to one index at a time so a single conflict (e.g. an
+            # existing index with different options) does not block the rest
+            logger.warning(f"Bulk index creation failed on {collection_name}: {e}")
+            created[collection_name] = []
+            for index in indexes:
+                try:
+                    created[collection_name] += await db[collection_name].create_indexes([index])
+                except OperationFailure as index_error:
+                    logger.error(f"Could not create index {index.document['key']} on {collection_name}: {index_error}")
+    logger.info(f"Ensured indexes on {len(created)} collections")
+    return created
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Collect every stage name in an explain plan tree"""
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    if "queryPlan" in plan:
+        stages += _plan_stages(plan["queryPlan"])
+    return stages
+
+def _winning_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    planner = explain.get("queryPlanner", {})
+    return planner.get("winningPlan", {})
+
+async def explain_query(db, query: Dict[str, Any]) -> List[str]:
+    """Return the stage names of the winning plan for a canonical query"""
+    command = {"find": query["collection"], "filter": query["filter"]}
+    if query.get("sort"):
+        command["sort"] = dict(query["sort"])
+    explain = await db.command("explain", command, verbosity="queryPlanner")
+    return _plan_stages(_winning_plan(explain))
+
+async def verify_query_plans(db, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Explain every canonical query and report the ones that use a COLLSCAN.
+
+    In "warn" mode offenders are logged; in "strict" mode a QueryPlanError is
+    raised so the process refuses to start with unindexed hot paths.
+    """
+    mode = (mode or INDEX_PLAN_CHECK).lower()
+    if mode == "off":
+        return []
+
+    collscans = []
+    for query in CANONICAL_QUERIES:
+        try:
+            stages = await explain_query(db, query)
+        except OperationFailure as e:
+            logger.warning(f"Could not explain query on {query['collection']}: {e}")
+            continue
+        if "COLLSCAN" in stages:
+            collscans.append({**query, "stages": stages})
+            logger.warning(
+                f"COLLSCAN for {query['collection']} filter={list(query['filter'])} "
+                f"sort={query.get('sort')}: {stages}"
+            )
+
+    if collscans and mode == "strict":
+        raise QueryPlanError(f"{len(collscans)} canonical queries fall back to COLLSCAN")
+    if not collscans:
+        logger.info(f"All {len(CANONICAL_QUERIES)} canonical queries use an index")
+    return collscans
+
+async def bootstrap_indexes(db) -> None:
+    """Startup hook: create indexes, then verify canonical query plans"""
+    await ensure_indexes(db)
+    await verify_query_plans(db)
@@ -1,120 +1,199 @@
 import os
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+import asyncio
+import hashlib
 import logging
 import json
-from typing import Dict, Any, List
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.llm_jobs import llm_jobs
+from utils.scoring_kernel import METRICS
 
 logger = logging.getLogger(__name__)
 
+# "emergent" calls the hosted model, "stub" answers locally so the generation
+# pipeline can be load-tested offline
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'emergent').lower()
+LLM_STUB_LATENCY_MS = int(os.environ.get('LLM_STUB_LATENCY_MS', '0'))
+
+DEFAULT_MODEL = ("openai", "gpt-4o")
+
+class StubUserMessage:
+    """Stand-in for emergentintegrations' UserMessage"""
+
+    def __init__(self, text: str = "", content: Optional[str] = None):
+        self.text = text or content or ""
+        self.content = self.text
+
+class StubLlmChat:
+    """Offline LLM with the LlmChat interface; answers deterministically after a configurable delay"""
+
+    def __init__(self, api_key: Optional[str] = None, session_id: Optional[str] = None, system_message: Optional[str] = None):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider: str, model: str) -> "StubLlmChat":
+        return self
+
+    async def send_message(self, message) -> str:
+        if LLM_STUB_LATENCY_MS:
+            await asyncio.sleep(LLM_STUB_LATENCY_MS / 1000)
+        digest = hashlib.sha256(message.text.encode()).hexdigest()[:12]
+        return f"[stub program {digest}]\n{message.text.strip()[:500]}"
+
+    async def chat_async(self, messages: List[Any]) -> SimpleNamespace:
+        return SimpleNamespace(content=await self.send_message(messages[-1]))
+
+def create_chat(session_id: Optional[str] = None, system_message: Optional[str] = None,
+                model: Tuple[str, str] = DEFAULT_MODEL):
+    """Build a chat client for the configured backend"""
+    if LLM_BACKEND == 'stub':
+        return StubLlmChat(session_id=session_id, system_message=system_message).with_model(*model)
+
+    from emergentintegrations.llm.chat import LlmChat
+    return LlmChat(
+        api_key=os.environ.get('EMERGENT_LLM_KEY'),
+        session_id=session_id,
+        system_message=system_message
+    ).with_model(*model)
+
+def user_message(text: str):
+    """Build a user message for the configured backend"""
+    if LLM_BACKEND == 'stub':
+        return StubUserMessage(text=text)
+
+    from emergentintegrations.llm.chat import UserMessage
+    return UserMessage(text=text)
+
 def get_llm_client():
     """Get LLM client with Emergent integration"""
     try:
+        if LLM_BACKEND == 'stub':
+            return StubLlmChat()
+
         # Get the Emergent LLM key from environment
         api_key = os.environ.get('EMERGENT_LLM_KEY')
         if not api_key:
             raise ValueError("EMERGENT_LLM_KEY not found in environment variables")
         
+        from emergentintegrations.llm.chat import LlmChat
         return LlmChat(api_key=api_key)
     except Exception as e:
         logger.error(f"Error initializing LLM client: {e}")
         raise
 
+# Assessment fields that appear in generation prompts
+PROMPT_ASSESSMENT_FIELDS = ("player_name", "age", "position") + METRICS
+
+def prompt_inputs(assessment_data: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """The subset of inputs a prompt depends on, used as the generation cache key"""
+    inputs = {field: assessment_data.get(field) for field in PROMPT_ASSESSMENT_FIELDS}
+    inputs.update(extra)
+    return inputs
+
 async def generate_training_program(assessment_data: Dict[str, Any], week_number: int = 1, language: str = "en") -> str:
     """Generate AI-powered training program based on assessment data"""
     try:
-        llm_client = get_llm_client()
-        
-        # Create assessment text
-        assessment_text = f"""
-        Player: {assessment_data['player_name']}
-        Age: {assessment_data['age']} years
-        Position: {assessment_data['position']}
-        
-        Current Week: {week_number}/14
-        
-        Physical Metrics (20%):
-        - 30m Sprint: {assessment_data['sprint_30m']} seconds
-        - Yo-Yo Test: {assessment_data['yo_yo_test']} meters
-        - VO2 Max: {assessment_data['vo2_max']} ml/kg/min
-        - Vertical Jump: {assessment_data['vertical_jump']} cm
-        - Body Fat: {assessment_data['body_fat']}%
-        
-        Technical Skills (40%):
-        - Ball Control: {assessment_data['ball_control']}/5
-        - Passing Accuracy: {assessment_data['passing_accuracy']}%
-        - Dribbling Success: {assessment_data['dribbling_success']}%
-        - Shooting Accuracy: {assessment_data['shooting_accuracy']}%
-        - Defensive Duels: {assessment_data['defensive_duels']}%
-        
-        Tactical Awareness (30%):
-        - Game Intelligence: {assessment_data['game_intelligence']}/5
-        - Positioning: {assessment_data['positioning']}/5
-        - Decision Making: {assessment_data['decision_making']}/5
-        
-        Psychological (10%):
-        - Coachability: {assessment_data['coachability']}/5
-        - Mental Toughness: {assessment_data['mental_toughness']}/5
-        """
-        
-        if language == "ar":
-            prompt = f"""
-            أنشئ برنامج تدريبي نخبوي متقدم وقابل للتكيف لـ يويو الفتى الناري للأسبوع {week_number}! 🔥👑
-
-            {assessment_text}
-
-            يرجى إنشاء برنامج نخبوي مليء بالطاقة والحماس يتضمن:
-            1. تمارين سرعة متقدمة (30% من التدريب)
-            2. تطوير المهارات التقنية تحت الضغط (40% من التدريب) 
-            3. ذكاء تكتيكي وقراءة اللعب (20% من التدريب)
-            4. القوة الذهنية والثقة (10% من التدريب)
-            
-            اجعل البرنامج:
-            - مُخصص لنقاط القوة والضعف المحددة
-            - متدرج في الصعوبة حسب الأسبوع
-            - يحتوي على تمارين ممتعة ومبتكرة
-            - يركز على تطوير اللاعب لمستوى النخبة
-            
-            قدم البرنامج بتنسيق منظم مع:
-            - جدول أسبوعي مفصل (5 أيام تدريب)
-            - أهداف واضحة لكل يوم
-            - تعليمات مفصلة للتمارين
-            - نصائح تحفيزية بأسلوب يويو الناري
-            """
-        else:
-            prompt = f"""
-            Create an elite advanced and adaptive training program for Yoyo the Fire Boy for week {week_number}! 🔥👑
-
-            {assessment_text}
-
-            Please create an elite program full of energy and enthusiasm that includes:
-            1. Advanced speed exercises (30% of training)
-            2. Technical skills development under pressure (40% of training)
-            3. Tactical intelligence and game reading (20% of training)
-            4. Mental strength and confidence (10% of training)
-            
-            Make the program:
-            - Customized to identified strengths and weaknesses
-            - Progressive in difficulty according to the week
-            - Contains fun and innovative exercises
-            - Focuses on developing the player to elite level
-            
-            Present the program in an organized format with:
-            - Detailed weekly schedule (5 training days)
-            - Clear objectives for each day
-            - Detailed exercise instructions
-            - Motivational tips in Yoyo the Fire Boy style
-            """
-        
-        messages = [UserMessage(content=prompt)]
-        response = await llm_client.chat_async(messages)
-        
-        return response.content
-        
+        return await llm_jobs.generate(
+            "training_program",
+            prompt_inputs(assessment_data, week_number=week_number, language=language),
+            lambda: request_training_program(assessment_data, week_number, language)
+        )
     except Exception as e:
         logger.error(f"Error generating training program: {e}")
         # Return a fallback program
         return generate_fallback_program(assessment_data, week_number, language)
 
+async def request_training_program(assessment_data: Dict[str, Any], week_number: int = 1, language: str = "en") -> str:
+    """Call the LLM for a training program (uncached, raises on failure)"""
+    llm_client = get_llm_client()
+    
+    # Create assessment text
+    assessment_text = f"""
+    Player: {assessment_data['player_name']}
+    Age: {assessment_data['age']} years
+    Position: {assessment_data['position']}
+    
+    Current Week: {week_number}/14
+    
+    Physical Metrics (20%):
+    - 30m Sprint: {assessment_data['sprint_30m']} seconds
+    - Yo-Yo Test: {assessment_data['yo_yo_test']} meters
+    - VO2 Max: {assessment_data['vo2_max']} ml/kg/min
+    - Vertical Jump: {assessment_data['vertical_jump']} cm
+    - Body Fat: {assessment_data['body_fat']}%
+    
+    Technical Skills (40%):
+    - Ball Control: {assessment_data['ball_control']}/5
+    - Passing Accuracy: {assessment_data['passing_accuracy']}%
+    - Dribbling Success: {assessment_data['dribbling_success']}%
+    - Shooting Accuracy: {assessment_data['shooting_accuracy']}%
+    - Defensive Duels: {assessment_data['defensive_duels']}%
+    
+    Tactical Awareness (30%):
+    - Game Intelligence: {assessment_data['game_intelligence']}/5
+    - Positioning: {assessment_data['positioning']}/5
+    - Decision Making: {assessment_data['decision_making']}/5
+    
+    Psychological (10%):
+    - Coachability: {assessment_data['coachability']}/5
+    - Mental Toughness: {assessment_data['mental_toughness']}/5
+    """
+    
+    if language == "ar":
+        prompt = f"""
+        أنشئ برنامج تدريبي نخبوي متقدم وقابل للتكيف لـ يويو الفتى الناري للأسبوع {week_number}! 🔥👑
+
+        {assessment_text}
+
+        يرجى إنشاء برنامج نخبوي مليء بالطاقة والحماس يتضمن:
+        1. تمارين سرعة متقدمة (30% من التدريب)
+        2. تطوير المهارات التقنية تحت الضغط (40% من التدريب) 
+        3. ذكاء تكتيكي وقراءة اللعب (20% من التدريب)
+        4. القوة الذهنية والثقة (10% من التدريب)
+        
+        اجعل البرنامج:
+        - مُخصص لنقاط القوة والضعف المحددة
+        - متدرج في الصعوبة حسب الأسبوع
+        - يحتوي على تمارين ممتعة ومبتكرة
+        - يركز على تطوير اللاعب لمستوى النخبة
+        
+        قدم البرنامج بتنسيق منظم مع:
+        - جدول أسبوعي مفصل (5 أيام تدريب)
+        - أهداف واضحة لكل يوم
+        - تعليمات مفصلة للتمارين
+        - نصائح تحفيزية بأسلوب يويو الناري
+        """
+    else:
+        prompt = f"""
+        Create an elite advanced and adaptive training program for Yoyo the Fire Boy for week {week_number}! 🔥👑
+
+        {assessment_text}
+
+        Please create an elite program full of energy and enthusiasm that includes:
+        1. Advanced speed exercises (30% of training)
+        2. Technical skills development under pressure (40% of training)
+        3. Tactical intelligence and game reading (20% of training)
+        4. Mental strength and confidence (10% of training)
+        
+        Make the program:
+        - Customized to identified strengths and weaknesses
+        - Progressive in difficulty according to the week
+        - Contains fun and innovative exercises
+        - Focuses on developing the player to elite level
+        
+        Present the program in an organized format with:
+        - Detailed weekly schedule (5 training days)
+        - Clear objectives for each day
+        - Detailed exercise instructions
+        - Motivational tips in Yoyo the Fire Boy style
+        """
+    
+    messages = [user_message(prompt)]
+    response = await llm_client.chat_async(messages)
+    
+    return response.content
+
 def generate_fallback_program(assessment_data: Dict[str, Any], week_number: int, language: str = "en") -> str:
     """Generate a fallback training program when LLM is unavailable"""
     if language == "ar":
@@ -213,8 +292,6 @@ def generate_fallback_program(assessment_data: Dict[str, Any], week_number: int,
 async def generate_adaptive_exercises(player_weaknesses: List[str], phase: str, week_number: int) -> Dict[str, Any]:
     """Generate adaptive exercises based on player weaknesses and training phase"""
     try:
-        llm_client = get_llm_client()
-        
         weaknesses_text = ", ".join(player_weaknesses)
         
         prompt = f"""
@@ -238,11 +315,19 @@ async def generate_adaptive_exercises(player_weaknesses: List[str], phase: str,
         }}
         """
         
-        messages = [UserMessage(content=prompt)]
-        response = await llm_client.chat_async(messages)
+        async def request_exercises() -> Dict[str, Any]:
+            llm_client = get_llm_client()
+            messages = [user_message(prompt)]
+            response = await llm_client.chat_async(messages)
+            # Raises on malformed JSON so that fallbacks are never cached
+            return json.loads(response.content)
         
         try:
-            return json.loads(response.content)
+            return await llm_jobs.generate(
+                "adaptive_exercises",
+                {"weaknesses": player_weaknesses, "phase": phase, "week_number": week_number},
+                request_exercises
+            )
         except json.JSONDecodeError:
             # Return structured fallback if JSON parsing fails
             return generate_fallback_exercises(player_weaknesses, phase)
@@ -0,0 +1,225 @@
+"""Background job queue for LLM generations, with a content-addressed result cache.
+
+``submit`` queues a job and returns its record straight away; clients poll
+``get`` (or long-poll with ``wait``) for the result. Jobs run on a fixed pool
+of ``LLM_MAX_CONCURRENCY`` workers, and at most ``LLM_MAX_PENDING_JOBS`` may be
+queued or running. ``shutdown`` (called from the app lifespans) stops taking
+jobs, lets the queue drain for ``LLM_SHUTDOWN_GRACE_SECONDS`` and then cancels
+the rest, so no job task outlives the event loop. Generations go through
+``generate``, which:
+
+- looks the result up by a SHA-256 of the normalized prompt inputs, so
+  identical requests are only generated once per TTL;
+- coalesces concurrent requests for the same key into one call;
+- runs at most ``LLM_MAX_CONCURRENCY`` model calls at a time.
+
+Set ``LLM_BACKEND=stub`` (see utils/llm_integration.py) to exercise the whole
+pipeline without network access.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '4'))
+LLM_MAX_PENDING_JOBS = int(os.environ.get('LLM_MAX_PENDING_JOBS', '1000'))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get('LLM_CACHE_TTL_SECONDS', str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '512'))
+LLM_SHUTDOWN_GRACE_SECONDS = float(os.environ.get('LLM_SHUTDOWN_GRACE_SECONDS', '10'))
+
+# Finished job records are kept this long for polling
+JOB_RETENTION_SECONDS = 3600
+
+class QueueFullError(RuntimeError):
+    """Raised when too many jobs are pending"""
+
+def normalize_inputs(value: Any) -> Any:
+    """Canonical form of prompt inputs: sorted keys, trimmed strings, rounded floats"""
+    if isinstance(value, dict):
+        return {str(k): normalize_inputs(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 3)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def cache_key(kind: str, inputs: Dict[str, Any]) -> str:
+    payload = json.dumps([kind, normalize_inputs(inputs)], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class LlmJobQueue:
+    def __init__(self, concurrency: int = LLM_MAX_CONCURRENCY, max_pending: int = LLM_MAX_PENDING_JOBS,
+                 cache_ttl: float = LLM_CACHE_TTL_SECONDS, cache_size: int = LLM_CACHE_MAX_ENTRIES):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.jobs = TTLCache(maxsize=max(10 * max_pending, 1000), ttl=JOB_RETENTION_SECONDS)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = 0
+        self._closing = False
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def generate(self, kind: str, inputs: Dict[str, Any], produce: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for these inputs, or run ``produce`` once to create it"""
+        key = cache_key(kind, inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self.semaphore:
+                result = await produce()
+            self.cache.set(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited failure does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return (self._queue.qsize() if self._queue else 0) + self._running
+
+    def submit(self, kind: str, run: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """Queue ``run`` for a worker and return the job record"""
+        if self._closing:
+            raise QueueFullError("Shutting down, try again later")
+        if self.pending >= self.max_pending:
+            raise QueueFullError(f"{self.pending} generation jobs pending, try again later")
+
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": datetime.now(timezone.utc),
+            "completed_at": None,
+        }
+        self.jobs.set(job["job_id"], job)
+        self._events[job["job_id"]] = asyncio.Event()
+
+        if self._queue is None:
+            # Created lazily so the queue and workers bind to the running event loop
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._queue.put_nowait((job, run))
+        return dict(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job, run = await self._queue.get()
+            self._running += 1
+            try:
+                await self._run(job, run)
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any], run: Callable[[], Awaitable[Any]]) -> None:
+        job["status"] = "running"
+        try:
+            job["result"] = await run()
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            self._finish(job, "cancelled", "Server shut down before the job finished")
+            raise
+        except Exception as e:
+            logger.error(f"LLM job {job['job_id']} ({job['kind']}) failed: {e}")
+            self._finish(job, "failed", str(e))
+        else:
+            self._finish(job, "completed")
+
+    def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None) -> None:
+        job["status"] = status
+        job["error"] = error
+        job["completed_at"] = datetime.now(timezone.utc)
+        event = self._events.pop(job["job_id"], None)
+        if event:
+            event.set()
+
+    async def shutdown(self, grace: float = LLM_SHUTDOWN_GRACE_SECONDS) -> None:
+        """Stop taking jobs, give queued ones ``grace`` seconds to finish, then cancel the rest"""
+        if self._queue is None:
+            return
+        self._closing = True
+        try:
+            if grace > 0:
+                try:
+                    await asyncio.wait_for(self._queue.join(), grace)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Cancelling {self.pending} LLM jobs still pending after {grace}s")
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            while not self._queue.empty():
+                job, _ = self._queue.get_nowait()
+                self._finish(job, "cancelled", "Server shut down before the job started")
+        finally:
+            # A later lifespan (a new event loop) starts afresh
+            self._queue = None
+            self._workers = []
+            self._semaphore = None
+            self._closing = False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: return the job once finished or after ``timeout`` seconds"""
+        event = self._events.get(job_id)
+        if event is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_jobs": self.pending,
+            "running_jobs": self._running,
+            "inflight_generations": len(self._inflight),
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+# Process-wide queue shared by server.py and the routers
+llm_jobs = LlmJobQueue()
@@ -0,0 +1,1066 @@
+"""In-memory, indexed stand-in for the Motor database (``STORAGE_BACKEND=memory``).
+
+Implements the part of the Motor collection API the app uses (find and
+cursors, the insert / update / delete / find-and-modify family, bulk_write,
+distinct, count_documents, aggregate, create_indexes) so the whole API can
+run, and be load tested or benchmarked, with no MongoDB: handler CPU cost
+without database I/O.
+
+- Documents are stored BSON-encoded and decoded on every read, as the
+  driver does, so reads return fresh copies with the production types
+  (tz-aware datetimes, ObjectIds) and the same decode cost.
+- ``create_indexes`` builds hash indexes on each index's leading field, so
+  equality and ``$in`` lookups skip the scan; unique indexes (including
+  partial ones) raise ``DuplicateKeyError`` / ``BulkWriteError`` like the
+  server. ``explain`` reports IXSCAN / COLLSCAN accordingly.
+- Operations never await, so each one is atomic on the event loop and
+  compare-and-set updates (``find_one_and_update``) keep their meaning.
+- Every operation is recorded in ``utils.metrics`` like a driver command.
+
+Query, update and pipeline operators outside that subset raise
+``OperationFailure``. TTL and index options other than ``unique`` and
+``partialFilterExpression`` are ignored. Data lives as long as the process.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import functools
+import itertools
+import re
+import time
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from utils.metrics import metrics
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Same decoding as the production client (tz_aware=True)
+CODEC_OPTIONS = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+
+_MISSING = object()
+
+def _decode(raw: bytes) -> Dict[str, Any]:
+    return bson.decode(raw, CODEC_OPTIONS)
+
+def _normalize(value: Any) -> Any:
+    """Round-trip a filter, update or pipeline through BSON, as sending it to the server would"""
+    return _decode(bson.encode({"v": value}))["v"]
+
+# -- Values, paths and comparisons -------------------------------------------
+
+def _lookup(doc: Any, path: str) -> Any:
+    """Value at a dotted path; arrays of documents along the way fan out into lists"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                values = [item.get(part, _MISSING) for item in value if isinstance(item, dict)]
+                value = [item for item in values if item is not _MISSING] or _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            target = target[int(part)]
+            continue
+        target = target.setdefault(part, {})
+    if isinstance(target, list) and parts[-1].isdigit():
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parent_path, _, field = path.rpartition(".")
+    parent = _lookup(doc, parent_path) if parent_path else doc
+    if isinstance(parent, dict):
+        parent.pop(field, None)
+
+def _bracket(value: Any) -> int:
+    """BSON comparison order of a value's type"""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    bracket = _bracket(value)
+    if bracket == 1:
+        return (1, 0)
+    if bracket in (4, 5, 10):
+        return (bracket, repr(value))
+    return (bracket, value)
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of a value, for index keys"""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return None if value is _MISSING else value
+
+def _equals(value: Any, target: Any) -> bool:
+    if target is None:
+        return value is None or value is _MISSING or (isinstance(value, list) and None in value)
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_equals(item, target) for item in value)
+    return value is not _MISSING and _bracket(value) == _bracket(target) and value == target
+
+def _compare(value: Any, target: Any, test: Callable[[Any, Any], bool]) -> bool:
+    candidates = value if isinstance(value, list) else [value]
+    return any(
+        candidate is not _MISSING and _bracket(candidate) == _bracket(target) and test(candidate, target)
+        for candidate in candidates
+    )
+
+_TYPE_NAMES = {
+    "double": (float,), "string": (str,), "object": (dict,), "array": (list,), "binData": (bytes,),
+    "objectId": (ObjectId,), "bool": (bool,), "date": (datetime,), "int": (int,), "long": (int,),
+    "number": (int, float),
+}
+
+def _bit_mask(argument: Any) -> int:
+    if isinstance(argument, list):
+        return sum(1 << position for position in argument)
+    return int(argument)
+
+def _has_type(value: Any, type_name: Any) -> bool:
+    if type_name == "null":
+        return value is None
+    types = _TYPE_NAMES.get(type_name)
+    if types is None:
+        raise OperationFailure(f"Unsupported $type in memory store: {type_name}")
+    if bool not in types and isinstance(value, bool):
+        return False
+    return isinstance(value, types)
+
+# -- Queries ------------------------------------------------------------------
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and next(iter(condition)).startswith("$")
+
+def _match_operator(value: Any, operator: str, argument: Any, condition: Dict[str, Any]) -> bool:
+    if operator == "$eq":
+        return _equals(value, argument)
+    if operator == "$ne":
+        return not _equals(value, argument)
+    if operator == "$gt":
+        return _compare(value, argument, lambda a, b: a > b)
+    if operator == "$gte":
+        return _compare(value, argument, lambda a, b: a >= b) or (argument is None and _equals(value, None))
+    if operator == "$lt":
+        return _compare(value, argument, lambda a, b: a < b)
+    if operator == "$lte":
+        return _compare(value, argument, lambda a, b: a <= b) or (argument is None and _equals(value, None))
+    if operator == "$in":
+        return any(_equals(value, item) for item in argument)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in argument)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(argument)
+    if operator == "$type":
+        names = argument if isinstance(argument, list) else [argument]
+        candidates = [value] if not isinstance(value, list) or "array" in names else value
+        return any(_has_type(candidate, name) for candidate in candidates for name in names)
+    if operator == "$size":
+        return isinstance(value, list) and len(value) == argument
+    if operator in ("$bitsAllClear", "$bitsAllSet", "$bitsAnySet", "$bitsAnyClear"):
+        if not isinstance(value, int) or isinstance(value, bool):
+            return False
+        mask = _bit_mask(argument)
+        return {
+            "$bitsAllClear": value & mask == 0,
+            "$bitsAllSet": value & mask == mask,
+            "$bitsAnySet": value & mask != 0,
+            "$bitsAnyClear": value & mask != mask,
+        }[operator]
+    if operator == "$regex":
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        candidates = value if isinstance(value, list) else [value]
+        return any(isinstance(candidate, str) and re.search(argument, candidate, flags) for candidate in candidates)
+    if operator == "$options":
+        return True
+    if operator == "$elemMatch":
+        if not isinstance(value, list):
+            return False
+        if _is_operator_dict(argument):
+            return any(_match_conditions(item, argument) for item in value)
+        return any(isinstance(item, dict) and _match(item, argument) for item in value)
+    if operator == "$not":
+        return not _match_conditions(value, argument)
+    raise OperationFailure(f"Unsupported query operator in memory store: {operator}")
+
+def _match_conditions(value: Any, condition: Dict[str, Any]) -> bool:
+    return all(_match_operator(value, operator, argument, condition) for operator, argument in condition.items())
+
+def _match(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_match(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(_match(doc, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(_match(doc, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator in memory store: {key}")
+        elif _is_operator_dict(condition):
+            if not _match_conditions(_lookup(doc, key), condition):
+                return False
+        elif not _equals(_lookup(doc, key), condition):
+            return False
+    return True
+
+def _equality_fields(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields a query pins to one value (seed of an upserted document)"""
+    fields = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for clause in condition:
+                fields.update(_equality_fields(clause))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(condition):
+            if "$eq" in condition:
+                fields[key] = condition["$eq"]
+        else:
+            fields[key] = condition
+    return fields
+
+# -- Projection -----------------------------------------------------------------
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return doc
+    include_id = bool(projection.get("_id", True))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(value in (1, True) for value in fields.values()):
+        result: Dict[str, Any] = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path in fields:
+            value = _lookup(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    if any(value not in (0, False) for value in fields.values()):
+        raise OperationFailure("The memory store supports inclusion or exclusion projections, not expressions, in find")
+    for path in fields:
+        _unset_path(doc, path)
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+# -- Aggregation expressions --------------------------------------------------
+
+def _evaluate(expression: Any, doc: Dict[str, Any], variables: Optional[Dict[str, Any]] = None) -> Any:
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, _, path = expression[2:].partition(".")
+        base = doc if name in ("ROOT", "CURRENT") else (variables or {}).get(name, _MISSING)
+        value = _lookup(base, path) if path and base is not _MISSING else base
+        return None if value is _MISSING else value
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _lookup(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, list):
+        return [_evaluate(item, doc, variables) for item in expression]
+    if _is_operator_dict(expression) and len(expression) == 1:
+        operator, arguments = next(iter(expression.items()))
+        return _evaluate_operator(operator, arguments, doc, variables)
+    if isinstance(expression, dict):
+        return {key: _evaluate(value, doc, variables) for key, value in expression.items()}
+    return expression
+
+def _evaluate_operator(operator: str, arguments: Any, doc: Dict[str, Any], variables: Optional[Dict[str, Any]]) -> Any:
+    if operator == "$literal":
+        return arguments
+    if operator == "$let":
+        scope = dict(variables or {})
+        scope.update({name: _evaluate(value, doc, variables) for name, value in arguments["vars"].items()})
+        return _evaluate(arguments["in"], doc, scope)
+    if operator == "$cond":
+        if isinstance(arguments, dict):
+            arguments = [arguments["if"], arguments["then"], arguments["else"]]
+        condition, then, otherwise = arguments
+        return _evaluate(then if _evaluate(condition, doc, variables) else otherwise, doc, variables)
+
+    values = _evaluate(arguments if isinstance(arguments, list) else [arguments], doc, variables)
+    if operator == "$arrayElemAt":
+        array, index = values
+        if not isinstance(array, list) or not -len(array) <= index < len(array):
+            return None
+        return array[index]
+    if operator == "$ifNull":
+        return next((value for value in values if value is not None), None)
+    if operator in ("$max", "$min"):
+        if len(values) == 1 and isinstance(values[0], list):
+            values = values[0]
+        present = [value for value in values if value is not None]
+        if not present:
+            return None
+        return (max if operator == "$max" else min)(present, key=_sort_key)
+    if operator in ("$add", "$subtract", "$multiply", "$divide"):
+        if any(value is None for value in values):
+            return None
+        if operator == "$add":
+            return sum(values)
+        if operator == "$multiply":
+            return functools.reduce(lambda a, b: a * b, values, 1)
+        first, second = values
+        return first - second if operator == "$subtract" else first / second
+    if operator == "$size":
+        return len(values[0])
+    if operator in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        first, second = (_sort_key(value) for value in values)
+        return {
+            "$eq": first == second, "$ne": first != second, "$gt": first > second,
+            "$gte": first >= second, "$lt": first < second, "$lte": first <= second,
+        }[operator]
+    raise OperationFailure(f"Unsupported expression operator in memory store: {operator}")
+
+# -- Updates ----------------------------------------------------------------------
+
+def _each(argument: Any) -> List[Any]:
+    if isinstance(argument, dict) and "$each" in argument:
+        return list(argument["$each"])
+    return [argument]
+
+def _apply_update(doc: Dict[str, Any], update: Any, inserting: bool = False) -> None:
+    if isinstance(update, list):
+        # Update with an aggregation pipeline
+        for stage in update:
+            (name, spec), = stage.items()
+            if name in ("$set", "$addFields"):
+                computed = {field: _evaluate(expression, doc) for field, expression in spec.items()}
+                for field, value in computed.items():
+                    _set_path(doc, field, value)
+            elif name == "$unset":
+                for field in ([spec] if isinstance(spec, str) else spec):
+                    _unset_path(doc, field)
+            else:
+                raise OperationFailure(f"Unsupported update pipeline stage in memory store: {name}")
+        return
+
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for path, argument in fields.items():
+            current = _lookup(doc, path)
+            if operator in ("$set", "$setOnInsert"):
+                _set_path(doc, path, argument)
+            elif operator == "$unset":
+                _unset_path(doc, path)
+            elif operator == "$inc":
+                _set_path(doc, path, (0 if current is _MISSING else current) + argument)
+            elif operator in ("$max", "$min"):
+                if current is _MISSING or (
+                    _sort_key(argument) > _sort_key(current) if operator == "$max" else _sort_key(argument) < _sort_key(current)
+                ):
+                    _set_path(doc, path, argument)
+            elif operator == "$currentDate":
+                _set_path(doc, path, datetime.now(timezone.utc))
+            elif operator in ("$push", "$addToSet"):
+                items = [] if current is _MISSING else list(current)
+                for item in _each(argument):
+                    if operator == "$push" or not any(_equals(existing, item) and _bracket(existing) == _bracket(item) for existing in items):
+                        items.append(item)
+                _set_path(doc, path, items)
+            elif operator == "$pull":
+                if current is _MISSING:
+                    continue
+                if _is_operator_dict(argument):
+                    keep = [item for item in current if not _match_conditions(item, argument)]
+                elif isinstance(argument, dict):
+                    keep = [item for item in current if not (isinstance(item, dict) and _match(item, argument))]
+                else:
+                    keep = [item for item in current if not _equals(item, argument)]
+                _set_path(doc, path, keep)
+            elif operator == "$bit":
+                value = 0 if current is _MISSING else current
+                for bit_operator, operand in argument.items():
+                    if bit_operator == "or":
+                        value |= operand
+                    elif bit_operator == "and":
+                        value &= operand
+                    elif bit_operator == "xor":
+                        value ^= operand
+                _set_path(doc, path, value)
+            else:
+                raise OperationFailure(f"Unsupported update operator in memory store: {operator}")
+
+def _is_replacement(update: Any) -> bool:
+    return isinstance(update, dict) and not _is_operator_dict(update)
+
+# -- Aggregation pipelines -------------------------------------------------------
+
+def _accumulate(operator: str, argument: Any, docs: List[Dict[str, Any]]) -> Any:
+    if operator == "$count":
+        return len(docs)
+    values = [_evaluate(argument, doc) for doc in docs]
+    if operator == "$sum":
+        return sum(value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool))
+    if operator == "$avg":
+        numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        return sum(numbers) / len(numbers) if numbers else None
+    if operator == "$first":
+        return values[0] if values else None
+    if operator == "$last":
+        return values[-1] if values else None
+    if operator in ("$max", "$min"):
+        present = [value for value in values if value is not None]
+        return (max if operator == "$max" else min)(present, key=_sort_key) if present else None
+    if operator == "$push":
+        return values
+    if operator == "$addToSet":
+        unique: List[Any] = []
+        for value in values:
+            if value not in unique:
+                unique.append(value)
+        return unique
+    raise OperationFailure(f"Unsupported accumulator in memory store: {operator}")
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Tuple[Any, List[Dict[str, Any]]]] = {}
+    for doc in docs:
+        key = _evaluate(spec["_id"], doc)
+        groups.setdefault(_freeze(key), (key, []))[1].append(doc)
+    results = []
+    for key, members in groups.values():
+        result = {"_id": key}
+        for field, accumulator in spec.items():
+            if field != "_id":
+                (operator, argument), = accumulator.items()
+                result[field] = _accumulate(operator, argument, members)
+        results.append(result)
+    return results
+
+def _project_stage(doc: Dict[str, Any], spec: Dict[str, Any]) -> Dict[str, Any]:
+    include_id = spec.get("_id", 1) not in (0, False)
+    fields = {key: value for key, value in spec.items() if key != "_id"}
+    if fields and all(value in (0, False) for value in fields.values()):
+        return _project(doc, spec)
+    result: Dict[str, Any] = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+    for path, expression in fields.items():
+        if expression in (1, True):
+            value = _lookup(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        else:
+            _set_path(result, path, _evaluate(expression, doc))
+    return result
+
+def _sort_docs(docs: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # Stable sorts from the last key to the first
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda doc: _sort_key(_lookup(doc, field)), reverse=direction < 0)
+    return docs
+
+def _run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if _match(doc, spec)]
+        elif name == "$sort":
+            docs = _sort_docs(docs, list(spec.items()))
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$project":
+            docs = [_project_stage(doc, spec) for doc in docs]
+        elif name in ("$set", "$addFields"):
+            for doc in docs:
+                computed = {field: _evaluate(expression, doc) for field, expression in spec.items()}
+                for field, value in computed.items():
+                    _set_path(doc, field, value)
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$unwind":
+            path = (spec if isinstance(spec, str) else spec["path"])[1:]
+            unwound = []
+            for doc in docs:
+                for item in _lookup(doc, path) if isinstance(_lookup(doc, path), list) else []:
+                    copy = dict(doc)
+                    _set_path(copy, path, item)
+                    unwound.append(copy)
+            docs = unwound
+        else:
+            raise OperationFailure(f"Unsupported pipeline stage in memory store: {name}")
+    return docs
+
+def _sort_spec(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(field, order) for field, order in key_or_list]
+
+# -- Indexes ----------------------------------------------------------------------
+
+class _Index:
+    """Hash index on the leading field of an index; unique indexes check the whole key"""
+
+    def __init__(self, name: str, keys: List[Tuple[str, Any]], unique: bool, partial: Optional[Dict[str, Any]]):
+        self.name = name
+        self.keys = keys
+        self.fields = [field for field, _ in keys]
+        self.unique = unique
+        self.partial = partial
+        self.entries: Dict[Any, set] = {}
+
+    def covers(self, doc: Dict[str, Any]) -> bool:
+        return self.partial is None or _match(doc, self.partial)
+
+    def leading_keys(self, doc: Dict[str, Any]) -> List[Any]:
+        value = _lookup(doc, self.fields[0])
+        if isinstance(value, list):
+            return [_freeze(item) for item in value] + [_freeze(value)]
+        return [_freeze(value)]
+
+    def full_key(self, doc: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(_freeze(_lookup(doc, field)) for field in self.fields)
+
+    def add(self, doc_key: Any, doc: Dict[str, Any]) -> None:
+        if self.covers(doc):
+            for key in self.leading_keys(doc):
+                self.entries.setdefault(key, set()).add(doc_key)
+
+    def remove(self, doc_key: Any, doc: Dict[str, Any]) -> None:
+        if self.covers(doc):
+            for key in self.leading_keys(doc):
+                members = self.entries.get(key)
+                if members is not None:
+                    members.discard(doc_key)
+                    if not members:
+                        del self.entries[key]
+
+class _Stored:
+    __slots__ = ("raw", "doc", "seq")
+
+    def __init__(self, raw: bytes, doc: Dict[str, Any], seq: int):
+        self.raw = raw
+        self.doc = doc
+        self.seq = seq
+
+# -- Cursors ----------------------------------------------------------------------
+
+class MemoryCursor:
+    """Motor-style cursor: chainable sort/skip/limit, then to_list or async iteration"""
+
+    def __init__(self, collection: "MemoryCollection", filter: Dict[str, Any], projection: Any,
+                 sort: Any = None, skip: int = 0, limit: int = 0):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = _sort_spec(sort)
+        self._skip = skip
+        self._limit = limit
+        self._results: Optional[List[Dict[str, Any]]] = None
+        self._position = 0
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _fetch(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            self._results = self._collection._recorded_find(
+                self._filter, self._projection, self._sort, self._skip, self._limit
+            )
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._fetch()
+        end = len(results) if length is None else self._position + length
+        batch = results[self._position:end]
+        self._position += len(batch)
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        results = self._fetch()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+    async def close(self) -> None:
+        """Release the results; like a closed Motor cursor, it then returns nothing"""
+        self._results = []
+        self._position = 0
+
+class MemoryCommandCursor(MemoryCursor):
+    """Cursor over aggregation results"""
+
+    def __init__(self, collection: "MemoryCollection", pipeline: List[Dict[str, Any]]):
+        super().__init__(collection, {}, None)
+        self._pipeline = pipeline
+
+    def _fetch(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            self._results = self._collection._recorded_aggregate(self._pipeline)
+        return self._results
+
+# -- Collections --------------------------------------------------------------------
+
+def _command(name: str, returned: Callable[[Any], int] = lambda result: 0):
+    """Run a synchronous operation as a coroutine, recorded as a driver command"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                metrics.record_command(name, time.perf_counter() - start, 0, True)
+                raise
+            metrics.record_command(name, time.perf_counter() - start, returned(result), False)
+            return result
+        return wrapper
+    return decorator
+
+def _one(result: Any) -> int:
+    return int(result is not None)
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, _Stored] = {}
+        self._indexes: Dict[str, _Index] = {}
+        self._seq = itertools.count()
+
+    def with_options(self, **options) -> "MemoryCollection":
+        return self
+
+    # Storage
+
+    def _candidates(self, query: Dict[str, Any]) -> Iterable[_Stored]:
+        """Stored documents that may match, narrowed by the _id or a leading index field"""
+        best: Optional[set] = None
+        if "_id" in query and not _is_operator_dict(query["_id"]):
+            stored = self._docs.get(_freeze(query["_id"]))
+            return [stored] if stored is not None else []
+        for index in self._indexes.values():
+            if index.partial is not None:
+                continue
+            condition = query.get(index.fields[0], _MISSING)
+            if condition is _MISSING:
+                continue
+            if _is_operator_dict(condition):
+                if "$eq" in condition:
+                    values = [condition["$eq"]]
+                elif "$in" in condition:
+                    values = condition["$in"]
+                else:
+                    continue
+            else:
+                values = [condition]
+            keys = set().union(*(index.entries.get(_freeze(value), set()) for value in values))
+            if best is None or len(keys) < len(best):
+                best = keys
+        if best is None:
+            return self._docs.values()
+        return sorted((self._docs[key] for key in best), key=lambda stored: stored.seq)
+
+    def _matching(self, query: Optional[Dict[str, Any]]) -> List[_Stored]:
+        query = _normalize(query or {})
+        return [stored for stored in self._candidates(query) if _match(stored.doc, query)]
+
+    def _find(self, query, projection=None, sort=None, skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        if query is not None and not isinstance(query, dict):
+            query = {"_id": query}
+        matched = self._matching(query)
+        for field, direction in reversed(sort or []):
+            matched.sort(key=lambda stored: _sort_key(_lookup(stored.doc, field)), reverse=direction < 0)
+        matched = matched[skip:]
+        if limit:
+            matched = matched[:abs(limit)]
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
+        return [_project(_decode(stored.raw), projection) for stored in matched]
+
+    def _check_unique(self, doc: Dict[str, Any], doc_key: Any) -> None:
+        for index in self._indexes.values():
+            if not index.unique or not index.covers(doc):
+                continue
+            key = index.full_key(doc)
+            for other_key in index.entries.get(index.leading_keys(doc)[0], ()):
+                if other_key != doc_key and index.full_key(self._docs[other_key].doc) == key:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.database.name}.{self.name} "
+                        f"index: {index.name} dup key: {dict(zip(index.fields, key))}",
+                        DUPLICATE_KEY_ERROR,
+                        {"index": index.name, "keyValue": dict(zip(index.fields, key))},
+                    )
+
+    def _store(self, doc: Dict[str, Any], previous: Optional[_Stored] = None) -> Dict[str, Any]:
+        raw = bson.encode(doc)
+        stored_doc = _decode(raw)
+        doc_key = _freeze(stored_doc["_id"])
+        if previous is None and doc_key in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.database.name}.{self.name} index: _id_",
+                DUPLICATE_KEY_ERROR, {"index": "_id_", "keyValue": {"_id": stored_doc["_id"]}},
+            )
+        self._check_unique(stored_doc, doc_key)
+        if previous is not None:
+            for index in self._indexes.values():
+                index.remove(doc_key, previous.doc)
+        stored = _Stored(raw, stored_doc, previous.seq if previous is not None else next(self._seq))
+        self._docs[doc_key] = stored
+        for index in self._indexes.values():
+            index.add(doc_key, stored_doc)
+        return stored_doc
+
+    def _remove(self, stored: _Stored) -> None:
+        doc_key = _freeze(stored.doc["_id"])
+        for index in self._indexes.values():
+            index.remove(doc_key, stored.doc)
+        del self._docs[doc_key]
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        if "_id" not in document:
+            # The driver adds the _id to the caller's document
+            document["_id"] = ObjectId()
+        self._store(document)
+        return document["_id"]
+
+    def _update(self, query, update, upsert: bool, many: bool) -> Tuple[Dict[str, Any], Optional[_Stored], Optional[Dict[str, Any]]]:
+        """Apply an update; returns the raw result and the first matched document before and after"""
+        update = _normalize(update)
+        matched = self._matching(query)
+        if not many:
+            matched = matched[:1]
+        result = {"n": 0, "nModified": 0}
+        before = matched[0] if matched else None
+        after = None
+        for stored in matched:
+            doc = _decode(stored.raw)
+            if _is_replacement(update):
+                doc = {"_id": doc["_id"], **{key: value for key, value in update.items() if key != "_id"}}
+            else:
+                _apply_update(doc, update)
+            result["n"] += 1
+            if doc != stored.doc:
+                stored_doc = self._store(doc, previous=stored)
+                result["nModified"] += 1
+            else:
+                stored_doc = stored.doc
+            after = after if after is not None else stored_doc
+        if not matched and upsert:
+            doc = _equality_fields(_normalize(query or {}))
+            if _is_replacement(update):
+                doc = {key: value for key, value in doc.items() if key == "_id"}
+                doc.update(update)
+            else:
+                _apply_update(doc, update, inserting=True)
+            upserted_id = self._insert(doc)
+            after = self._docs[_freeze(upserted_id)].doc
+            result.update(n=1, upserted=upserted_id)
+        return result, before, after
+
+    # Motor API
+
+    @_command("insert")
+    def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    @_command("insert")
+    def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs) -> InsertManyResult:
+        inserted_ids, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted_ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": e.code, "errmsg": str(e), "keyValue": e.details.get("keyValue")})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted_ids),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted_ids, True)
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Any = None, sort: Any = None,
+             skip: int = 0, limit: int = 0, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection, sort, skip, limit)
+
+    def _recorded_find(self, query, projection, sort, skip, limit) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        results = self._find(query, projection, sort, skip, limit)
+        metrics.record_command("find", time.perf_counter() - start, len(results), False)
+        return results
+
+    @_command("find", _one)
+    def find_one(self, filter: Any = None, projection: Any = None, sort: Any = None, **kwargs) -> Optional[Dict[str, Any]]:
+        results = self._find(filter, projection, _sort_spec(sort), 0, 1)
+        return results[0] if results else None
+
+    @_command("count")
+    def count_documents(self, filter: Dict[str, Any], **kwargs) -> int:
+        return len(self._matching(filter))
+
+    @_command("count")
+    def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    @_command("distinct")
+    def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        values: List[Any] = []
+        for stored in self._matching(filter):
+            value = _lookup(_decode(stored.raw), key)
+            for item in value if isinstance(value, list) else [value]:
+                if item is not _MISSING and not any(_equals(existing, item) for existing in values):
+                    values.append(item)
+        return values
+
+    @_command("update")
+    def update_one(self, filter: Dict[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert, many=False)[0], True)
+
+    @_command("update")
+    def update_many(self, filter: Dict[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert, many=True)[0], True)
+
+    @_command("update")
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        if not _is_replacement(replacement):
+            raise ValueError("replacement can not include $ operators")
+        return UpdateResult(self._update(filter, replacement, upsert, many=False)[0], True)
+
+    @_command("delete")
+    def delete_one(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        matched = self._matching(filter)[:1]
+        for stored in matched:
+            self._remove(stored)
+        return DeleteResult({"n": len(matched)}, True)
+
+    @_command("delete")
+    def delete_many(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        matched = self._matching(filter)
+        for stored in matched:
+            self._remove(stored)
+        return DeleteResult({"n": len(matched)}, True)
+
+    def _find_and_modify(self, filter, update, projection, sort, upsert, return_document) -> Optional[Dict[str, Any]]:
+        if sort:
+            first = self._find(filter, {"_id": 1}, _sort_spec(sort), 0, 1)
+            if first:
+                filter = {"_id": first[0]["_id"]}
+        _, before, after = self._update(filter, update, upsert, many=False)
+        if return_document == ReturnDocument.AFTER:
+            document = _decode(bson.encode(after)) if after is not None else None
+        else:
+            document = _decode(before.raw) if before is not None else None
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
+        return _project(document, projection) if document is not None else None
+
+    @_command("findAndModify", _one)
+    def find_one_and_update(self, filter: Dict[str, Any], update: Any, projection: Any = None, sort: Any = None,
+                            upsert: bool = False, return_document: bool = ReturnDocument.BEFORE, **kwargs):
+        return self._find_and_modify(filter, update, projection, sort, upsert, return_document)
+
+    @_command("findAndModify", _one)
+    def find_one_and_replace(self, filter: Dict[str, Any], replacement: Dict[str, Any], projection: Any = None,
+                             sort: Any = None, upsert: bool = False, return_document: bool = ReturnDocument.BEFORE, **kwargs):
+        return self._find_and_modify(filter, replacement, projection, sort, upsert, return_document)
+
+    @_command("findAndModify", _one)
+    def find_one_and_delete(self, filter: Dict[str, Any], projection: Any = None, sort: Any = None, **kwargs):
+        matched = self._find(filter, None, _sort_spec(sort), 0, 1)
+        if not matched:
+            return None
+        self._remove(self._docs[_freeze(matched[0]["_id"])])
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
+        return _project(matched[0], projection)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> MemoryCommandCursor:
+        return MemoryCommandCursor(self, pipeline)
+
+    def _recorded_aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        pipeline = _normalize(pipeline)
+        docs = None
+        if pipeline and "$match" in pipeline[0]:
+            # A leading $match can use the indexes
+            docs = [_decode(stored.raw) for stored in self._matching(pipeline[0]["$match"])]
+            pipeline = pipeline[1:]
+        if docs is None:
+            docs = [_decode(stored.raw) for stored in self._docs.values()]
+        results = _run_pipeline(docs, pipeline)
+        metrics.record_command("aggregate", time.perf_counter() - start, len(results), False)
+        return results
+
+    @_command("bulkWrite")
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    raw, _, _ = self._update(
+                        request._filter, request._doc, request._upsert, many=isinstance(request, UpdateMany)
+                    )
+                    if "upserted" in raw:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        result["nMatched"] += raw["n"]
+                        result["nModified"] += raw["nModified"]
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    matched = self._matching(request._filter)
+                    if isinstance(request, DeleteOne):
+                        matched = matched[:1]
+                    for stored in matched:
+                        self._remove(stored)
+                    result["nRemoved"] += len(matched)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": e.code, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    @_command("createIndexes")
+    def create_indexes(self, indexes: List[Any], **kwargs) -> List[str]:
+        names = []
+        for model in indexes:
+            document = model.document
+            name = document["name"]
+            if name not in self._indexes:
+                index = _Index(name, list(document["key"].items()), document.get("unique", False),
+                               document.get("partialFilterExpression"))
+                for doc_key, stored in self._docs.items():
+                    if index.unique and index.covers(stored.doc):
+                        matches = index.entries.get(index.leading_keys(stored.doc)[0], ())
+                        if any(index.full_key(self._docs[other].doc) == index.full_key(stored.doc) for other in matches):
+                            raise OperationFailure(f"E11000 duplicate key error building index {name}", DUPLICATE_KEY_ERROR)
+                    index.add(doc_key, stored.doc)
+                self._indexes[name] = index
+            names.append(name)
+        return names
+
+    async def create_index(self, keys: Any, **kwargs) -> str:
+        from pymongo import IndexModel
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def index_information(self) -> Dict[str, Any]:
+        information = {"_id_": {"key": [("_id", 1)]}}
+        for name, index in self._indexes.items():
+            information[name] = {"key": index.keys, **({"unique": True} if index.unique else {})}
+        return information
+
+    async def drop(self) -> None:
+        self._docs.clear()
+        self._indexes.clear()
+
+    def query_plan(self, query: Dict[str, Any], sort: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Explain output in the server's shape: IXSCAN when an index's leading field
+        is pinned by the filter or, for an unfiltered query, leads the sort"""
+        fields = set(query) if query else set(list(sort or ())[:1])
+        indexed = "_id" in fields or any(
+            index.partial is None and index.fields[0] in fields for index in self._indexes.values()
+        )
+        if not indexed:
+            return {"stage": "COLLSCAN"}
+        return {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+
+class MemoryDatabase:
+    """Stands in for the AsyncIOMotorDatabase; collections are created on first use"""
+
+    client = None
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str, **options) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def command(self, command: Any, value: Any = None, **kwargs) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        if name == "explain":
+            collection = self.get_collection(value["find"])
+            plan = collection.query_plan(value.get("filter", {}), value.get("sort"))
+            return {"queryPlanner": {"winningPlan": plan}, "ok": 1.0}
+        raise OperationFailure(f"Unsupported command in memory store: {name}")
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._docs]
+
+    async def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
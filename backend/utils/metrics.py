@@ -0,0 +1,260 @@
+"""Per-route request and MongoDB command metrics in Prometheus text format.
+
+- ``MetricsMiddleware`` (plain ASGI, so streaming responses pass through
+  untouched) times every HTTP request and counts it by method, route and
+  status code, plus the requests currently in flight.
+- ``CommandMonitor`` is a pymongo ``CommandListener`` on the shared client
+  (utils/db_lifecycle.py). Each command's duration and returned documents
+  are added to the request that issued it, found through a contextvar
+  (Motor copies the context into its executor threads), and recorded under
+  that request's route when it finishes. Commands issued outside a request
+  (scheduler, startup) are recorded under route ``"-"``.
+- ``render()`` formats all of it, plus the ``stats()`` of the sources
+  registered with ``register_stats``, for ``GET /metrics``.
+
+Routes are labelled by their path template (``/api/progress/{player_id}``)
+so label cardinality stays bounded; paths no route matched share
+``"unmatched"``.
+"""
+
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bisect
+import re
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMANDS_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50)
+DOCUMENTS_PER_REQUEST_BUCKETS = (0, 1, 10, 100, 1000, 10000)
+
+BACKGROUND_ROUTE = "-"
+UNMATCHED_ROUTE = "unmatched"
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class CommandTotals:
+    __slots__ = ("count", "seconds", "documents", "failures")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.documents = 0
+        self.failures = 0
+
+    def add(self, seconds: float, documents: int, failed: bool) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.documents += documents
+        self.failures += failed
+
+class RequestStats:
+    """MongoDB commands issued while serving one request, by command name"""
+
+    __slots__ = ("commands",)
+
+    def __init__(self):
+        self.commands: Dict[str, CommandTotals] = {}
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def returned_documents(command_name: str, reply) -> int:
+    try:
+        cursor = reply.get("cursor")
+        if cursor is not None:
+            return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+        if command_name == "findAndModify":
+            return int(reply.get("value") is not None)
+    except (AttributeError, TypeError):
+        pass
+    return 0
+
+class Metrics:
+    def __init__(self):
+        # Command events arrive on Motor's executor threads
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_commands: Dict[Tuple[str, str], Histogram] = {}
+        self.request_documents: Dict[Tuple[str, str], Histogram] = {}
+        self.commands: Dict[Tuple[str, str], CommandTotals] = {}
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def record_command(self, command_name: str, seconds: float, documents: int, failed: bool) -> None:
+        stats = _request_stats.get()
+        with self._lock:
+            if stats is not None:
+                totals = stats.commands.get(command_name)
+                if totals is None:
+                    totals = stats.commands[command_name] = CommandTotals()
+            else:
+                totals = self._command_totals(BACKGROUND_ROUTE, command_name)
+            totals.add(seconds, documents, failed)
+
+    def _command_totals(self, route: str, command_name: str) -> CommandTotals:
+        totals = self.commands.get((route, command_name))
+        if totals is None:
+            totals = self.commands[(route, command_name)] = CommandTotals()
+        return totals
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.request_commands[key] = Histogram(COMMANDS_PER_REQUEST_BUCKETS)
+                self.request_documents[key] = Histogram(DOCUMENTS_PER_REQUEST_BUCKETS)
+            self.latency[key].observe(seconds)
+            commands = documents = 0
+            for command_name, totals in stats.commands.items():
+                route_totals = self._command_totals(route, command_name)
+                route_totals.count += totals.count
+                route_totals.seconds += totals.seconds
+                route_totals.documents += totals.documents
+                route_totals.failures += totals.failures
+                commands += totals.count
+                documents += totals.documents
+            self.request_commands[key].observe(commands)
+            self.request_documents[key].observe(documents)
+
+    def register_stats(self, name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Expose ``stats()`` (numbers, nested dicts of numbers) as ``app_<name>_*`` gauges"""
+        self.sources[name] = stats
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            _metric(lines, "http_requests_in_flight", "gauge", "HTTP requests being served")
+            lines.append(f"http_requests_in_flight {self.in_flight}")
+            _metric(lines, "http_requests_total", "counter", "HTTP requests by route and status")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            _histograms(lines, "http_request_duration_seconds", "HTTP request latency", self.latency)
+            _histograms(lines, "http_request_mongo_commands", "MongoDB commands per request", self.request_commands)
+            _histograms(lines, "http_request_mongo_documents", "MongoDB documents returned per request", self.request_documents)
+            commands = sorted(self.commands.items())
+            for name, attribute, help_text in (
+                ("mongo_commands_total", "count", "MongoDB commands by route and command"),
+                ("mongo_command_seconds_total", "seconds", "Time spent in MongoDB commands"),
+                ("mongo_documents_returned_total", "documents", "Documents returned by MongoDB commands"),
+                ("mongo_command_failures_total", "failures", "Failed MongoDB commands"),
+            ):
+                _metric(lines, name, "counter", help_text)
+                for (route, command_name), totals in commands:
+                    value = getattr(totals, attribute)
+                    lines.append(f"{name}{_labels(route=route, command=command_name)} {_number(value)}")
+        for source, stats in sorted(self.sources.items()):
+            for name, value in _flatten(f"app_{source}", stats()):
+                _metric(lines, name, "gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+class CommandMonitor(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.record_command(
+            event.command_name, event.duration_micros / 1e6,
+            returned_documents(event.command_name, event.reply), False
+        )
+
+    def failed(self, event):
+        metrics.record_command(event.command_name, event.duration_micros / 1e6, 0, True)
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        metrics.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+            metrics.request_finished(scope["method"], route_template(scope), status, time.perf_counter() - start, stats)
+
+def route_template(scope) -> str:
+    """Path template of the route the router matched, e.g. ``/api/progress/daily/{player_id}``"""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Routes of an included router may carry only their own part of the
+    # path; the prefix is the leading segments of the request path
+    segments = scope["path"].split("/")
+    prefix = segments[:len(segments) - template.count("/")]
+    return "/".join(prefix) + template
+
+def _metric(lines: List[str], name: str, kind: str, help_text: str = "") -> None:
+    if help_text:
+        lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def _histograms(lines: List[str], name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    _metric(lines, name, "histogram", help_text)
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=str(bound))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+def _flatten(prefix: str, stats: Dict[str, Any]):
+    """(metric name, number) pairs of a stats dict; strings and None are skipped"""
+    for key, value in stats.items():
+        name = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (bool, int, float)):
+            yield name, value
+
+# Process-wide registry and the listener utils/db_lifecycle.py registers on the client
+metrics = Metrics()
+command_monitor = CommandMonitor()
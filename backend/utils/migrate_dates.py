@@ -0,0 +1,115 @@
+"""One-shot migration of stored date strings to the form ``mongo_date`` writes.
+
+    python -m utils.migrate_dates [--dry-run] [collection ...]
+
+With ``DATE_STORAGE_MODE=bson`` ISO-8601 strings become native BSON datetimes;
+run it once before (or right after) switching modes. With the default ``iso``
+mode legacy strings (naive, ``Z`` or non-UTC offsets, date only) are rewritten
+as UTC ``+00:00`` strings. Range filters compare these strings as text, so until
+this has run they are approximate for legacy rows.
+
+Every field named in ``DATE_FIELDS`` is converted, including fields nested in
+sub-documents and arrays (e.g. ``completed_exercises[].completion_date``).
+Documents that are already migrated are left untouched, so the script can be
+re-run safely.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from utils.database import db, mongo_date, DATE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+def parse_date(value: str) -> Optional[datetime]:
+    """Parse an ISO-8601 string as stored by prepare_for_mongo (naive values are UTC)"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def convert_dates(value: Any) -> Tuple[Any, bool]:
+    """Return (converted value, changed) with date strings under DATE_FIELDS keys in stored form"""
+    if isinstance(value, dict):
+        changed = False
+        result = {}
+        for key, item in value.items():
+            if key in DATE_FIELDS and isinstance(item, str):
+                parsed = parse_date(item)
+                if parsed is not None:
+                    result[key] = mongo_date(parsed)
+                    changed = changed or result[key] != item
+                    continue
+            result[key], item_changed = convert_dates(item)
+            changed = changed or item_changed
+        return result, changed
+    if isinstance(value, list):
+        converted = [convert_dates(item) for item in value]
+        return [item for item, _ in converted], any(changed for _, changed in converted)
+    return value, False
+
+def document_update(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build the $set for one document, or None when nothing needs converting"""
+    updates = {}
+    for key, value in doc.items():
+        if key == "_id":
+            continue
+        converted, changed = convert_dates({key: value})
+        if changed:
+            updates[key] = converted[key]
+    return updates or None
+
+async def migrate_collection(collection_name: str, dry_run: bool = False) -> int:
+    """Convert every date string in one collection. Returns the number of documents updated."""
+    collection = db[collection_name]
+    updated = 0
+    batch: List[UpdateOne] = []
+
+    async for doc in collection.find({}):
+        updates = document_update(doc)
+        if updates is None:
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if len(batch) >= BATCH_SIZE:
+            updated += await _flush(collection, batch, dry_run)
+            batch = []
+
+    if batch:
+        updated += await _flush(collection, batch, dry_run)
+    logger.info(f"{collection_name}: {updated} documents {'would be ' if dry_run else ''}migrated")
+    return updated
+
+async def _flush(collection, batch: List[UpdateOne], dry_run: bool) -> int:
+    if dry_run:
+        return len(batch)
+    result = await collection.bulk_write(batch, ordered=False)
+    return result.modified_count
+
+async def migrate(collections: Optional[List[str]] = None, dry_run: bool = False) -> Dict[str, int]:
+    """Migrate the given collections (all collections by default)"""
+    if not collections:
+        collections = sorted(await db.list_collection_names())
+    return {name: await migrate_collection(name, dry_run) for name in collections}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert date strings to the DATE_STORAGE_MODE form")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without writing")
+    args = parser.parse_args()
+
+    results = asyncio.run(migrate(args.collections, args.dry_run))
+    logger.info(f"Migrated {sum(results.values())} documents across {len(results)} collections")
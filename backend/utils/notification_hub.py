@@ -0,0 +1,230 @@
+"""Push delivery of notifications over Server-Sent Events.
+
+Every notification written through ``dispatch_notifications`` is published
+to the ``notification_hub``, which hands it to the open streams of that
+player in this process. Clients keep one ``GET /notifications/{player_id}/stream``
+open instead of polling the inbox.
+
+Each event carries the notification id as its SSE ``id``. When a client
+reconnects, the browser sends it back as ``Last-Event-ID`` (or the client
+passes ``last_event_id``), and the stream first replays the notifications
+delivered after that one, in (``delivered_at``, ``_id``) order, then
+continues live. Notifications still waiting for their ``scheduled_at`` are
+never replayed. A subscriber that falls too far behind is resynchronized the
+same way from MongoDB instead of buffering without bound; one that has not
+received anything yet replays what was delivered since it subscribed. When
+more than ``REPLAY_LIMIT`` notifications were missed, a ``resync`` event
+tells the client to reload its inbox.
+
+Broadcast (``NOTIFICATION_HUB_BACKEND``):
+
+- ``memory`` (default): publish reaches streams in the same worker only.
+- ``redis``: publish goes through a Redis channel at ``REDIS_URL`` (needs the
+  ``redis`` package) and every worker delivers it to its own streams.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from bson import json_util
+from pymongo import ASCENDING
+
+from utils.database import mongo_date
+from utils.pagination import keyset_filter, keyset_sort
+from utils.trusted_read import dumps
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_HUB_BACKEND = os.environ.get('NOTIFICATION_HUB_BACKEND', 'memory').lower()
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_STREAM_QUEUE_SIZE', '100'))
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT_SECONDS', '15'))
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Most notifications replayed on reconnect; older ones are left to GET /notifications
+REPLAY_LIMIT = 200
+RECONNECT_DELAY_MS = 3000
+# Sent when more notifications were missed than a replay returns
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+
+# Queued instead of a notification when a subscriber overflowed
+_RESYNC = object()
+
+class Subscription:
+    def __init__(self, player_id: str, maxsize: int):
+        self.player_id = player_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, notification: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            # Drop the backlog; the stream reloads it from MongoDB
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_RESYNC)
+
+class NotificationHub:
+    """In-process pub/sub of notification documents, keyed by player"""
+
+    def __init__(self, queue_size: int = NOTIFICATION_STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, player_id: str) -> Subscription:
+        subscription = Subscription(player_id, self.queue_size)
+        self._subscribers.setdefault(player_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.player_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.player_id]
+
+    def deliver_local(self, notifications: Iterable[Dict[str, Any]]) -> None:
+        for notification in notifications:
+            for subscription in self._subscribers.get(notification.get("player_id"), ()):
+                subscription.deliver(notification)
+
+    async def publish(self, notifications: List[Dict[str, Any]]) -> None:
+        """Send stored notification documents to their players' open streams"""
+        if notifications:
+            self.published += len(notifications)
+            self.deliver_local(notifications)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": NOTIFICATION_HUB_BACKEND,
+            "players": len(self._subscribers),
+            "streams": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+        }
+
+class RedisNotificationHub(NotificationHub):
+    """Hub whose publishes are broadcast to every worker through Redis"""
+
+    CHANNEL = "notifications"
+
+    def __init__(self, url: str, queue_size: int = NOTIFICATION_STREAM_QUEUE_SIZE):
+        super().__init__(queue_size)
+        import redis.asyncio as redis  # optional dependency
+        self.redis = redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, player_id: str) -> Subscription:
+        # Listen from the first stream on, so idle workers hold no Redis connection
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return super().subscribe(player_id)
+
+    async def publish(self, notifications: List[Dict[str, Any]]) -> None:
+        if not notifications:
+            return
+        self.published += len(notifications)
+        try:
+            await self.redis.publish(self.CHANNEL, json_util.dumps(notifications))
+        except Exception as e:
+            logger.error(f"Notification broadcast failed, delivering locally only: {e}")
+            self.deliver_local(notifications)
+
+    async def _listen(self) -> None:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    self.deliver_local(json_util.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Notification broadcast listener stopped: {e}")
+        finally:
+            await pubsub.close()
+
+def create_hub(kind: str = NOTIFICATION_HUB_BACKEND) -> NotificationHub:
+    if kind == 'redis':
+        return RedisNotificationHub(REDIS_URL)
+    return NotificationHub()
+
+# Process-wide hub shared by server.py and the routers
+notification_hub = create_hub()
+
+# SSE stream
+
+def format_event(notification: Dict[str, Any], serialize: Callable[[Dict[str, Any]], Any]) -> str:
+    data = dumps(serialize(notification)).decode("utf-8")
+    return f"id: {notification['id']}\nevent: notification\ndata: {data}\n\n"
+
+async def notifications_after(
+    db,
+    player_id: str,
+    last_event_id: Optional[str] = None,
+    since: Any = None,
+    limit: int = REPLAY_LIMIT,
+) -> List[Dict[str, Any]]:
+    """Delivered notifications of a player after the one with id ``last_event_id``
+    (or, without one, delivered at or after ``since``), in delivery order"""
+    if last_event_id:
+        last = await db.notifications.find_one(
+            {"id": last_event_id, "player_id": player_id}, {"delivered_at": 1}
+        )
+        if last is None or last.get("delivered_at") is None:
+            return []
+        query = keyset_filter({"player_id": player_id}, "delivered_at", ASCENDING, (last["delivered_at"], last["_id"]))
+    elif since is not None:
+        query = {"player_id": player_id, "delivered_at": {"$gte": since}}
+    else:
+        return []
+    # Both positions exclude a null delivered_at, i.e. notifications still scheduled
+    cursor = db.notifications.find(query).sort(keyset_sort("delivered_at", ASCENDING))
+    return await cursor.to_list(limit)
+
+async def notification_stream(
+    db,
+    player_id: str,
+    last_event_id: Optional[str],
+    serialize: Callable[[Dict[str, Any]], Any],
+    hub: NotificationHub = None,
+) -> AsyncIterator[str]:
+    """SSE body: missed notifications since ``last_event_id``, then live ones"""
+    hub = hub or notification_hub
+    # Subscribe before replaying so nothing published meanwhile is lost
+    subscribed_at = mongo_date(datetime.now(timezone.utc))
+    subscription = hub.subscribe(player_id)
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        resync = bool(last_event_id)
+        replayed: Set[str] = set()
+        while True:
+            if resync:
+                # Notifications queued while the batch loaded may be in it already
+                replayed = set()
+                missed = await notifications_after(db, player_id, last_event_id, since=subscribed_at, limit=REPLAY_LIMIT)
+                for notification in missed:
+                    replayed.add(notification["id"])
+                    last_event_id = notification["id"]
+                    yield format_event(notification, serialize)
+                if len(missed) >= REPLAY_LIMIT:
+                    yield RESYNC_EVENT
+                resync = False
+
+            try:
+                notification = await asyncio.wait_for(
+                    subscription.queue.get(), NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if notification is _RESYNC:
+                resync = True
+            elif notification["id"] not in replayed:
+                last_event_id = notification["id"]
+                yield format_event(notification, serialize)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,174 @@
+"""Notification fan-out and per-player unread counters.
+
+``dispatch_notifications`` writes all notifications of one event (a group
+invite to a whole squad, a retest...) with a single unordered ``insert_many``
+and then bumps the unread counters of every recipient in one ``bulk_write``.
+Endpoints schedule it with ``BackgroundTasks`` so the coach's request returns
+before the fan-out runs. Delivered notifications are then published to the
+``notification_hub`` for players with an open stream; those with a future
+``scheduled_at`` are left undelivered for the scheduler (utils/scheduler.py).
+
+Notifications may carry a ``dedupe_key``; a partial unique index on
+(player_id, dedupe_key) makes repeated invites for the same event a no-op.
+
+Unread counts live in ``notification_counters`` so the inbox badge is a
+single-document read. A counter is seeded from the inbox the first time it is
+read; after that it is maintained by dispatch, ``deliver_scheduled`` and the
+mark-read helpers. Only delivered notifications count: a scheduled one is
+added when the scheduler delivers it.
+"""
+
+from typing import Any, Dict, Iterable, List
+from collections import Counter
+from datetime import datetime, timezone
+import logging
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from utils.converters import parse_datetime
+from utils.database import mongo_date
+from utils.notification_hub import notification_hub
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_COLLECTION = "notification_counters"
+DUPLICATE_KEY_ERROR = 11000
+
+def _scheduled_later(notification: Dict[str, Any], now: datetime) -> bool:
+    scheduled_at = parse_datetime(notification.get("scheduled_at"))
+    if not isinstance(scheduled_at, datetime):
+        return False
+    if scheduled_at.tzinfo is None:
+        scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+    return scheduled_at > now
+
+def dedupe(notifications: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop notifications that repeat a (player_id, dedupe_key) pair within one event"""
+    seen = set()
+    unique = []
+    for notification in notifications:
+        key = notification.get("dedupe_key")
+        if key is not None:
+            if (notification["player_id"], key) in seen:
+                continue
+            seen.add((notification["player_id"], key))
+        unique.append(notification)
+    return unique
+
+async def dispatch_notifications(db, notifications: Iterable[Dict[str, Any]]) -> int:
+    """Insert prepared notification documents and update unread counters.
+
+    Returns the number of notifications delivered (duplicates are skipped).
+    """
+    docs = dedupe(notifications)
+    if not docs:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    for doc in docs:
+        if doc.get("delivered_at") is None and not _scheduled_later(doc, now):
+            doc["delivered_at"] = mongo_date(now)
+
+    try:
+        await db.notifications.insert_many(docs, ordered=False)
+        delivered = docs
+    except BulkWriteError as e:
+        failed = set()
+        for error in e.details.get("writeErrors", []):
+            failed.add(error["index"])
+            if error.get("code") != DUPLICATE_KEY_ERROR:
+                logger.error(f"Notification insert failed: {error.get('errmsg')}")
+        delivered = [doc for i, doc in enumerate(docs) if i not in failed]
+
+    unread = Counter(
+        doc["player_id"] for doc in delivered
+        if not doc.get("is_read") and doc.get("delivered_at") is not None
+    )
+    if unread:
+        await db[COUNTERS_COLLECTION].bulk_write([
+            UpdateOne({"player_id": player_id}, {"$inc": {"unread": count}}, upsert=True)
+            for player_id, count in unread.items()
+        ], ordered=False)
+    await notification_hub.publish([doc for doc in delivered if doc.get("delivered_at") is not None])
+    return len(delivered)
+
+async def deliver_scheduled(db, notification: Dict[str, Any]) -> None:
+    """Scheduler callback for a notification whose ``scheduled_at`` has come.
+
+    A repeated delivery (see utils/scheduler.py) counts it twice; the next
+    mark-all-read resets the counter.
+    """
+    if not notification.get("is_read"):
+        await db[COUNTERS_COLLECTION].update_one(
+            {"player_id": notification["player_id"]}, {"$inc": {"unread": 1}}, upsert=True
+        )
+    await notification_hub.publish([notification])
+
+async def backfill_delivered_at(db) -> int:
+    """Give notifications stored before delivery markers existed ``delivered_at = created_at``.
+
+    The inbox only lists delivered notifications; without this, older ones
+    would disappear from it. A no-op once every notification has the field.
+    """
+    result = await db.notifications.update_many(
+        {"delivered_at": {"$exists": False}},
+        [{"$set": {"delivered_at": "$created_at"}}]
+    )
+    if result.modified_count:
+        logger.info(f"Backfilled delivered_at on {result.modified_count} notifications")
+    return result.modified_count
+
+async def dispatch_in_background(db, notifications: List[Dict[str, Any]]) -> None:
+    """BackgroundTasks entry point: failures are logged, never raised"""
+    try:
+        await dispatch_notifications(db, notifications)
+    except Exception as e:
+        logger.error(f"Notification dispatch failed for {len(notifications)} notifications: {e}")
+
+async def unread_count(db, player_id: str) -> int:
+    counter = await db[COUNTERS_COLLECTION].find_one({"player_id": player_id, "seeded": True}, {"unread": 1})
+    if counter is not None:
+        return max(counter.get("unread", 0), 0)
+
+    count = await db.notifications.count_documents(
+        {"player_id": player_id, "is_read": False, "delivered_at": {"$ne": None}}
+    )
+    await db[COUNTERS_COLLECTION].update_one(
+        {"player_id": player_id},
+        {"$set": {"unread": count, "seeded": True}},
+        upsert=True
+    )
+    return count
+
+async def _decrement(db, player_id: str, count: int) -> None:
+    # Pipeline update so the counter never goes below zero
+    await db[COUNTERS_COLLECTION].update_one(
+        {"player_id": player_id},
+        [{"$set": {"unread": {"$max": [0, {"$subtract": [{"$ifNull": ["$unread", 0]}, count]}]}}}]
+    )
+
+async def mark_read(db, notification_id: str) -> bool:
+    """Mark one delivered notification read. Returns False if there is none or it was already read."""
+    notification = await db.notifications.find_one_and_update(
+        {"id": notification_id, "is_read": False, "delivered_at": {"$ne": None}},
+        {"$set": {"is_read": True}},
+        projection={"player_id": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if notification is None:
+        return False
+    await _decrement(db, notification["player_id"], 1)
+    return True
+
+async def mark_all_read(db, player_id: str) -> int:
+    """Mark a player's whole inbox read. Returns the number of notifications changed."""
+    result = await db.notifications.update_many(
+        {"player_id": player_id, "is_read": False, "delivered_at": {"$ne": None}},
+        {"$set": {"is_read": True}}
+    )
+    await db[COUNTERS_COLLECTION].update_one(
+        {"player_id": player_id},
+        {"$set": {"unread": 0, "seeded": True}},
+        upsert=True
+    )
+    return result.modified_count
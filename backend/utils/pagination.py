@@ -0,0 +1,168 @@
+"""Keyset pagination and NDJSON streaming for list endpoints.
+
+List endpoints take an opaque ``after`` cursor and a ``limit``. Results are
+ordered by the endpoint's sort field with ``_id`` as a tie-breaker, so the next
+page is a plain range query on an index instead of a growing skip. The cursor
+for the following page is returned in the ``X-Next-Cursor`` response header
+(absent on the last page), which keeps the JSON body a bare array for
+existing clients.
+
+With ``stream=true`` the endpoint instead streams every remaining document as
+newline-delimited JSON, serializing each one as it comes off the Motor cursor
+so memory stays bounded no matter how long a player's history is.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import base64
+import binascii
+import json
+import logging
+from bson import ObjectId, json_util
+from fastapi import HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+PAGE_LIMIT_DEFAULT = 1000
+PAGE_LIMIT_MAX = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents fetched per round trip while streaming
+STREAM_BATCH_SIZE = 200
+
+def encode_cursor(value: Any, doc_id: Any) -> str:
+    """Encode the sort value and _id of the last returned document"""
+    payload = json_util.dumps([value, doc_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, doc_id = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    return value, doc_id
+
+class PageParams:
+    """Query parameters shared by every paginated endpoint (use with Depends())"""
+
+    def __init__(
+        self,
+        after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+        limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+        stream: bool = Query(False, description="Stream all remaining documents as NDJSON"),
+    ):
+        self.limit = limit
+        self.stream = stream
+        self.after = None
+        if after:
+            try:
+                self.after = decode_cursor(after)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def keyset_sort(sort_field: str, direction: int = -1) -> List[Tuple[str, int]]:
+    return [(sort_field, direction), ("_id", direction)]
+
+def keyset_filter(query: Dict[str, Any], sort_field: str, direction: int = -1,
+                  after: Optional[Tuple[Any, Any]] = None) -> Dict[str, Any]:
+    """Restrict ``query`` to documents that sort strictly after the cursor position"""
+    if after is None:
+        return query
+
+    value, doc_id = after
+    op = "$lt" if direction < 0 else "$gt"
+    if value is None:
+        # Missing values sort lowest, so descending pages end with them and
+        # ascending pages continue with every non-null value
+        beyond = [] if direction < 0 else [{sort_field: {"$ne": None}}]
+    else:
+        # Range operators never match null, so descending pages that run past
+        # the lowest value continue with the missing ones
+        beyond = [{sort_field: {op: value}}] + ([{sort_field: None}] if direction < 0 else [])
+    position = {"$or": beyond + [{sort_field: value, "_id": {op: doc_id}}]}
+
+    if not query:
+        return position
+    if "$or" in query:
+        return {"$and": [query, position]}
+    return {**query, **position}
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    page: PageParams,
+    direction: int = -1,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page and return (items, next cursor or None).
+
+    ``transform`` converts each raw document; returning None drops the
+    document from the page without affecting the cursor.
+    """
+    docs = await collection.find(
+        keyset_filter(query, sort_field, direction, page.after)
+    ).sort(keyset_sort(sort_field, direction)).limit(page.limit + 1).to_list(page.limit + 1)
+
+    next_cursor = None
+    if len(docs) > page.limit:
+        docs = docs[:page.limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+
+    items = []
+    for doc in docs:
+        item = transform(doc) if transform else doc
+        if item is not None:
+            items.append(item)
+    return items, next_cursor
+
+def stream_ndjson(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    page: PageParams,
+    direction: int = -1,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> StreamingResponse:
+    """Stream every document after the cursor as NDJSON"""
+    cursor = collection.find(
+        keyset_filter(query, sort_field, direction, page.after)
+    ).sort(keyset_sort(sort_field, direction)).batch_size(STREAM_BATCH_SIZE)
+
+    async def lines():
+        try:
+            async for doc in cursor:
+                item = transform(doc) if transform else doc
+                if item is None:
+                    continue
+                yield json.dumps(jsonable_encoder(item, custom_encoder={ObjectId: str})) + "\n"
+        except Exception as e:
+            # Headers are already sent, so the only thing left is to stop the stream
+            logger.error(f"Error streaming {collection.name}: {e}")
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    page: PageParams,
+    response: Response,
+    direction: int = -1,
+    transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+):
+    """Return one page (setting X-Next-Cursor) or an NDJSON stream when requested"""
+    if page.stream:
+        return stream_ndjson(collection, query, sort_field, page, direction, transform)
+
+    items, next_cursor = await fetch_page(collection, query, sort_field, page, direction, transform)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
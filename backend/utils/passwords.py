@@ -0,0 +1,88 @@
+"""Password hashing with scrypt, off the event loop.
+
+Hashes are stored as ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` (salt and hash
+base64). The KDF runs in a bounded thread pool (``hashlib.scrypt`` releases
+the GIL), so a burst of logins or registrations only queues behind the pool
+instead of stalling every other request.
+
+Cost parameters are tunable with ``PASSWORD_SCRYPT_N`` / ``_R`` / ``_P``;
+``python -m benchmarks.passwords`` measures the login throughput a setting
+gives. Hashes made with other parameters, and legacy unsalted SHA-256 hex
+digests, still verify; ``needs_rehash`` tells the login path to upgrade them.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', '8'))
+PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', '1'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p + (1 << 20), dklen=KEY_BYTES
+    )
+
+def hash_password_sync(
+    password: str,
+    n: int = PASSWORD_SCRYPT_N,
+    r: int = PASSWORD_SCRYPT_R,
+    p: int = PASSWORD_SCRYPT_P,
+) -> str:
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+def verify_password_sync(password: str, hashed_password: str) -> bool:
+    if not hashed_password:
+        return False
+    if hashed_password.startswith(SCHEME + "$"):
+        try:
+            _, n, r, p, salt, key = hashed_password.split("$")
+            expected = _b64decode(key)
+            actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        except (ValueError, TypeError, OverflowError):
+            # Malformed: bad base64, or cost parameters hashlib rejects
+            return False
+        return hmac.compare_digest(actual, expected)
+    # Legacy: unsalted SHA-256 hex digest
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for legacy hashes and scrypt hashes made with other cost parameters"""
+    if not hashed_password or not hashed_password.startswith(SCHEME + "$"):
+        return True
+    return hashed_password.split("$")[1:4] != [str(PASSWORD_SCRYPT_N), str(PASSWORD_SCRYPT_R), str(PASSWORD_SCRYPT_P)]
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password_sync, password)
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, verify_password_sync, password, hashed_password
+    )
+
+# Verified against when the username does not exist, so unknown users take as
+# long to reject as wrong passwords (it matches no password)
+DUMMY_HASH = (
+    f"{SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    f"{_b64encode(bytes(SALT_BYTES))}${_b64encode(bytes(KEY_BYTES))}"
+)
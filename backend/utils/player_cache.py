@@ -0,0 +1,195 @@
+"""Read-through cache for per-player data polled by the dashboards.
+
+Entries are keyed by (kind, player, version). Every write that touches a
+player's data calls ``invalidate(player)``, which moves the player to a new
+version; entries stored under older versions are never read again and age out
+through LRU eviction / TTL. Cached values are the raw stored documents and
+are shared between requests, so treat them as read-only.
+
+Backends (``PLAYER_CACHE_BACKEND``):
+
+- ``memory`` (default): per-process ``TTLCache``. With several workers a write
+  only invalidates its own worker, so other workers may serve an entry for up
+  to ``PLAYER_CACHE_TTL_SECONDS``.
+- ``redis``: shared store at ``REDIS_URL`` (needs the ``redis`` package);
+  invalidation is visible to every worker. Configure the Redis server with an
+  LRU ``maxmemory-policy`` to bound its memory.
+- ``off``: every read goes to MongoDB.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+import itertools
+import logging
+import os
+from bson import json_util
+from pymongo import DESCENDING
+
+from utils.program_calendar import PROGRAM_HEADER_PROJECTION
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PLAYER_CACHE_BACKEND = os.environ.get('PLAYER_CACHE_BACKEND', 'memory').lower()
+PLAYER_CACHE_TTL_SECONDS = float(os.environ.get('PLAYER_CACHE_TTL_SECONDS', '60'))
+PLAYER_CACHE_MAX_ENTRIES = int(os.environ.get('PLAYER_CACHE_MAX_ENTRIES', '4096'))
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+_MISSING = object()
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Versions come from one process-wide counter, so a player whose version
+        # was evicted gets a fresh number that no stale entry can carry
+        self._versions = TTLCache(maxsize=4 * maxsize, ttl=4 * ttl)
+        self._counter = itertools.count(1)
+
+    async def version(self, player: str) -> int:
+        version = self._versions.get(player)
+        if version is None:
+            version = next(self._counter)
+            self._versions.set(player, version)
+        return version
+
+    async def bump(self, player: str) -> None:
+        self._versions.set(player, next(self._counter))
+
+    async def get(self, key: str) -> Any:
+        return self.entries.get(key, _MISSING)
+
+    async def set(self, key: str, value: Any) -> None:
+        self.entries.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class RedisBackend:
+    PREFIX = "player_cache"
+
+    def __init__(self, url: str, ttl: float):
+        import redis.asyncio as redis  # optional dependency
+        self.redis = redis.from_url(url)
+        self.ttl = int(ttl)
+
+    async def version(self, player: str) -> int:
+        version = await self.redis.get(f"{self.PREFIX}:version:{player}")
+        return int(version) if version is not None else 0
+
+    async def bump(self, player: str) -> None:
+        await self.redis.incr(f"{self.PREFIX}:version:{player}")
+
+    async def get(self, key: str) -> Any:
+        payload = await self.redis.get(f"{self.PREFIX}:{key}")
+        if payload is None:
+            return _MISSING
+        return json_util.loads(payload)["value"]
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.redis.set(f"{self.PREFIX}:{key}", json_util.dumps({"value": value}), ex=self.ttl)
+
+    def __len__(self) -> int:
+        return -1  # not tracked locally
+
+class PlayerCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, kind: str, player: str, load: Callable[[], Awaitable[Any]],
+                          variant: Hashable = None) -> Any:
+        """Return the cached value for (kind, player[, variant]) or load and store it"""
+        if self.backend is None:
+            return await load()
+        try:
+            version = await self.backend.version(player)
+            key = f"{kind}:{player}:{version}" if variant is None else f"{kind}:{player}:{variant}:{version}"
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Player cache read failed, falling back to MongoDB: {e}")
+            return await load()
+
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await load()
+        try:
+            # Only store if no write happened while loading
+            if await self.backend.version(player) == version:
+                await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Player cache write failed: {e}")
+        return value
+
+    async def invalidate(self, *players: Optional[str]) -> None:
+        """Drop every cached entry of these players (call after each write)"""
+        await self.invalidate_many(players)
+
+    async def invalidate_many(self, players: Iterable[Optional[str]]) -> None:
+        if self.backend is None:
+            return
+        for player in set(players):
+            if not player:
+                continue
+            try:
+                await self.backend.bump(player)
+            except Exception as e:
+                logger.error(f"Player cache invalidation failed for {player}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": PLAYER_CACHE_BACKEND,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def create_backend(kind: str = PLAYER_CACHE_BACKEND):
+    if kind == 'off':
+        return None
+    if kind == 'redis':
+        return RedisBackend(REDIS_URL, PLAYER_CACHE_TTL_SECONDS)
+    return MemoryBackend(PLAYER_CACHE_MAX_ENTRIES, PLAYER_CACHE_TTL_SECONDS)
+
+# Process-wide cache shared by server.py and the routers
+player_cache = PlayerCache(create_backend())
+
+# Cached queries
+
+async def latest_assessment(db, player_name: str) -> Optional[Dict[str, Any]]:
+    """Most recent assessment for a player name"""
+    return await player_cache.get_or_load(
+        "latest_assessment", player_name,
+        lambda: db.assessments.find_one({"player_name": player_name}, sort=[("created_at", DESCENDING)])
+    )
+
+async def latest_program(db, player_id: str) -> Optional[Dict[str, Any]]:
+    """Current periodized program as stored (exercise references unexpanded)"""
+    return await player_cache.get_or_load(
+        "periodized_program", player_id,
+        lambda: db.periodized_programs.find_one({"player_id": player_id}, sort=[("created_at", DESCENDING)])
+    )
+
+# Schedule fields of the current program: enough to locate today's routine,
+# the current week and phase, and the next assessment
+PROGRAM_SCHEDULE_PROJECTION = {
+    **PROGRAM_HEADER_PROJECTION,
+    "macro_cycles.duration_weeks": 1,
+    "next_assessment_date": 1,
+}
+
+async def program_schedule(db, player_id: str) -> Optional[Dict[str, Any]]:
+    return await player_cache.get_or_load(
+        "program_schedule", player_id,
+        lambda: db.periodized_programs.find_one(
+            {"player_id": player_id}, PROGRAM_SCHEDULE_PROJECTION, sort=[("created_at", DESCENDING)]
+        )
+    )
+
+async def latest_vo2_benchmark(db, player_id: str) -> Optional[Dict[str, Any]]:
+    return await player_cache.get_or_load(
+        "latest_vo2_benchmark", player_id,
+        lambda: db.vo2_benchmarks.find_one({"player_id": player_id}, sort=[("test_date", DESCENDING)])
+    )
@@ -0,0 +1,234 @@
+"""``player_summary`` read model behind ``/progress/summary/{player_id}``.
+
+One document per player holds everything the summary shows, kept up to date
+by the write paths instead of being recomputed on every read:
+
+- ``assessment``: created_at / overall_score / performance_level of the
+  latest assessment (refreshed by assessment writes);
+- ``training_days``: a rolling bitmap of the days with logged training, bit
+  ``i`` standing for ``last_day - i`` (days counted in UTC);
+- ``trends``: first/last value and count per performance metric;
+- ``next_assessment_date`` of the current periodized program.
+
+Writes are read-modify-write with a compare-and-set on ``version``. A player
+without a summary gets one built from the source collections on the first
+read (writes leave missing summaries alone), so existing data needs no
+migration.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+
+from utils.converters import parse_datetime
+from utils.database import mongo_date
+from utils.player_cache import latest_assessment, program_schedule
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLLECTION = "player_summary"
+TRAINING_WINDOW_DAYS = 30
+# Days kept in the bitmap; anything older than the window is shifted out
+BITMAP_DAYS = 32
+MAX_UPDATE_ATTEMPTS = 5
+
+# Training-day bitmap
+
+def day_number(value: Any) -> Optional[int]:
+    value = parse_datetime(value)
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date().toordinal()
+
+def mark_day(bitmap: Optional[Dict[str, int]], day: int) -> Dict[str, int]:
+    """Bitmap with ``day`` set, shifted forward if ``day`` is the newest"""
+    if not bitmap:
+        return {"last_day": day, "mask": 1}
+    last_day, mask = bitmap["last_day"], bitmap["mask"]
+    if day > last_day:
+        shift = day - last_day
+        mask = (mask << shift) & ((1 << BITMAP_DAYS) - 1) if shift < BITMAP_DAYS else 0
+        return {"last_day": day, "mask": mask | 1}
+    if last_day - day < BITMAP_DAYS:
+        mask |= 1 << (last_day - day)
+    return {"last_day": last_day, "mask": mask}
+
+def days_in_window(bitmap: Optional[Dict[str, int]], today: int, window: int = TRAINING_WINDOW_DAYS) -> int:
+    """Number of marked days in the ``window`` days ending with ``today``"""
+    if not bitmap:
+        return 0
+    last_day, mask = bitmap["last_day"], bitmap["mask"]
+    if last_day > today:
+        mask >>= last_day - today
+        last_day = today
+    visible = window - (today - last_day)
+    if visible <= 0:
+        return 0
+    return bin(mask & ((1 << visible) - 1)).count("1")
+
+# Summary sections
+
+def assessment_section(assessment: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if assessment is None:
+        return None
+    return {
+        "created_at": assessment.get("created_at"),
+        "overall_score": assessment.get("overall_score", 0),
+        "performance_level": assessment.get("performance_level", "Developing"),
+    }
+
+def add_metric(trends: List[Dict[str, Any]], metric: Dict[str, Any]) -> None:
+    """Fold one stored performance metric into the per-metric trend entries"""
+    name, value, date = metric["metric_name"], metric["value"], metric["measurement_date"]
+    for entry in trends:
+        if entry["metric_name"] == name:
+            break
+    else:
+        trends.append({
+            "metric_name": name, "first_value": value, "first_date": date,
+            "last_value": value, "last_date": date, "data_points": 1
+        })
+        return
+    entry["data_points"] += 1
+    measured = parse_datetime(date)
+    if measured < parse_datetime(entry["first_date"]):
+        entry["first_value"], entry["first_date"] = value, date
+    if measured >= parse_datetime(entry["last_date"]):
+        entry["last_value"], entry["last_date"] = value, date
+
+async def build_summary(db, player_id: str) -> Dict[str, Any]:
+    """Summary document computed from the source collections"""
+    from utils.analytics import improvement_trends_pipeline
+    since = datetime.now(timezone.utc) - timedelta(days=BITMAP_DAYS)
+    assessment, training_dates, trends, program = await asyncio.gather(
+        latest_assessment(db, player_id),
+        db.daily_progress.find(
+            {"player_id": player_id, "date": {"$gte": mongo_date(since)}}, {"_id": 0, "date": 1}
+        ).to_list(None),
+        db.performance_metrics.aggregate(improvement_trends_pipeline(player_id, min_points=1)).to_list(None),
+        program_schedule(db, player_id),
+    )
+    bitmap = None
+    for entry in training_dates:
+        day = day_number(entry.get("date"))
+        if day is not None:
+            bitmap = mark_day(bitmap, day)
+    return {
+        "player_id": player_id,
+        "assessment": assessment_section(assessment),
+        "training_days": bitmap,
+        "trends": [{"metric_name": trend.pop("_id"), **trend} for trend in trends],
+        "next_assessment_date": program.get("next_assessment_date") if program else None,
+        "version": 0,
+        "updated_at": mongo_date(datetime.now(timezone.utc)),
+    }
+
+async def _seed(db, player_id: str) -> Optional[Dict[str, Any]]:
+    """Insert a freshly built summary. Returns None if another request seeded it first."""
+    summary = await build_summary(db, player_id)
+    try:
+        await db[SUMMARY_COLLECTION].insert_one(summary)
+    except DuplicateKeyError:
+        return None
+    return summary
+
+async def get_summary(db, player_id: str) -> Dict[str, Any]:
+    """The player's summary document, built on first use (one point read after that)"""
+    summary = await db[SUMMARY_COLLECTION].find_one({"player_id": player_id})
+    if summary is None:
+        summary = await _seed(db, player_id) or await db[SUMMARY_COLLECTION].find_one({"player_id": player_id})
+    return summary
+
+Mutate = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+async def _update(db, player_id: Optional[str], mutate: Mutate) -> None:
+    """Apply ``mutate`` to the player's summary after a write to a source collection"""
+    if not player_id:
+        return
+    collection = db[SUMMARY_COLLECTION]
+    try:
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            summary = await collection.find_one({"player_id": player_id})
+            if summary is None:
+                return  # built from the sources, this write included, on first read
+            version = summary.get("version", 0)
+            pending = mutate(summary)
+            if pending is not None:
+                await pending
+            summary["version"] = version + 1
+            summary["updated_at"] = mongo_date(datetime.now(timezone.utc))
+            result = await collection.replace_one({"_id": summary["_id"], "version": version}, summary)
+            if result.matched_count:
+                return
+        # Too much contention: drop it so the next read rebuilds it
+        logger.warning(f"Player summary update kept conflicting for {player_id}, rebuilding")
+        await collection.delete_one({"player_id": player_id})
+    except Exception as e:
+        logger.error(f"Player summary update failed for {player_id}: {e}")
+        try:
+            await collection.delete_one({"player_id": player_id})
+        except Exception:
+            pass
+
+# Write-path hooks
+
+async def record_training_day(db, player_id: str, date: Any) -> None:
+    day = day_number(date)
+    if day is None:
+        return
+
+    def mutate(summary):
+        summary["training_days"] = mark_day(summary.get("training_days"), day)
+    await _update(db, player_id, mutate)
+
+async def record_metrics(db, player_id: str, metrics: Iterable[Dict[str, Any]]) -> None:
+    metrics = list(metrics)
+    if not metrics:
+        return
+
+    def mutate(summary):
+        trends = summary.setdefault("trends", [])
+        for metric in metrics:
+            add_metric(trends, metric)
+    await _update(db, player_id, mutate)
+
+async def record_program(db, player_id: str, program: Dict[str, Any]) -> None:
+    def mutate(summary):
+        summary["next_assessment_date"] = program.get("next_assessment_date")
+    await _update(db, player_id, mutate)
+
+async def refresh_assessments(db, *player_names: Optional[str]) -> None:
+    """Re-read the latest assessment of each player (call after invalidating the player cache)"""
+    async def refresh(player_name):
+        async def mutate(summary):
+            summary["assessment"] = assessment_section(await latest_assessment(db, player_name))
+        await _update(db, player_name, mutate)
+    await asyncio.gather(*(refresh(name) for name in set(player_names) if name))
+
+# Read side
+
+def summary_response(summary: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Response body of /progress/summary from a summary document"""
+    # Imported here so the write paths that import this module do not load analytics
+    from utils.analytics import trends_from_summaries
+    now = now or datetime.now(timezone.utc)
+    assessment = summary.get("assessment") or {}
+    training_days = days_in_window(summary.get("training_days"), now.date().toordinal())
+    trends = trends_from_summaries(
+        [trend for trend in summary.get("trends", []) if trend["data_points"] >= 2], key="metric_name"
+    )
+    next_assessment = parse_datetime(summary.get("next_assessment_date")) or now + timedelta(weeks=4)
+    return {
+        "player_id": summary["player_id"],
+        "assessment_date": assessment.get("created_at"),
+        "overall_score": assessment.get("overall_score", 0),
+        "performance_level": assessment.get("performance_level", "Developing"),
+        "training_sessions_30_days": training_days,
+        "training_consistency_percentage": round(min(100, (training_days / TRAINING_WINDOW_DAYS) * 100), 1),
+        "improvement_trends": trends,
+        "next_assessment_date": next_assessment,
+    }
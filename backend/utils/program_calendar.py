@@ -0,0 +1,141 @@
+"""Calendar index for periodized programs.
+
+Every program is saved with a flat ``calendar_index``: entry ``n`` describes
+program week ``n + 1`` as ``{"phase_number", "macro_index", "micro_index"}``.
+Finding today's routine is then a list lookup plus one aggregation that
+projects just that day's slot out of ``macro_cycles``, instead of fetching the
+whole program and walking its cycles. Programs saved before the index existed
+fall back to the walk.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+
+# Fields needed to locate today's slot; everything else stays on the server
+PROGRAM_HEADER_PROJECTION = {
+    "program_start_date": 1,
+    "program_name": 1,
+    "calendar_index": 1,
+    # Which exercise catalog the routine's references resolve against
+    "exercise_catalog_version": 1,
+}
+
+def build_calendar_index(macro_cycles: List[Dict[str, Any]]) -> List[Dict[str, int]]:
+    """Flatten macro/micro cycles into one entry per program week"""
+    index = []
+    for macro_index, macro_cycle in enumerate(macro_cycles):
+        for micro_index, _ in enumerate(macro_cycle.get("micro_cycles", [])):
+            index.append({
+                "phase_number": macro_cycle["phase_number"],
+                "macro_index": macro_index,
+                "micro_index": micro_index,
+            })
+    return index
+
+def index_program(program: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach the calendar index to a program document before it is saved"""
+    return {**program, "calendar_index": build_calendar_index(program.get("macro_cycles", []))}
+
+def parse_start_date(value: Any) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def program_position(program: Dict[str, Any], now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Return the current (week, day) of a program, both 1-based"""
+    now = now or datetime.now(timezone.utc)
+    days_elapsed = (now - parse_start_date(program["program_start_date"])).days
+    return (days_elapsed // 7) + 1, (days_elapsed % 7) + 1
+
+def week_slot(program: Dict[str, Any], week: int) -> Optional[Dict[str, int]]:
+    """Calendar entry for a week, or None if the week is outside the program"""
+    index = program.get("calendar_index") or []
+    if 1 <= week <= len(index):
+        return index[week - 1]
+    return None
+
+def phase_for_week(program: Dict[str, Any], week: int) -> int:
+    """Phase number for a week; weeks past the end belong to the last phase.
+
+    Uses the calendar index when present, otherwise the macro cycle durations.
+    """
+    index = program.get("calendar_index")
+    if index:
+        return index[min(max(week, 1), len(index)) - 1]["phase_number"]
+
+    week_count = 0
+    for i, macro_cycle in enumerate(program["macro_cycles"]):
+        week_count += macro_cycle["duration_weeks"]
+        if week <= week_count:
+            return i + 1
+    return len(program["macro_cycles"])
+
+async def fetch_routine_slot(collection, program_id: Any, slot: Dict[str, int], day: int) -> Optional[Dict[str, Any]]:
+    """Project a single daily routine out of a stored program"""
+    pipeline = [
+        {"$match": {"_id": program_id}},
+        {"$project": {
+            "_id": 0,
+            "routine": {"$let": {
+                "vars": {"macro": {"$arrayElemAt": ["$macro_cycles", slot["macro_index"]]}},
+                "in": {"$let": {
+                    "vars": {"micro": {"$arrayElemAt": ["$$macro.micro_cycles", slot["micro_index"]]}},
+                    "in": {"$arrayElemAt": ["$$micro.daily_routines", day - 1]},
+                }},
+            }},
+        }},
+    ]
+    results = await collection.aggregate(pipeline).to_list(1)
+    return results[0].get("routine") if results else None
+
+async def _walk_for_routine(collection, program_id: Any, week: int, day: int) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """Legacy lookup for programs saved without a calendar index"""
+    program = await collection.find_one({"_id": program_id}, {"macro_cycles": 1})
+    week_count = 0
+    for macro_cycle in program["macro_cycles"]:
+        for micro_cycle in macro_cycle["micro_cycles"]:
+            week_count += 1
+            if week_count == week:
+                routines = micro_cycle["daily_routines"]
+                routine = routines[day - 1] if day <= len(routines) else None
+                return routine, macro_cycle["phase_number"]
+    return None, None
+
+async def find_current_routine(collection, player_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Today's routine for a player's latest program, as returned by the current-routine endpoints.
+
+    The routine is returned as stored; callers resolve exercise references.
+    """
+    program = await collection.find_one(
+        {"player_id": player_id},
+        PROGRAM_HEADER_PROJECTION,
+        sort=[("created_at", -1)]
+    )
+    return await current_routine(collection, program, now)
+
+async def current_routine(collection, program: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """``find_current_routine`` for an already fetched program header (None if there is no program)"""
+    if not program:
+        return {"message": "No training program found", "routine": None}
+
+    current_week, current_day = program_position(program, now)
+
+    if "calendar_index" in program:
+        slot = week_slot(program, current_week)
+        routine = await fetch_routine_slot(collection, program["_id"], slot, current_day) if slot else None
+        current_phase = slot["phase_number"] if slot else None
+    else:
+        routine, current_phase = await _walk_for_routine(collection, program["_id"], current_week, current_day)
+
+    if not routine:
+        return {"message": "Rest day or program completed", "routine": None}
+
+    return {
+        "routine": routine,
+        "current_week": current_week,
+        "current_day": current_day,
+        "current_phase": current_phase,
+        "program_name": program["program_name"]
+    }
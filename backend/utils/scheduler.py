@@ -0,0 +1,269 @@
+"""Delivery of scheduled items (notification ``scheduled_at``, retest dates).
+
+Each kind of schedule is a ``ScheduleSource``: a collection, the field holding
+the due date, a marker field set once the item is delivered, and a
+``deliver`` callback. The ``Scheduler`` keeps the undelivered items due within
+``SCHEDULER_HORIZON_SECONDS`` in a min-heap of (due, id) and sleeps until the
+earliest one. The window is reloaded from an index on (marker, due field)
+every half horizon, so pending items further out cost nothing in memory and
+items written by other workers are picked up too. Items written by this
+worker are added as they are written with ``schedule``.
+
+Delivery claims the item with a lease: a conditional update sets
+``claimed_until`` only if the marker is unset and no other lease is live.
+The marker, the checkpoint, is set once ``deliver`` has succeeded. A failed
+delivery releases the lease and is retried with exponential backoff
+(``SCHEDULER_RETRY_SECONDS``, doubling per attempt). If the process dies
+mid-delivery the lease expires after ``SCHEDULER_LEASE_SECONDS``, and a
+reload picks the item up again. After a restart, items whose marker is unset
+(up to ``SCHEDULER_MAX_LATENESS_SECONDS`` overdue) are delivered.
+
+Delivery is at-least-once: a crash between ``deliver`` and setting the marker
+delivers the item again once its lease expires, so ``deliver`` callbacks must
+tolerate a repeat (retest reminders carry a ``dedupe_key``). ``deliver`` gets
+the document with the marker already filled in with the value about to be
+stored.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+
+from utils.converters import parse_datetime
+from utils.database import mongo_date
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SCHEDULER_HORIZON_SECONDS = float(os.environ.get('SCHEDULER_HORIZON_SECONDS', '3600'))
+SCHEDULER_CONCURRENCY = int(os.environ.get('SCHEDULER_CONCURRENCY', '16'))
+SCHEDULER_MAX_LATENESS_SECONDS = float(os.environ.get('SCHEDULER_MAX_LATENESS_SECONDS', str(24 * 3600)))
+SCHEDULER_LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', '300'))
+SCHEDULER_RETRY_SECONDS = float(os.environ.get('SCHEDULER_RETRY_SECONDS', '30'))
+
+# Lease of the worker delivering an item
+CLAIM_FIELD = "claimed_until"
+
+@dataclass
+class ScheduleSource:
+    name: str
+    collection: str
+    due_field: str
+    marker_field: str
+    deliver: Callable[[Dict[str, Any]], Awaitable[Any]]
+    # Extra conditions an item must still meet to be delivered
+    filter: Dict[str, Any] = field(default_factory=dict)
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    value = parse_datetime(value)
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class Scheduler:
+    def __init__(
+        self,
+        horizon: float = SCHEDULER_HORIZON_SECONDS,
+        concurrency: int = SCHEDULER_CONCURRENCY,
+        max_lateness: float = SCHEDULER_MAX_LATENESS_SECONDS,
+        lease: float = SCHEDULER_LEASE_SECONDS,
+        retry: float = SCHEDULER_RETRY_SECONDS,
+    ):
+        self.horizon = timedelta(seconds=horizon)
+        self.concurrency = concurrency
+        self.max_lateness = timedelta(seconds=max_lateness)
+        self.lease = timedelta(seconds=lease)
+        self.retry = timedelta(seconds=retry)
+        self.sources: Dict[str, ScheduleSource] = {}
+        self.db = None
+        self._heap: List[Tuple[datetime, int, str, str]] = []
+        self._queued: Set[Tuple[str, str]] = set()
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._sequence = itertools.count()
+        self._inflight: Set[asyncio.Task] = set()
+        self._loaded_until: Optional[datetime] = None
+        self._next_reload: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register(self, source: ScheduleSource) -> None:
+        self.sources[source.name] = source
+
+    async def start(self, db) -> None:
+        if self._task is not None:
+            return
+        self.db = db
+        self._wakeup = asyncio.Event()
+        await self.reload()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _push(self, source: str, item_id: str, due: datetime) -> bool:
+        if (source, item_id) in self._queued:
+            return False
+        self._queued.add((source, item_id))
+        heapq.heappush(self._heap, (due, next(self._sequence), source, item_id))
+        return True
+
+    def schedule(self, source_name: str, doc: Dict[str, Any]) -> None:
+        """Track an item just written by this worker"""
+        if self._task is None:
+            return  # picked up by a reload once the scheduler runs
+        source = self.sources[source_name]
+        due = _as_utc(doc.get(source.due_field))
+        if due is None or doc.get(source.marker_field) is not None:
+            return
+        # Items beyond the loaded window come in with a later reload
+        if due <= self._loaded_until:
+            self._push_and_wake(source_name, doc["id"], due)
+
+    def _push_and_wake(self, source: str, item_id: str, due: datetime) -> None:
+        if self._push(source, item_id, due) and self._heap[0][3] == item_id and self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def _unclaimed(now: datetime) -> Dict[str, Any]:
+        """Filter: no lease on the item, or only an expired one"""
+        return {"$or": [{CLAIM_FIELD: None}, {CLAIM_FIELD: {"$lte": mongo_date(now)}}]}
+
+    async def reload(self) -> None:
+        """Load the undelivered items due within the horizon"""
+        now = datetime.now(timezone.utc)
+        until = now + self.horizon
+        for source in self.sources.values():
+            query = {
+                source.marker_field: None,
+                source.due_field: {"$gte": mongo_date(now - self.max_lateness), "$lte": mongo_date(until)},
+                **self._unclaimed(now),
+                **source.filter,
+            }
+            cursor = self.db[source.collection].find(query, {"_id": 0, "id": 1, source.due_field: 1})
+            async for doc in cursor:
+                due = _as_utc(doc.get(source.due_field))
+                if due is not None:
+                    self._push(source.name, doc["id"], due)
+        self._loaded_until = until
+        self._next_reload = now + self.horizon / 2
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                if now >= self._next_reload:
+                    await self.reload()
+
+                while self._heap and self._heap[0][0] <= now:
+                    if len(self._inflight) >= self.concurrency:
+                        await asyncio.wait(self._inflight, return_when=asyncio.FIRST_COMPLETED)
+                    _, _, source, item_id = heapq.heappop(self._heap)
+                    self._queued.discard((source, item_id))
+                    task = asyncio.create_task(self._fire(self.sources[source], item_id))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+
+                wake_at = self._next_reload
+                if self._heap and self._heap[0][0] < wake_at:
+                    wake_at = self._heap[0][0]
+                self._wakeup.clear()
+                delay = (wake_at - datetime.now(timezone.utc)).total_seconds()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler loop error: {e}")
+                await asyncio.sleep(1)
+
+    async def _fire(self, source: ScheduleSource, item_id: str) -> None:
+        collection = self.db[source.collection]
+        now = datetime.now(timezone.utc)
+        lease = mongo_date(now + self.lease)
+        try:
+            doc = await collection.find_one_and_update(
+                {"id": item_id, source.marker_field: None, **self._unclaimed(now), **source.filter},
+                {"$set": {CLAIM_FIELD: lease}},
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            logger.error(f"Could not claim scheduled {source.name} {item_id}: {e}")
+            self._retry_later(source, item_id, now + self.max_lateness)
+            return
+        if doc is None:
+            self._attempts.pop((source.name, item_id), None)
+            return  # delivered or claimed elsewhere, or no longer applies
+
+        marker = mongo_date(now)
+        doc.pop(CLAIM_FIELD, None)
+        doc[source.marker_field] = marker
+        try:
+            await source.deliver(doc)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Scheduled delivery failed for {source.name} {item_id}: {e}")
+            try:
+                await collection.update_one({"id": item_id, CLAIM_FIELD: lease}, {"$unset": {CLAIM_FIELD: ""}})
+            except Exception as release_error:
+                logger.error(f"Could not release {source.name} {item_id}, retrying once its lease expires: {release_error}")
+            self._retry_later(source, item_id, (_as_utc(doc.get(source.due_field)) or now) + self.max_lateness)
+            return
+
+        self._attempts.pop((source.name, item_id), None)
+        self.delivered += 1
+        try:
+            result = await collection.update_one(
+                {"id": item_id, CLAIM_FIELD: lease},
+                {"$set": {source.marker_field: marker}, "$unset": {CLAIM_FIELD: ""}}
+            )
+            if not result.matched_count:
+                logger.warning(f"Lease on {source.name} {item_id} expired during delivery; it may be delivered again")
+        except Exception as e:
+            logger.error(f"Could not checkpoint {source.name} {item_id}; it will be delivered again: {e}")
+
+    def _retry_later(self, source: ScheduleSource, item_id: str, give_up_at: datetime) -> None:
+        """Queue another attempt with exponential backoff, until the item is too late to deliver"""
+        key = (source.name, item_id)
+        attempts = self._attempts.get(key, 0) + 1
+        retry_at = datetime.now(timezone.utc) + self.retry * 2 ** (attempts - 1)
+        if retry_at > give_up_at:
+            self._attempts.pop(key, None)
+            logger.error(f"Giving up on scheduled {source.name} {item_id} after {attempts} attempts")
+            return
+        self._attempts[key] = attempts
+        self.retried += 1
+        self._push_and_wake(source.name, item_id, retry_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "pending": len(self._heap),
+            "in_flight": len(self._inflight),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+# Process-wide scheduler; sources are registered by the app
+scheduler = Scheduler()
@@ -0,0 +1,161 @@
+"""Single scoring kernel shared by every assessment scoring path.
+
+``utils/assessment_calculator.py`` reports a 0-100 overall score and
+``server.py`` stores 0-5 category ratings, each against its own standards
+table. Both tables are flattened at import into per-age tuples of
+(excellent, good, average) thresholds indexed by metric position, so a single
+pass over the metrics grades a value against both tables and returns both
+scales.
+"""
+
+from typing import Dict, Any, Mapping, Optional, Tuple
+
+from utils.handbook_standards import (
+    YOUTH_HANDBOOK_STANDARDS,
+    FIVE_POINT_HANDBOOK_STANDARDS,
+    CATEGORY_WEIGHTS,
+    CATEGORY_METRICS,
+    LOWER_IS_BETTER_METRICS,
+)
+
+Thresholds = Optional[Tuple[float, float, float]]
+
+CATEGORIES = tuple(CATEGORY_WEIGHTS)
+WEIGHTS = tuple(CATEGORY_WEIGHTS[category] for category in CATEGORIES)
+
+# Flat metric order and the category index each metric belongs to
+METRICS = tuple(metric for category in CATEGORIES for metric in CATEGORY_METRICS[category])
+METRIC_INDEX = {metric: i for i, metric in enumerate(METRICS)}
+METRIC_CATEGORY = tuple(
+    CATEGORIES.index(category)
+    for category in CATEGORIES
+    for _ in CATEGORY_METRICS[category]
+)
+
+# Bit i is set when a lower value is better for METRICS[i]
+LOWER_IS_BETTER_MASK = sum(1 << METRIC_INDEX[metric] for metric in LOWER_IS_BETTER_METRICS)
+
+# Grade 2-5 mapped back to the level names used by the handbook
+LEVEL_NAMES = {5: "excellent", 4: "good", 3: "average", 2: "poor"}
+
+def compile_standards(standards: Mapping[str, Mapping[str, Mapping[str, float]]]) -> Dict[str, Tuple[Thresholds, ...]]:
+    """Flatten a standards table into age category -> thresholds tuple indexed like METRICS"""
+    compiled = {}
+    for age_category, metric_standards in standards.items():
+        row = []
+        for metric in METRICS:
+            levels = metric_standards.get(metric)
+            row.append((levels["excellent"], levels["good"], levels["average"]) if levels else None)
+        compiled[age_category] = tuple(row)
+    return compiled
+
+HANDBOOK_TABLE = compile_standards(YOUTH_HANDBOOK_STANDARDS)
+FIVE_POINT_TABLE = compile_standards(FIVE_POINT_HANDBOOK_STANDARDS)
+
+def _grade_higher_is_better(value: float, thresholds: Thresholds) -> int:
+    if thresholds is None:
+        return 3
+    excellent, good, average = thresholds
+    if value >= excellent:
+        return 5
+    if value >= good:
+        return 4
+    if value >= average:
+        return 3
+    return 2
+
+def _grade_lower_is_better(value: float, thresholds: Thresholds) -> int:
+    if thresholds is None:
+        return 3
+    excellent, good, average = thresholds
+    if value <= excellent:
+        return 5
+    if value <= good:
+        return 4
+    if value <= average:
+        return 3
+    return 2
+
+# Dispatch table indexed by the metric's lower-is-better bit
+_GRADERS = (_grade_higher_is_better, _grade_lower_is_better)
+METRIC_GRADERS = tuple(_GRADERS[(LOWER_IS_BETTER_MASK >> i) & 1] for i in range(len(METRICS)))
+
+def handbook_age_category(age: int) -> str:
+    """Age category for the 0-100 handbook scale"""
+    if age <= 14:
+        return "12-14"
+    elif age <= 16:
+        return "15-16"
+    elif age <= 18:
+        return "17-18"
+    else:
+        return "elite"
+
+def five_point_age_category(age: int) -> str:
+    """Age category for the 0-5 rating scale (players under 12 use elite standards)"""
+    if 12 <= age <= 14:
+        return "12-14"
+    elif 15 <= age <= 16:
+        return "15-16"
+    elif 17 <= age <= 18:
+        return "17-18"
+    else:
+        return "elite"
+
+def grade_metric(value: float, metric: str, age: int) -> int:
+    """Grade one metric on the 0-100 handbook scale (2=poor ... 5=excellent)"""
+    i = METRIC_INDEX.get(metric)
+    if i is None:
+        return 3
+    return METRIC_GRADERS[i](value, HANDBOOK_TABLE[handbook_age_category(age)][i])
+
+def score_assessment(assessment_data: Mapping[str, Any], age: Optional[int] = None) -> Dict[str, Any]:
+    """Score an assessment on both scales in a single pass over its metrics.
+
+    Returns ``overall_score``/``category_scores`` on the 0-100 handbook scale
+    (categories without values score 0) and ``overall_rating``/
+    ``category_ratings`` on the 0-5 scale (categories without values rate 3,
+    everything rounded to 2 decimals).
+    """
+    if age is None:
+        age = assessment_data.get('age', 18)
+    handbook_row = HANDBOOK_TABLE[handbook_age_category(age)]
+    five_point_row = FIVE_POINT_TABLE[five_point_age_category(age)]
+
+    handbook_totals = [0] * len(CATEGORIES)
+    five_point_totals = [0] * len(CATEGORIES)
+    counts = [0] * len(CATEGORIES)
+
+    for i, metric in enumerate(METRICS):
+        value = assessment_data.get(metric)
+        if value is None or value == "":
+            continue
+        value = float(value)
+        grader = METRIC_GRADERS[i]
+        c = METRIC_CATEGORY[i]
+        handbook_totals[c] += grader(value, handbook_row[i])
+        five_point_totals[c] += grader(value, five_point_row[i])
+        counts[c] += 1
+
+    category_scores = {}
+    category_ratings = {}
+    overall_score = 0
+    overall_rating = 0
+    for c, category in enumerate(CATEGORIES):
+        if counts[c]:
+            score = (handbook_totals[c] / counts[c]) * 20
+            rating = five_point_totals[c] / counts[c]
+        else:
+            score = 0
+            rating = 3
+        category_scores[category] = score
+        category_ratings[category] = round(rating, 2)
+        overall_score += score * WEIGHTS[c]
+        overall_rating += rating * WEIGHTS[c]
+
+    return {
+        "overall_score": min(100, max(0, overall_score)),
+        "category_scores": category_scores,
+        "overall_rating": round(overall_rating, 2),
+        "category_ratings": category_ratings,
+    }
@@ -0,0 +1,144 @@
+"""Where a worker's cold start goes: module import times and startup phases.
+
+``ImportTimer`` is a meta path finder that times each module's execution,
+giving the same self/cumulative breakdown as ``python -X importtime`` but in
+process, so a worker can log it and serve it at ``/health/startup``. Install
+it before the app's own imports (the first lines of ``main.py``); it stays
+installed, so modules deferred to first use show up when they load.
+
+``STARTUP_IMPORT_REPORT=0`` turns the import timer off. It is read from the
+process environment, as it runs before ``.env`` is loaded.
+"""
+
+from contextlib import contextmanager
+from importlib.machinery import ExtensionFileLoader, SourceFileLoader, SourcelessFileLoader
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STARTUP_IMPORT_REPORT = os.environ.get('STARTUP_IMPORT_REPORT', '1') != '0'
+
+FILE_LOADERS = (SourceFileLoader, SourcelessFileLoader, ExtensionFileLoader)
+
+class ImportTimer:
+    """Times ``exec_module`` of every module loaded from a file.
+
+    Only file loaders (source, bytecode, extension modules) are wrapped:
+    they are created per module, so timing one never touches another.
+    Builtin and frozen modules are left alone.
+    """
+
+    def __init__(self):
+        self.modules: Dict[str, List[float]] = {}  # name -> [self ms, cumulative ms]
+        self._local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if isinstance(spec.loader, FILE_LOADERS):
+            spec.loader.exec_module = self._timed(fullname, spec.loader.exec_module)
+        return spec
+
+    def _timed(self, name: str, exec_module):
+        def timed_exec_module(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.modules[name] = [elapsed - children, elapsed]
+        return timed_exec_module
+
+    def total_ms(self) -> float:
+        return sum(self_ms for self_ms, _ in self.modules.values())
+
+    def by_package(self) -> Dict[str, float]:
+        """Self time summed per top-level package"""
+        packages: Dict[str, float] = {}
+        for name, (self_ms, _) in self.modules.items():
+            package = name.partition(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_ms
+        return packages
+
+class StartupReport:
+    def __init__(self):
+        self.imports: Optional[ImportTimer] = ImportTimer() if STARTUP_IMPORT_REPORT else None
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def start(self) -> None:
+        """Begin timing imports; call before anything heavy is imported"""
+        self._started = time.perf_counter()
+        if self.imports is not None:
+            self.imports.install()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def report(self, top: int = 15) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "since_start_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "phases_ms": dict(self.phases),
+        }
+        if self.imports is not None:
+            modules = self.imports.modules
+            packages = sorted(self.imports.by_package().items(), key=lambda item: item[1], reverse=True)
+            slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)
+            result["imports"] = {
+                "modules": len(modules),
+                "total_ms": round(self.imports.total_ms(), 3),
+                "packages_ms": {package: round(ms, 3) for package, ms in packages[:top]},
+                "slowest_modules": [
+                    {"module": name, "self_ms": round(self_ms, 3), "cumulative_ms": round(cumulative_ms, 3)}
+                    for name, (self_ms, cumulative_ms) in slowest[:top]
+                ],
+            }
+        return result
+
+    def log(self, top: int = 5) -> None:
+        report = self.report(top)
+        phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["phases_ms"].items())
+        message = f"Startup took {report['since_start_ms']:.0f} ms ({phases})"
+        imports = report.get("imports")
+        if imports:
+            packages = ", ".join(f"{package} {ms:.0f} ms" for package, ms in imports["packages_ms"].items())
+            message += f"; {imports['modules']} modules imported in {imports['total_ms']:.0f} ms, slowest: {packages}"
+        logger.info(message)
+
+# Process-wide report; main.py starts it before its other imports
+startup_report = StartupReport()
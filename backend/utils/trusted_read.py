@@ -0,0 +1,179 @@
+"""Trusted-read fast path for GET endpoints.
+
+Documents read back from our own collections were validated by the model on
+the way in. Building ``Model(**doc)`` for them and letting FastAPI validate
+the ``response_model`` again costs two full validation passes per document.
+On the trusted path a serializer compiled per model instead projects the
+stored document onto the model's fields (dropping ``_id`` and other storage
+fields, filling defaults) and emits JSON-ready values directly, and the result
+is returned as a ``TrustedJSONResponse`` that FastAPI sends as is. The JSON
+matches what the validated path produces.
+
+Set ``STRICT_RESPONSE_VALIDATION=true`` (e.g. in tests) to go through full
+model and response validation again.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
+from datetime import date, datetime, time
+import json
+import os
+import types
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from utils.converters import load_document, parse_datetime
+from utils.pagination import PageParams, fetch_page, paginate, stream_ndjson, NEXT_CURSOR_HEADER
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library encoder
+    orjson = None
+
+STRICT_RESPONSE_VALIDATION = os.environ.get('STRICT_RESPONSE_VALIDATION', 'false').lower() in ('1', 'true', 'yes')
+
+Emit = Callable[[Any], Any]
+_MISSING = object()
+
+def format_datetime(value: datetime) -> str:
+    """ISO-8601 the way Pydantic serializes datetimes (UTC as "Z")"""
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+def _emit_datetime(value: Any) -> Any:
+    value = parse_datetime(value)
+    return format_datetime(value) if isinstance(value, datetime) else value
+
+def _emit_float(value: Any) -> Any:
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+def _json_default(value: Any) -> Any:
+    # Values inside untyped (Any / Dict[str, Any]) fields
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+class TrustedJSONResponse(JSONResponse):
+    """JSON response for already-serialized content; FastAPI does not re-validate it"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _each(emit: Emit) -> Emit:
+    def emit_items(value):
+        return [emit(item) for item in value] if isinstance(value, (list, tuple)) else value
+    return emit_items
+
+def _each_value(emit: Emit) -> Emit:
+    def emit_values(value):
+        return {key: emit(item) for key, item in value.items()} if isinstance(value, dict) else value
+    return emit_values
+
+def _compile_type(annotation: Any) -> Optional[Emit]:
+    """Emitter for one annotation, or None when stored values are already JSON-ready"""
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return serializer_for(annotation).serialize
+        if issubclass(annotation, datetime):
+            return _emit_datetime
+        if issubclass(annotation, float):
+            return _emit_float
+        return None
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Union or origin is getattr(types, "UnionType", None):
+        members = [arg for arg in args if arg is not type(None)]
+        return _compile_type(members[0]) if len(members) == 1 else None
+    if origin in (list, List, tuple, Tuple, set, frozenset) and args:
+        item = _compile_type(args[0])
+        return _each(item) if item else None
+    if origin in (dict, Dict) and len(args) == 2:
+        value = _compile_type(args[1])
+        return _each_value(value) if value else None
+    return None
+
+class ModelSerializer:
+    """Projects stored documents of one model straight to JSON-ready dicts"""
+
+    def __init__(self, model: type):
+        self.model = model
+        self._fields: List[Tuple[str, Optional[Emit], Any, Optional[Callable[[], Any]]]] = []
+
+    def _compile(self) -> None:
+        for name, field in self.model.model_fields.items():
+            if field.default_factory is not None:
+                default, factory = _MISSING, field.default_factory
+            elif field.is_required():
+                default, factory = None, None
+            else:
+                default, factory = field.default, None
+            self._fields.append((name, _compile_type(field.annotation), default, factory))
+
+    def serialize(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(doc, dict):
+            return doc
+        result = {}
+        for name, emit, default, factory in self._fields:
+            value = doc.get(name, _MISSING)
+            if value is _MISSING:
+                value = factory() if factory is not None else default
+            if emit is not None and value is not None:
+                value = emit(value)
+            result[name] = value
+        return result
+
+_SERIALIZERS: Dict[type, ModelSerializer] = {}
+
+def serializer_for(model: type) -> ModelSerializer:
+    """The compiled serializer of a model, built on first use"""
+    serializer = _SERIALIZERS.get(model)
+    if serializer is None:
+        serializer = _SERIALIZERS[model] = ModelSerializer(model)
+        serializer._compile()
+    return serializer
+
+def validated(model: type) -> Callable[[Dict[str, Any]], BaseModel]:
+    return lambda doc: model(**load_document(model, doc))
+
+def trusted_response(model: type, doc: Optional[Dict[str, Any]]):
+    """Return value for an endpoint that responds with one stored document (or None)"""
+    if doc is None:
+        return None
+    if STRICT_RESPONSE_VALIDATION:
+        return validated(model)(doc)
+    return TrustedJSONResponse(serializer_for(model).serialize(doc))
+
+async def trusted_paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    page: PageParams,
+    response,
+    model: type,
+    direction: int = -1,
+):
+    """``paginate`` for stored documents of ``model`` using the trusted path"""
+    if STRICT_RESPONSE_VALIDATION:
+        return await paginate(collection, query, sort_field, page, response, direction, validated(model))
+
+    serialize = serializer_for(model).serialize
+    if page.stream:
+        return stream_ndjson(collection, query, sort_field, page, direction, serialize)
+
+    items, next_cursor = await fetch_page(collection, query, sort_field, page, direction, serialize)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return TrustedJSONResponse(items, headers=headers)
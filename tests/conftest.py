@@ -0,0 +1,36 @@
+"""Shared fixtures: backend modules on the path, the in-memory storage backend.
+
+Tests run against ``utils/memory_store.py`` (``STORAGE_BACKEND=memory``), so
+no MongoDB is needed. The player cache is off so one test's reads never
+leak into another's. Async tests use anyio's pytest plugin on asyncio.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+# Before any backend module reads its configuration
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["PLAYER_CACHE_BACKEND"] = "off"
+
+import pytest
+
+from utils.db_lifecycle import mongo
+from utils.indexes import ensure_indexes
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db():
+    """A fresh, empty in-memory database behind ``utils.database.db``, with the app's indexes"""
+    mongo._database = None
+    mongo._collections.clear()
+    await ensure_indexes(mongo.db)
+    yield mongo.db
+    mongo._database = None
+    mongo._collections.clear()
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from utils.achievements import STATE_COLLECTION, record_progress
+import utils.player_cache as player_cache_module
+from utils.player_cache import MemoryBackend, PlayerCache, latest_assessment
+import server
+
+pytestmark = pytest.mark.anyio
+
+async def add_player(db, player_id="p1", coins=0):
+    await db.assessments.insert_one({"id": player_id, "player_name": player_id, "total_coins": coins})
+
+async def log(db, metric_type, value, player_id="p1"):
+    """Insert a progress entry and record it, as POST /progress does"""
+    await db.progress.insert_one({"player_id": player_id, "metric_type": metric_type, "value": value})
+    trophies, _ = await record_progress(db, player_id, metric_type, value)
+    return trophies
+
+async def test_threshold_awards_trophy_and_coins_once(db):
+    await add_player(db)
+    assert [t["trophy_type"] for t in await log(db, "speed", 3.9)] == ["speed_master"]
+    assert await log(db, "speed", 3.8) == []
+    assert await db.trophies.count_documents({"player_id": "p1"}) == 1
+    assert (await db.assessments.find_one({"id": "p1"}))["total_coins"] == 200
+
+async def test_count_rule_fires_on_fifth_entry(db):
+    await add_player(db)
+    awarded = [await log(db, "speed", 5.0) for _ in range(5)]
+    assert [len(trophies) for trophies in awarded] == [0, 0, 0, 0, 1]
+    assert awarded[-1][0]["trophy_type"] == "consistency_king"
+
+async def test_concurrent_entries_award_once(db):
+    await add_player(db)
+    await log(db, "ball_handling", 10)
+    results = await asyncio.gather(*(log(db, "ball_handling", 99) for _ in range(10)))
+    assert sum(len(trophies) for trophies in results) == 1
+    assert (await db.assessments.find_one({"id": "p1"}))["total_coins"] == 500
+
+async def test_state_is_seeded_from_history(db):
+    await add_player(db)
+    await db.progress.insert_many([{"player_id": "p1", "metric_type": "speed", "value": 5.0} for _ in range(4)])
+    await db.trophies.insert_one({"player_id": "p1", "trophy_type": "speed_master"})
+    # The fifth entry, and the first the engine sees
+    assert [t["trophy_type"] for t in await log(db, "speed", 3.5)] == ["consistency_king"]
+    state = await db[STATE_COLLECTION].find_one({"player_id": "p1"})
+    assert state["counters"] == {"speed": 5}
+
+@pytest.mark.parametrize("metric_type", ["awarded_mask.x", "$inc", "a.b", ""])
+async def test_unsafe_metric_type_leaves_state_alone(db, metric_type):
+    await add_player(db)
+    await log(db, "speed", 5.0)
+    assert await log(db, metric_type, 100) == []
+    state = await db[STATE_COLLECTION].find_one({"player_id": "p1"})
+    assert state["counters"] == {"speed": 1} and state["awarded_mask"] == 0
+
+def test_progress_entry_rejects_unsafe_metric_type():
+    with pytest.raises(ValidationError):
+        server.ProgressEntryCreate(player_id="p1", metric_type="counters.speed", metric_name="m", value=1)
+    assert server.ProgressEntryCreate(player_id="p1", metric_type="ball_handling", metric_name="m", value=1)
+
+async def test_no_coins_when_trophies_are_not_stored(db, monkeypatch):
+    await add_player(db)
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("write failed")
+    monkeypatch.setattr(db.trophies, "insert_many", fail)
+
+    with pytest.raises(RuntimeError):
+        await log(db, "speed", 3.9)
+    assert (await db.assessments.find_one({"id": "p1"}))["total_coins"] == 0
+
+async def test_awarded_coins_reach_the_cached_assessment(db, monkeypatch):
+    cache = PlayerCache(MemoryBackend(100, 60))
+    monkeypatch.setattr(player_cache_module, "player_cache", cache)
+    monkeypatch.setattr(server, "player_cache", cache)
+    await db.assessments.insert_one({"id": "a1", "player_name": "Yoyo", "total_coins": 0})
+    assert (await latest_assessment(db, "Yoyo"))["total_coins"] == 0
+
+    entry = server.ProgressEntry(player_id="a1", metric_type="speed", metric_name="30m sprint", value=3.9)
+    await db.progress.insert_one(entry.model_dump())
+    assert [t.trophy_type for t in await server.check_and_award_achievements("a1", entry)] == ["speed_master"]
+    assert (await latest_assessment(db, "Yoyo"))["total_coins"] == 200
@@ -0,0 +1,40 @@
+import random
+
+from utils.assessment_calculator import calculate_overall_score, get_performance_level
+from utils.batch_scoring import rate_records, score_records
+from utils.scoring_kernel import METRICS
+import server
+
+def random_rows(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = {"age": rng.randint(9, 21)}
+        for metric in METRICS:
+            if rng.random() < 0.8:
+                row[metric] = round(rng.uniform(0, 100), 1)
+        rows.append(row)
+    # A row with no metrics at all rates 3 everywhere
+    rows.append({"age": 15})
+    return rows
+
+def test_rate_records_matches_the_scalar_ratings():
+    rows = random_rows(300)
+    assert rate_records(rows) == [server.calculate_assessment_scores(row, row["age"]) for row in rows]
+
+def test_scored_bulk_import_matches_single_creates():
+    row = {"player_name": "Yoyo", "age": 11, "position": "Forward", "sprint_30m": 4.6, "yo_yo_test": 1600,
+           "vo2_max": 52.5, "vertical_jump": 44, "body_fat": 12.5, "ball_control": 3, "passing_accuracy": 72.0,
+           "dribbling_success": 58.0, "shooting_accuracy": 51.0, "defensive_duels": 63.0, "game_intelligence": 3,
+           "positioning": 4, "decision_making": 3, "coachability": 5, "mental_toughness": 4}
+    [document] = server.build_scored_assessments([server.AssessmentCreate(**row)])
+    scores = server.calculate_assessment_scores(row, row["age"])
+    assert document["overall_score"] == scores.pop("overall")
+    assert document["category_scores"] == scores
+
+def test_score_records_matches_the_handbook_scores():
+    rows = random_rows(300)
+    for row, result in zip(rows, score_records(rows)):
+        overall = calculate_overall_score(row)
+        assert result["overall_score"] == overall
+        assert result["performance_level"] == get_performance_level(overall)
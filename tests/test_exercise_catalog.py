@@ -0,0 +1,91 @@
+import copy
+
+import pytest
+
+from exercise_database import EXERCISE_DATABASE
+import models
+from utils.converters import dump_model
+from utils.exercise_catalog import CATALOG_VERSION, VERSION_FIELD, catalog_for, compact_program, expand_program
+import utils.exercise_catalog as exercise_catalog
+import server
+
+pytestmark = pytest.mark.anyio
+
+KEY = "sprint_intervals_30m"
+
+@pytest.fixture(autouse=True)
+def fresh_catalogs(monkeypatch):
+    monkeypatch.setattr(exercise_catalog, "_archived", False)
+    monkeypatch.setattr(exercise_catalog, "_catalogs", {CATALOG_VERSION: EXERCISE_DATABASE})
+
+def new_catalog(monkeypatch, catalog):
+    """Deploy an edited catalog: a new version in a new process"""
+    monkeypatch.setattr(exercise_catalog, "EXERCISE_DATABASE", catalog)
+    monkeypatch.setattr(exercise_catalog, "CATALOG_VERSION", "edited")
+    monkeypatch.setattr(exercise_catalog, "_catalogs", {"edited": catalog})
+    monkeypatch.setattr(exercise_catalog, "_archived", False)
+
+def program_with(*exercises):
+    routine = {"day_number": 1, "phase": "development", "exercises": list(exercises), "total_duration": 30,
+               "intensity_rating": "high", "focus_areas": ["speed"]}
+    return {"player_id": "p1", "macro_cycles": [{"micro_cycles": [{"daily_routines": [routine]}]}]}
+
+def exercises_of(program):
+    return program["macro_cycles"][0]["micro_cycles"][0]["daily_routines"][0]["exercises"]
+
+def catalog_exercise(key=KEY, **overrides):
+    return {"id": "e1", "exercise_key": key, **EXERCISE_DATABASE[key], **overrides}
+
+async def test_programs_keep_the_catalog_they_were_written_with(db, monkeypatch):
+    stored = compact_program(program_with(catalog_exercise(duration=99)))
+    await exercise_catalog.archive_catalog(db)
+    assert stored[VERSION_FIELD] == CATALOG_VERSION
+
+    edited = copy.deepcopy(EXERCISE_DATABASE)
+    edited[KEY]["name"] = "Renamed sprint"
+    new_catalog(monkeypatch, edited)
+
+    exercise = exercises_of(expand_program(stored, await catalog_for(db, stored[VERSION_FIELD])))[0]
+    assert exercise["name"] == EXERCISE_DATABASE[KEY]["name"]
+    assert exercise["duration"] == 99
+    models.Exercise(**exercise)
+
+async def test_removed_key_expands_to_a_valid_placeholder(db, monkeypatch):
+    stored = compact_program(program_with(catalog_exercise()))
+    # The version was never archived and the key is gone from the new catalog
+    new_catalog(monkeypatch, {k: v for k, v in EXERCISE_DATABASE.items() if k != KEY})
+
+    exercise = exercises_of(expand_program(stored, await catalog_for(db, stored[VERSION_FIELD])))[0]
+    assert exercise["exercise_key"] == KEY and exercise["name"] == KEY
+    models.Exercise(**exercise)
+    server.Exercise(**exercise)
+
+async def test_catalog_is_archived_once_per_version(db):
+    await exercise_catalog.archive_catalog(db)
+    await exercise_catalog.archive_catalog(db)
+    exercise_catalog._archived = False
+    await exercise_catalog.archive_catalog(db)
+    assert await db.exercise_catalog.count_documents({"version": CATALOG_VERSION}) == 1
+
+async def test_unversioned_programs_resolve_against_the_current_catalog(db):
+    assert await catalog_for(db, None) is EXERCISE_DATABASE
+
+async def test_stored_program_reads_after_a_catalog_edit(db, monkeypatch):
+    await db.assessments.insert_one({"id": "a1", "player_name": "p1", "overall_score": 3})
+    created = await server.create_periodized_program(server.PeriodizedProgramCreate(
+        player_id="p1", program_name="Season", total_duration_weeks=14, program_objectives=["speed"]
+    ))
+    edited = {key: {**entry, "name": f"new {entry['name']}"} for key, entry in EXERCISE_DATABASE.items()}
+    new_catalog(monkeypatch, edited)
+
+    program = (await server.get_player_program("p1")).body
+    def exercises(program):
+        return [
+            exercise[field] for macro_cycle in dump_model(program)["macro_cycles"]
+            for micro_cycle in macro_cycle["micro_cycles"]
+            for routine in micro_cycle["daily_routines"]
+            for exercise in routine["exercises"]
+            for field in ("id", "name", "description", "instructions", "duration")
+        ]
+    read = exercises(server.PeriodizedProgram.model_validate_json(program))
+    assert read and read == exercises(created)
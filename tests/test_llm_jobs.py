@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from utils.llm_jobs import LlmJobQueue, QueueFullError
+import utils.llm_integration as llm_integration
+import server
+
+pytestmark = pytest.mark.anyio
+
+ASSESSMENT = {
+    "player_name": "Yoyo", "age": 15, "position": "Forward",
+    "sprint_30m": 4.6, "yo_yo_test": 1600, "vo2_max": 52.5, "vertical_jump": 44, "body_fat": 12.5,
+    "ball_control": 3, "passing_accuracy": 72.0, "dribbling_success": 58.0, "shooting_accuracy": 51.0,
+    "defensive_duels": 63.0, "game_intelligence": 3, "positioning": 4, "decision_making": 3,
+    "coachability": 5, "mental_toughness": 4,
+}
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def blocked(release: asyncio.Event, result="done"):
+    async def run():
+        await release.wait()
+        return result
+    return run
+
+async def test_jobs_run_on_a_fixed_pool():
+    queue = LlmJobQueue(concurrency=2, max_pending=10)
+    release = asyncio.Event()
+    jobs = [queue.submit("test", blocked(release)) for _ in range(5)]
+    await wait_until(lambda: queue.stats()["running_jobs"] == 2)
+    await asyncio.sleep(0.02)
+    assert queue.stats()["running_jobs"] == 2
+    assert queue.stats()["pending_jobs"] == 5
+
+    release.set()
+    await wait_until(lambda: queue.pending == 0)
+    assert [queue.get(job["job_id"])["status"] for job in jobs] == ["completed"] * 5
+    await queue.shutdown()
+
+async def test_submit_rejects_past_max_pending():
+    queue = LlmJobQueue(concurrency=1, max_pending=2)
+    release = asyncio.Event()
+    queue.submit("test", blocked(release))
+    queue.submit("test", blocked(release))
+    with pytest.raises(QueueFullError):
+        queue.submit("test", blocked(release))
+    release.set()
+    await queue.shutdown()
+
+async def test_shutdown_drains_the_queue_within_the_grace_period():
+    queue = LlmJobQueue(concurrency=1, max_pending=10)
+
+    async def quick():
+        await asyncio.sleep(0.01)
+        return "ok"
+    jobs = [queue.submit("test", quick) for _ in range(3)]
+    await queue.shutdown(grace=2)
+    assert [queue.get(job["job_id"])["status"] for job in jobs] == ["completed"] * 3
+
+async def test_shutdown_cancels_what_is_left_after_the_grace_period():
+    queue = LlmJobQueue(concurrency=1, max_pending=10)
+    never = asyncio.Event()
+    running = queue.submit("test", blocked(never))
+    queued = queue.submit("test", blocked(never))
+    await wait_until(lambda: queue.stats()["running_jobs"] == 1)
+
+    await queue.shutdown(grace=0.05)
+    assert queue.get(running["job_id"])["status"] == "cancelled"
+    assert queue.get(queued["job_id"])["status"] == "cancelled"
+    assert queue.pending == 0
+    # Long-polls return at once for finished jobs
+    assert (await queue.wait(queued["job_id"], 5))["completed_at"] is not None
+
+    # The next lifespan gets a fresh pool
+    job = queue.submit("test", blocked(asyncio.Event(), "unused"))
+    assert queue.get(job["job_id"])["status"] == "queued"
+    await queue.shutdown(grace=0)
+
+async def test_chat_is_only_built_on_a_cache_miss(monkeypatch):
+    built = []
+    original = llm_integration.create_chat
+
+    def create_chat(**kwargs):
+        built.append(kwargs["session_id"])
+        return original(**kwargs)
+    monkeypatch.setattr(llm_integration, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(llm_integration, "create_chat", create_chat)
+    monkeypatch.setattr(server, "llm_jobs", LlmJobQueue())
+
+    assessment = server.PlayerAssessment(**ASSESSMENT)
+    first = await server.generate_ai_training_program(assessment)
+    second = await server.generate_ai_training_program(assessment)
+    assert first == second and not first.startswith("خطأ")
+    assert len(built) == 1
+
+async def test_training_program_is_generated_by_a_job(db, monkeypatch):
+    monkeypatch.setattr(llm_integration, "LLM_BACKEND", "stub")
+    queue = LlmJobQueue(concurrency=1, max_pending=1)
+    monkeypatch.setattr(server, "llm_jobs", queue)
+    assessment = server.PlayerAssessment(**ASSESSMENT)
+    await db.assessments.insert_one(server.dump_model(assessment))
+
+    request = server.TrainingProgramCreate(player_id=assessment.id, program_type="AI_Generated")
+    job = await server.submit_training_program_job(request)
+    assert job["status"] == "queued"
+    finished = await queue.wait(job["job_id"], 2)
+    assert finished["status"] == "completed"
+    assert finished["result"].program_type == "AI_Generated"
+    assert await db.training_programs.count_documents({"player_id": assessment.id}) == 1
+    await queue.shutdown()
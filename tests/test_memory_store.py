@@ -0,0 +1,165 @@
+"""The memory store against the operators and index behaviour the app relies on"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from utils.database import mongo_date
+from utils.pagination import keyset_filter, keyset_sort
+from utils.program_calendar import fetch_routine_slot
+from main import create_app
+
+pytestmark = pytest.mark.anyio
+
+async def test_reads_return_fresh_copies_with_driver_types(db):
+    when = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    await db.items.insert_one({"id": "a", "tags": ["x"], "at": when})
+    doc = await db.items.find_one({"id": "a"})
+    doc["tags"].append("y")
+    again = await db.items.find_one({"id": "a"})
+    assert again["tags"] == ["x"]
+    assert again["at"] == when and again["at"].tzinfo is not None
+    assert isinstance(again["_id"], ObjectId)
+
+async def test_inc_creates_and_increments_nested_counters(db):
+    await db.items.update_one({"id": "a"}, {"$inc": {"counters.speed": 1}}, upsert=True)
+    await db.items.update_one({"id": "a"}, {"$inc": {"counters.speed": 2, "counters.agility": 1}})
+    doc = await db.items.find_one({"id": "a"}, {"_id": 0, "counters": 1})
+    assert doc == {"counters": {"speed": 3, "agility": 1}}
+
+async def test_bits_all_clear_compare_and_set(db):
+    await db.items.insert_one({"id": "a", "mask": 0b001})
+    claim = {"$bit": {"mask": {"or": 0b110}}}
+    first = await db.items.update_one({"id": "a", "mask": {"$bitsAllClear": 0b110}}, claim)
+    second = await db.items.update_one({"id": "a", "mask": {"$bitsAllClear": 0b010}}, claim)
+    assert (first.modified_count, second.modified_count) == (1, 0)
+    assert (await db.items.find_one({"id": "a"}))["mask"] == 0b111
+
+async def test_find_one_and_update_claims_once(db):
+    await db.items.insert_one({"id": "a", "owner": None})
+
+    async def claim(worker):
+        return await db.items.find_one_and_update(
+            {"id": "a", "owner": None}, {"$set": {"owner": worker}}, return_document=ReturnDocument.AFTER
+        )
+    results = await asyncio.gather(*(claim(f"w{i}") for i in range(5)))
+    winners = [result for result in results if result is not None]
+    assert len(winners) == 1
+    assert (await db.items.find_one({"id": "a"}))["owner"] == winners[0]["owner"]
+
+async def test_find_one_and_update_returns_before_or_after(db):
+    await db.items.insert_one({"id": "a", "n": 1})
+    before = await db.items.find_one_and_update({"id": "a"}, {"$inc": {"n": 1}})
+    after = await db.items.find_one_and_update({"id": "a"}, {"$inc": {"n": 1}}, return_document=ReturnDocument.AFTER)
+    assert (before["n"], after["n"]) == (1, 3)
+    assert await db.items.find_one_and_update({"id": "missing"}, {"$inc": {"n": 1}}) is None
+
+async def test_or_keyset_filter_matches_sort_order(db):
+    await db.items.insert_many([{"player_id": "p", "v": v} for v in (3, 1, 2, 2, None)])
+    everything = await db.items.find({"player_id": "p"}).sort(keyset_sort("v")).to_list(None)
+    last = everything[1]
+    rest = await db.items.find(
+        keyset_filter({"player_id": "p"}, "v", DESCENDING, (last["v"], last["_id"]))
+    ).sort(keyset_sort("v")).to_list(None)
+    assert [doc["_id"] for doc in rest] == [doc["_id"] for doc in everything[2:]]
+
+async def test_or_combined_with_an_existing_or(db):
+    await db.items.insert_many([{"a": 1, "v": 1}, {"b": 1, "v": 2}, {"c": 1, "v": 3}])
+    query = keyset_filter({"$or": [{"a": 1}, {"b": 1}]}, "v", ASCENDING, (1, ObjectId("0" * 24)))
+    assert [doc["v"] for doc in await db.items.find(query).to_list(None)] == [1, 2]
+
+async def test_array_elem_at_projects_one_routine(db):
+    program = {"macro_cycles": [
+        {"micro_cycles": [{"daily_routines": ["m0w0d1", "m0w0d2"]}]},
+        {"micro_cycles": [{"daily_routines": ["m1w0d1"]}, {"daily_routines": ["m1w1d1", "m1w1d2"]}]},
+    ]}
+    result = await db.items.insert_one(program)
+    slot = {"macro_index": 1, "micro_index": 1}
+    assert await fetch_routine_slot(db.items, result.inserted_id, slot, 2) == "m1w1d2"
+    # Out of range indexes project nothing, as on the server
+    assert await fetch_routine_slot(db.items, result.inserted_id, slot, 3) is None
+
+async def test_group_first_and_last_follow_the_sort(db):
+    await db.items.insert_many([
+        {"player": "a", "day": 2, "score": 20}, {"player": "a", "day": 1, "score": 10},
+        {"player": "b", "day": 5, "score": 50}, {"player": "a", "day": 3, "score": 30},
+    ])
+    rows = await db.items.aggregate([
+        {"$sort": {"day": 1}},
+        {"$group": {"_id": "$player", "first": {"$first": "$score"}, "last": {"$last": "$score"},
+                    "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]).to_list(None)
+    assert rows == [
+        {"_id": "a", "first": 10, "last": 30, "count": 3},
+        {"_id": "b", "first": 50, "last": 50, "count": 1},
+    ]
+
+async def test_unique_index_rejects_duplicates(db):
+    await db.users.insert_one({"id": "u1", "username": "yoyo", "email": "a@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await db.users.insert_one({"id": "u2", "username": "yoyo", "email": "b@example.com"})
+    await db.users.insert_one({"id": "u2", "username": "other", "email": "b@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await db.users.update_one({"id": "u2"}, {"$set": {"email": "a@example.com"}})
+    assert (await db.users.find_one({"id": "u2"}))["email"] == "b@example.com"
+    assert await db.users.count_documents({}) == 2
+
+async def test_insert_many_reports_the_duplicates(db):
+    await db.users.insert_one({"username": "a", "email": "a"})
+    with pytest.raises(BulkWriteError) as excinfo:
+        await db.users.insert_many([{"username": "b", "email": "b"}, {"username": "a", "email": "c"}])
+    assert excinfo.value.details["nInserted"] == 1
+    assert excinfo.value.details["writeErrors"][0]["code"] == 11000
+
+async def test_partial_unique_dedupe_key(db):
+    await db.notifications.insert_many([
+        {"player_id": "p", "dedupe_key": "trophy:1"},
+        # Only string keys are covered by the index
+        {"player_id": "p", "dedupe_key": None},
+        {"player_id": "p", "dedupe_key": None},
+        {"player_id": "p"},
+        {"player_id": "q", "dedupe_key": "trophy:1"},
+    ])
+    with pytest.raises(DuplicateKeyError):
+        await db.notifications.insert_one({"player_id": "p", "dedupe_key": "trophy:1"})
+    assert await db.notifications.count_documents({}) == 5
+
+async def test_explain_reports_index_use(db):
+    plan = await db.command("explain", {"find": "notifications", "filter": {"player_id": "p"}})
+    assert plan["queryPlanner"]["winningPlan"]["inputStage"]["stage"] == "IXSCAN"
+    plan = await db.command("explain", {"find": "notifications", "filter": {"title": "t"}})
+    assert plan["queryPlanner"]["winningPlan"]["stage"] == "COLLSCAN"
+
+async def test_unsupported_operators_fail_loudly(db):
+    await db.items.insert_one({"v": 1})
+    with pytest.raises(OperationFailure):
+        await db.items.find({"v": {"$where": "true"}}).to_list(None)
+    with pytest.raises(OperationFailure):
+        await db.items.aggregate([{"$lookup": {"from": "other"}}]).to_list(None)
+
+async def test_ndjson_stream_is_consumed_to_the_end(db):
+    await db.daily_progress.insert_many([
+        {"id": f"d{i}", "player_id": "p1", "date": mongo_date(datetime.now(timezone.utc)),
+         "routine_id": "r1", "completed_exercises": []}
+        for i in range(5)
+    ])
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/progress/daily/p1", params={"stream": "true"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == [f"d{i}" for i in range(5)]
+
+async def test_closed_cursor_returns_nothing(db):
+    await db.items.insert_many([{"v": i} for i in range(3)])
+    cursor = db.items.find({})
+    assert (await cursor.__anext__())["v"] == 0
+    await cursor.close()
+    assert [doc async for doc in cursor] == []
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import utils.database as database
+from utils.database import mongo_date
+from utils.migrate_dates import convert_dates, migrate_collection
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def iso_mode(monkeypatch):
+    monkeypatch.setattr(database, "DATE_STORAGE_MODE", "iso")
+
+@pytest.fixture
+def bson_mode(monkeypatch):
+    monkeypatch.setattr(database, "DATE_STORAGE_MODE", "bson")
+
+@pytest.mark.parametrize("legacy, stored", [
+    ("2025-01-10T12:00:00", "2025-01-10T12:00:00+00:00"),
+    ("2025-01-10T12:00:00Z", "2025-01-10T12:00:00+00:00"),
+    ("2025-01-10T23:00:00-05:00", "2025-01-11T04:00:00+00:00"),
+    ("2025-01-10", "2025-01-10T00:00:00+00:00"),
+])
+def test_iso_mode_normalizes_legacy_strings(iso_mode, legacy, stored):
+    assert convert_dates({"date": legacy}) == ({"date": stored}, True)
+
+def test_iso_mode_leaves_canonical_and_other_strings_alone(iso_mode):
+    doc = {"date": "2025-01-10T12:00:00.250000+00:00", "notes": "2025-01-10", "date_label": "today"}
+    assert convert_dates(doc) == (doc, False)
+
+def test_mongo_date_stores_aware_values_in_utc(iso_mode):
+    local = datetime.fromisoformat("2025-01-10T23:00:00-05:00")
+    assert mongo_date(local) == "2025-01-11T04:00:00+00:00"
+    assert mongo_date(datetime(2025, 1, 10, 12)) == "2025-01-10T12:00:00+00:00"
+
+def test_bson_mode_converts_to_datetimes(bson_mode):
+    converted, changed = convert_dates({"completed_exercises": [{"completion_date": "2025-01-10T12:00:00Z"}]})
+    assert changed
+    assert converted["completed_exercises"][0]["completion_date"] == datetime(2025, 1, 10, 12, tzinfo=timezone.utc)
+
+async def test_migrated_rows_match_range_filters(db, iso_mode):
+    # 04:00 UTC on the 11th, but sorts as text before midnight on the 11th
+    await db.daily_progress.insert_many([
+        {"player_id": "p1", "date": "2025-01-10T23:00:00-05:00"},
+        {"player_id": "p1", "date": mongo_date(datetime(2025, 1, 12, tzinfo=timezone.utc))},
+    ])
+    window = {"player_id": "p1", "date": {"$gte": mongo_date(datetime(2025, 1, 11, tzinfo=timezone.utc))}}
+    assert await db.daily_progress.count_documents(window) == 1
+
+    assert await migrate_collection("daily_progress") == 1
+    assert await db.daily_progress.count_documents(window) == 2
+    # Already migrated documents are left alone
+    assert await migrate_collection("daily_progress") == 0
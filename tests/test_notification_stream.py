@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils import notification_hub as hub_module
+from utils.converters import dump_model
+from utils.notification_hub import NotificationHub, RESYNC_EVENT, notification_stream, notifications_after
+from utils.notifications import dispatch_notifications, deliver_scheduled
+from utils.scheduler import ScheduleSource, Scheduler
+import server
+
+pytestmark = pytest.mark.anyio
+
+def notification(title, **fields):
+    return dump_model(server.Notification(player_id="p1", title=title, message="m", notification_type="info", **fields))
+
+def event_id(event: str) -> str:
+    return event.split("\n")[0].removeprefix("id: ")
+
+async def deliver_due(db):
+    """Run a scheduler until every due notification is delivered"""
+    scheduler = Scheduler()
+    scheduler.register(ScheduleSource(
+        name="notifications", collection="notifications", due_field="scheduled_at",
+        marker_field="delivered_at", deliver=lambda doc: deliver_scheduled(db, doc)
+    ))
+    await scheduler.start(db)
+    try:
+        while await db.notifications.count_documents({"delivered_at": None}):
+            await asyncio.sleep(0.01)
+    finally:
+        await scheduler.stop()
+
+async def test_replay_skips_notifications_scheduled_for_later(db):
+    first, second = notification("a"), notification("b")
+    later = notification("s", scheduled_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    await dispatch_notifications(db, [first])
+    await dispatch_notifications(db, [later, second])
+    replay = await notifications_after(db, "p1", first["id"])
+    assert [doc["title"] for doc in replay] == ["b"]
+
+async def test_replay_follows_delivery_order(db):
+    first, second = notification("a"), notification("b")
+    scheduled = notification("s", scheduled_at=datetime.now(timezone.utc) + timedelta(seconds=0.1))
+    await dispatch_notifications(db, [first])
+    await dispatch_notifications(db, [scheduled])
+    await dispatch_notifications(db, [second])
+    await deliver_due(db)
+    # Created before b but delivered after it
+    assert [doc["title"] for doc in await notifications_after(db, "p1", first["id"])] == ["b", "s"]
+    # Resuming from the late one does not send b again
+    assert await notifications_after(db, "p1", scheduled["id"]) == []
+
+async def test_stream_replays_then_continues_live(db):
+    first, second = notification("a"), notification("b")
+    await dispatch_notifications(db, [first, second])
+    hub = NotificationHub()
+    stream = notification_stream(db, "p1", first["id"], lambda doc: {"id": doc["id"]}, hub=hub)
+    try:
+        assert (await stream.__anext__()).startswith("retry:")
+        assert event_id(await stream.__anext__()) == second["id"]
+        third = notification("c")
+        await dispatch_notifications(db, [third])
+        hub.deliver_local([third])
+        assert event_id(await stream.__anext__()) == third["id"]
+    finally:
+        await stream.aclose()
+
+async def test_overflow_without_last_event_id_replays_since_subscribing(db):
+    await dispatch_notifications(db, [notification("before")])
+    hub = NotificationHub(queue_size=2)
+    stream = notification_stream(db, "p1", None, lambda doc: {"id": doc["id"]}, hub=hub)
+    try:
+        await stream.__anext__()
+        missed = [notification(str(i)) for i in range(5)]
+        await dispatch_notifications(db, missed)
+        hub.deliver_local(missed)  # overflows the queue of 2
+        received = [event_id(await stream.__anext__()) for _ in missed]
+        assert received == [doc["id"] for doc in missed]
+    finally:
+        await stream.aclose()
+
+async def test_truncated_replay_asks_client_to_resync(db, monkeypatch):
+    monkeypatch.setattr(hub_module, "REPLAY_LIMIT", 2)
+    first = notification("a")
+    await dispatch_notifications(db, [first])
+    await dispatch_notifications(db, [notification(str(i)) for i in range(3)])
+    stream = notification_stream(db, "p1", first["id"], lambda doc: {"id": doc["id"]}, hub=NotificationHub())
+    try:
+        events = [await stream.__anext__() for _ in range(4)]
+    finally:
+        await stream.aclose()
+    assert events[-1] == RESYNC_EVENT
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Response
+
+from utils.converters import dump_model
+from utils.notifications import backfill_delivered_at, dispatch_notifications, mark_all_read, mark_read, unread_count
+from utils.pagination import PageParams
+from utils.scheduler import Scheduler
+import server
+
+pytestmark = pytest.mark.anyio
+
+def notification(player_id="p1", **fields):
+    fields = {"title": "t", "message": "m", "notification_type": "info", **fields}
+    return dump_model(server.Notification(player_id=player_id, **fields))
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def page(limit=1000):
+    return PageParams(after=None, limit=limit, stream=False)
+
+async def test_inbox_hides_notifications_scheduled_for_later(db):
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    await dispatch_notifications(db, [notification(title="now"), notification(title="later", scheduled_at=later)])
+    inbox = await server.get_notifications("p1", Response(), page())
+    assert [item.title for item in inbox] == ["now"]
+
+async def test_inbox_lists_newest_delivery_first(db):
+    await dispatch_notifications(db, [notification(title="first")])
+    await dispatch_notifications(db, [notification(title="second")])
+    inbox = await server.get_notifications("p1", Response(), page())
+    assert [item.title for item in inbox] == ["second", "first"]
+
+async def test_backfill_keeps_legacy_notifications_in_inbox(db):
+    legacy = notification(title="legacy")
+    del legacy["delivered_at"]
+    await db.notifications.insert_one(legacy)
+    assert await backfill_delivered_at(db) == 1
+    assert await backfill_delivered_at(db) == 0
+    inbox = await server.get_notifications("p1", Response(), page())
+    assert [item.title for item in inbox] == ["legacy"]
+
+async def test_unread_count_ignores_undelivered_until_the_scheduler_delivers(db):
+    assert await unread_count(db, "p1") == 0  # seeds the counter
+    soon = datetime.now(timezone.utc) + timedelta(seconds=0.2)
+    scheduled = notification(title="soon", scheduled_at=soon)
+    await dispatch_notifications(db, [notification(), scheduled])
+    assert await unread_count(db, "p1") == 1
+
+    scheduler = Scheduler(retry=0.05)
+    scheduler.register(server.scheduler.sources["notifications"])
+    await scheduler.start(db)
+    try:
+        await wait_until(lambda: scheduler.delivered == 1)
+    finally:
+        await scheduler.stop()
+    assert await unread_count(db, "p1") == 2
+
+async def test_unread_count_seeded_from_delivered_only(db):
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    await dispatch_notifications(db, [notification(), notification(scheduled_at=later)])
+    await db.notification_counters.delete_many({})
+    assert await unread_count(db, "p1") == 1
+
+async def test_duplicates_are_not_counted(db):
+    await unread_count(db, "p1")
+    await dispatch_notifications(db, [notification(dedupe_key="invite:1")])
+    await dispatch_notifications(db, [notification(dedupe_key="invite:1"), notification(dedupe_key="invite:2")])
+    assert await unread_count(db, "p1") == 2
+
+async def test_mark_read_leaves_scheduled_notifications_alone(db):
+    await unread_count(db, "p1")
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    now_doc, later_doc = notification(), notification(scheduled_at=later)
+    await dispatch_notifications(db, [now_doc, later_doc])
+    assert await mark_read(db, later_doc["id"]) is False
+    assert await mark_all_read(db, "p1") == 1
+    assert await unread_count(db, "p1") == 0
+    assert (await db.notifications.find_one({"id": later_doc["id"]}))["is_read"] is False
+    assert await mark_read(db, now_doc["id"]) is False  # already read
@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+
+from utils.converters import dump_model
+from utils.pagination import NEXT_CURSOR_HEADER, PageParams, decode_cursor, encode_cursor, fetch_page
+import server
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def page(limit=1000, after=None):
+    params = PageParams(after=None, limit=limit, stream=False)
+    params.after = decode_cursor(after) if after else None
+    return params
+
+async def walk(collection, query, sort_field, limit, direction=-1):
+    """Every page of a keyset-paginated read, following the cursors"""
+    pages, cursor = [], None
+    while True:
+        items, cursor = await fetch_page(collection, query, sort_field, page(limit, cursor), direction)
+        pages.append(items)
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2025-01-01", 7)) == ("2025-01-01", 7)
+    assert decode_cursor(encode_cursor(None, "abc")) == (None, "abc")
+
+def test_malformed_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as excinfo:
+        PageParams(after="not-a-cursor", limit=10, stream=False)
+    assert excinfo.value.status_code == 400
+
+@pytest.mark.parametrize("direction", [-1, 1])
+async def test_walk_covers_ties_and_missing_values_once(db, direction):
+    # Five documents share a sort value and two have none, so pages split ties
+    values = [1, 2, 2, 2, 2, 2, 3, None, None, 4]
+    await db.items.insert_many([{"n": i, "v": value} for i, value in enumerate(values)])
+    pages = await walk(db.items, {"kind": {"$ne": "other"}}, "v", 3, direction)
+    seen = [doc["n"] for items in pages for doc in items]
+    assert sorted(seen) == list(range(len(values)))
+    assert all(len(items) == 3 for items in pages[:-1])
+    in_order = [doc["v"] for items in pages for doc in items]
+    present = [v for v in in_order if v is not None]
+    assert present == sorted(present, reverse=direction < 0)
+
+async def test_last_page_has_no_cursor(db):
+    await db.items.insert_many([{"v": i} for i in range(4)])
+    items, cursor = await fetch_page(db.items, {}, "v", page(4))
+    assert len(items) == 4 and cursor is None
+
+async def test_retests_page_soonest_first(db):
+    for days in (3, 1, 2):
+        retest = server.RetestSchedule(
+            player_id="p1", original_assessment_id="a", retest_date=START + timedelta(days=days),
+            retest_type="full"
+        )
+        await db.retest_schedules.insert_one(dump_model(retest))
+
+    first = await server.get_scheduled_retests("p1", Response(), page(2))
+    second = await server.get_scheduled_retests("p1", Response(), page(2, first.headers[NEXT_CURSOR_HEADER]))
+
+    dates = [item["retest_date"] for item in json.loads(first.body) + json.loads(second.body)]
+    assert dates == sorted(dates) and len(dates) == 3
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+async def test_assessment_progress_totals_cover_every_page(db):
+    for week, score in enumerate([50, 55, 62]):
+        await db.assessments.insert_one({
+            "id": f"a{week}", "player_name": "p1", "overall_score": score,
+            "assessment_date": (START + timedelta(weeks=week)).isoformat(),
+        })
+
+    response = Response()
+    progress = await server.get_assessment_progress("p1", response, page(1))
+    assert [entry["overall_score"] for entry in progress["assessments"]] == [50]
+    assert progress["total_assessments"] == 3
+    assert progress["latest_score"] == 62
+    assert progress["improvement"] == 12
+
+    rest = await server.get_assessment_progress("p1", Response(), page(5, response.headers[NEXT_CURSOR_HEADER]))
+    assert [entry["overall_score"] for entry in rest["assessments"]] == [55, 62]
+
+async def test_assessment_progress_without_assessments_is_404(db):
+    with pytest.raises(HTTPException) as excinfo:
+        await server.get_assessment_progress("nobody", Response(), page())
+    assert excinfo.value.status_code == 404
@@ -0,0 +1,61 @@
+import hashlib
+
+import httpx
+import pytest
+
+from models import User
+from utils.converters import dump_model
+import utils.passwords as passwords
+from utils.passwords import hash_password_sync, needs_rehash, verify_password_sync
+from main import create_app
+
+pytestmark = pytest.mark.anyio
+
+def legacy_hash(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+async def add_user(db, hashed_password: str):
+    user = User(username="yoyo", email="yoyo@example.com", full_name="Yoyo", hashed_password=hashed_password)
+    await db.users.insert_one(dump_model(user))
+
+async def login(password: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/auth/login", json={"username": "yoyo", "password": password})
+
+async def test_legacy_hash_logs_in_and_is_upgraded(db):
+    await add_user(db, legacy_hash("secret"))
+    response = await login("secret")
+    assert response.status_code == 200 and response.json()["access_token"]
+
+    stored = (await db.users.find_one({"username": "yoyo"}))["hashed_password"]
+    assert stored.startswith("scrypt$") and not needs_rehash(stored)
+    assert verify_password_sync("secret", stored)
+    # The upgraded hash keeps working
+    assert (await login("secret")).status_code == 200
+
+async def test_wrong_password_on_a_legacy_hash_leaves_it_alone(db):
+    await add_user(db, legacy_hash("secret"))
+    assert (await login("wrong")).status_code == 401
+    assert (await db.users.find_one({"username": "yoyo"}))["hashed_password"] == legacy_hash("secret")
+
+def test_needs_rehash_when_cost_parameters_change(monkeypatch):
+    current = hash_password_sync("secret")
+    assert not needs_rehash(current)
+    assert needs_rehash(legacy_hash("secret"))
+    for name, value in [("PASSWORD_SCRYPT_N", 2 ** 15), ("PASSWORD_SCRYPT_R", 4), ("PASSWORD_SCRYPT_P", 2)]:
+        with monkeypatch.context() as patched:
+            patched.setattr(passwords, name, value)
+            assert needs_rehash(current)
+
+@pytest.mark.parametrize("hashed_password", [
+    "scrypt$",
+    "scrypt$16384$8$1$c2FsdA",
+    "scrypt$lots$8$1$c2FsdA$a2V5",
+    "scrypt$3$8$1$c2FsdA$a2V5",
+    "scrypt$16384$-1$1$c2FsdA$a2V5",
+    "scrypt$16384$8$1$!!$a2V5",
+    "scrypt$16384$8$1$c2FsdA$a2V5$extra",
+])
+def test_malformed_scrypt_hash_does_not_verify(hashed_password):
+    assert verify_password_sync("secret", hashed_password) is False
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import PeriodizedProgramCreate
+from utils.converters import parse_datetime
+from utils.player_summary import SUMMARY_COLLECTION, days_in_window, get_summary, mark_day, record_program
+import routes.training_routes as training_routes
+
+pytestmark = pytest.mark.anyio
+
+def test_bitmap_counts_days_in_window():
+    bitmap = None
+    for day in (100, 98, 90, 60):
+        bitmap = mark_day(bitmap, day)
+    assert days_in_window(bitmap, 100) == 3  # day 60 has been shifted out
+    assert days_in_window(bitmap, 125) == 2  # days 96-125
+    assert days_in_window(bitmap, 130) == 0
+
+async def test_record_program_updates_existing_summary(db):
+    summary = await get_summary(db, "p1")
+    assert summary["version"] == 0
+    next_date = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    await record_program(db, "p1", {"next_assessment_date": next_date})
+    summary = await db[SUMMARY_COLLECTION].find_one({"player_id": "p1"})
+    assert summary["version"] == 1
+    assert parse_datetime(summary["next_assessment_date"]) == next_date
+
+async def test_record_program_leaves_missing_summary_alone(db):
+    await record_program(db, "p1", {"next_assessment_date": datetime.now(timezone.utc)})
+    assert await db[SUMMARY_COLLECTION].count_documents({}) == 0
+
+async def test_created_program_reaches_summary(db):
+    await get_summary(db, "p1")
+    program = await training_routes.create_periodized_program(PeriodizedProgramCreate(
+        player_id="p1", program_name="P", total_duration_weeks=14, program_objectives=["speed"]
+    ))
+    summary = await db[SUMMARY_COLLECTION].find_one({"player_id": "p1"})
+    assert abs(parse_datetime(summary["next_assessment_date"]) - program.next_assessment_date) < timedelta(seconds=1)
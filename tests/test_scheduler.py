@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.database import mongo_date
+from utils.scheduler import CLAIM_FIELD, ScheduleSource, Scheduler
+
+pytestmark = pytest.mark.anyio
+
+class Recorder:
+    """deliver callback that records its calls and fails the first ``failures`` of them"""
+
+    def __init__(self, failures: int = 0):
+        self.calls = []
+        self.failures = failures
+
+    async def __call__(self, doc):
+        self.calls.append(doc)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("push gateway down")
+
+def make_scheduler(deliver) -> Scheduler:
+    scheduler = Scheduler(horizon=3600, lease=60, retry=0.05)
+    scheduler.register(ScheduleSource(
+        name="items", collection="items", due_field="due_at", marker_field="delivered_at", deliver=deliver
+    ))
+    return scheduler
+
+async def insert_item(db, item_id="i1", due=None, **fields):
+    due = due or datetime.now(timezone.utc) - timedelta(seconds=1)
+    await db.items.insert_one({"id": item_id, "due_at": mongo_date(due), "delivered_at": None, **fields})
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+async def test_delivers_due_item_and_checkpoints_after_delivery(db):
+    await insert_item(db)
+    deliver = Recorder()
+    scheduler = make_scheduler(deliver)
+    await scheduler.start(db)
+    try:
+        await wait_until(lambda: scheduler.delivered == 1)
+    finally:
+        await scheduler.stop()
+    item = await db.items.find_one({"id": "i1"})
+    assert item["delivered_at"] is not None
+    assert CLAIM_FIELD not in item
+    # deliver sees the marker value that is then stored
+    assert deliver.calls[0]["delivered_at"] == item["delivered_at"]
+
+async def test_failed_delivery_is_released_and_retried(db):
+    await insert_item(db)
+    deliver = Recorder(failures=2)
+    scheduler = make_scheduler(deliver)
+    await scheduler.start(db)
+    try:
+        await wait_until(lambda: scheduler.delivered == 1)
+    finally:
+        await scheduler.stop()
+    assert len(deliver.calls) == 3
+    assert scheduler.stats()["failed"] == 2
+    assert scheduler.stats()["retried"] == 2
+    item = await db.items.find_one({"id": "i1"})
+    assert item["delivered_at"] is not None and CLAIM_FIELD not in item
+
+async def test_failed_delivery_leaves_item_undelivered_and_unclaimed(db):
+    await insert_item(db)
+    scheduler = make_scheduler(Recorder(failures=1))
+    scheduler.db = db
+    await scheduler._fire(scheduler.sources["items"], "i1")
+    item = await db.items.find_one({"id": "i1"})
+    assert item["delivered_at"] is None
+    assert CLAIM_FIELD not in item
+    assert [entry[3] for entry in scheduler._heap] == ["i1"]
+
+async def test_expired_lease_is_picked_up_after_restart(db):
+    # A worker claimed the item and died before delivering it
+    await insert_item(db, **{CLAIM_FIELD: mongo_date(datetime.now(timezone.utc) - timedelta(seconds=1))})
+    deliver = Recorder()
+    scheduler = make_scheduler(deliver)
+    await scheduler.start(db)
+    try:
+        await wait_until(lambda: scheduler.delivered == 1)
+    finally:
+        await scheduler.stop()
+    assert len(deliver.calls) == 1
+
+async def test_live_lease_is_left_to_its_holder(db):
+    await insert_item(db, **{CLAIM_FIELD: mongo_date(datetime.now(timezone.utc) + timedelta(minutes=5))})
+    deliver = Recorder()
+    scheduler = make_scheduler(deliver)
+    await scheduler.start(db)
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    assert deliver.calls == []
+
+async def test_two_workers_deliver_once(db):
+    for i in range(20):
+        await insert_item(db, f"i{i}")
+    deliver = Recorder()
+    workers = [make_scheduler(deliver), make_scheduler(deliver)]
+    for worker in workers:
+        await worker.start(db)
+    try:
+        await wait_until(lambda: sum(worker.delivered for worker in workers) == 20)
+        await asyncio.sleep(0.05)
+    finally:
+        for worker in workers:
+            await worker.stop()
+    assert sorted(doc["id"] for doc in deliver.calls) == sorted(f"i{i}" for i in range(20))
+
+async def test_scheduled_item_is_delivered_when_due(db):
+    deliver = Recorder()
+    scheduler = make_scheduler(deliver)
+    await scheduler.start(db)
+    try:
+        due = datetime.now(timezone.utc) + timedelta(seconds=0.2)
+        await insert_item(db, due=due)
+        scheduler.schedule("items", await db.items.find_one({"id": "i1"}))
+        await asyncio.sleep(0.05)
+        assert deliver.calls == []
+        await wait_until(lambda: scheduler.delivered == 1)
+    finally:
+        await scheduler.stop()
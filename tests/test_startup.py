@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+# main.create_app defers these to the first request that needs them
+DEFERRED = ("numpy", "utils.analytics", "utils.llm_integration", "exercise_database")
+
+def test_create_app_defers_heavy_imports():
+    # A fresh interpreter: other tests have already imported everything here
+    script = (
+        "import sys, main; main.create_app(); "
+        f"print(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={**os.environ, "STORAGE_BACKEND": "memory", "PLAYER_CACHE_BACKEND": "off"},
+    )
+    assert result.stdout.strip() == ""